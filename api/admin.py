@@ -1,3 +1,4 @@
+from django import forms
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from .models import User, ChefProfile, Dish, Booking, ChefRating
@@ -23,9 +24,48 @@ class CustomUserAdmin(UserAdmin):
         ("Custom Fields", {"fields": ("role",)}),
     )
 
+class ChefProfileAdminForm(forms.ModelForm):
+    """Edits the availability bitmask as the separate checkboxes it stands for."""
+    is_available = forms.BooleanField(required=False)
+    breakfast_available = forms.BooleanField(required=False)
+    lunch_available = forms.BooleanField(required=False)
+    dinner_available = forms.BooleanField(required=False)
+    urgent_booking_available = forms.BooleanField(required=False)
+    pre_booking_available = forms.BooleanField(required=False)
+
+    class Meta:
+        model = ChefProfile
+        exclude = ('availability',)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in ChefProfile.AVAILABILITY_FIELDS:
+            self.initial[name] = getattr(self.instance, name)
+
+    def save(self, commit=True):
+        for name in ChefProfile.AVAILABILITY_FIELDS:
+            setattr(self.instance, name, self.cleaned_data[name])
+        return super().save(commit)
+
+class AvailableFilter(admin.SimpleListFilter):
+    title = 'is available'
+    parameter_name = 'is_available'
+
+    def lookups(self, request, model_admin):
+        return (('1', 'Yes'), ('0', 'No'))
+
+    def queryset(self, request, queryset):
+        available = ChefProfile.availability_values(ChefProfile.AVAILABLE)
+        if self.value() == '1':
+            return queryset.filter(availability__in=available)
+        if self.value() == '0':
+            return queryset.exclude(availability__in=available)
+        return queryset
+
 class ChefProfileAdmin(admin.ModelAdmin):
+    form = ChefProfileAdminForm
     list_display = ('user', 'full_name', 'gender', 'location', 'is_available', 'breakfast_available', 'lunch_available', 'dinner_available', 'urgent_booking_available', 'pre_booking_available', 'average_rating')
-    list_filter = ('gender', 'location', 'is_available')
+    list_filter = ('gender', 'location', AvailableFilter)
     search_fields = ('user__username', 'full_name')
 
 class DishAdmin(admin.ModelAdmin):
@@ -6,4 +6,6 @@ class ApiConfig(AppConfig):
     name = 'api'
 
     def ready(self):
-        import api.signals  # Import signals when app starts
\ No newline at end of file
+        import api.signals  # Import signals when app starts
+        import api.media  # registers the MEDIA_SENDFILE_BACKEND system check
+        import api.metrics  # registers the /metrics access deploy check
\ No newline at end of file
@@ -0,0 +1,100 @@
+"""
+Async versions of the read-heavy endpoints, for ASGI workers (see backend/asgi.py).
+
+DRF views are synchronous, so these are plain Django async views: queries go
+through the async ORM, the existing serializers turn the loaded objects into
+data (every relation they touch is select_related, so they don't query) and
+the response body matches the DRF view it mirrors.
+"""
+from django.contrib.auth.models import AnonymousUser
+from django.core import signing
+from django.http import HttpResponse
+from django.views.decorators.http import require_safe
+from rest_framework.authentication import get_authorization_header
+from rest_framework.exceptions import NotFound
+
+from .caching import cache_public
+from .models import Dish, User
+from .pagination import StandardResultsSetPagination
+from .renderers import dumps
+from .serializers import DishSerializer, UserSerializer
+from .tokens import read_access_token, user_from_claims
+from .views import FEATURED_CHEFS, chefs_queryset, user_info_data
+
+
+async def get_user(request):
+    """Bearer token user (no query) or the session user, like the DRF authentication classes."""
+    auth = get_authorization_header(request).split()
+    if len(auth) == 2 and auth[0].lower() == b"bearer":
+        try:
+            return user_from_claims(read_access_token(auth[1].decode()))
+        except (signing.BadSignature, UnicodeDecodeError, KeyError, TypeError):
+            return AnonymousUser()
+    return await request.auser()
+
+
+def json_response(data, status=200):
+    """Rendered like the DRF views' responses (api.renderers)."""
+    return HttpResponse(dumps(data), status=status, content_type="application/json")
+
+
+def not_found(detail="Not found."):
+    return json_response({"detail": detail}, status=404)
+
+
+@cache_public("chefs")
+@require_safe
+async def chefs_list(request):
+    paginator = StandardResultsSetPagination()
+    try:
+        chefs = await paginator.apaginate_queryset(chefs_queryset(await get_user(request)), request)
+    except NotFound as e:
+        return not_found(str(e.detail))
+    serializer = UserSerializer(chefs, many=True, context={"request": request})
+    return json_response(paginator.get_paginated_response(serializer.data).data)
+
+
+@cache_public("chefs")
+@require_safe
+async def featured_chefs(request):
+    chefs = [chef async for chef in chefs_queryset(await get_user(request))[:FEATURED_CHEFS]]
+    return json_response(UserSerializer(chefs, many=True, context={'request': request}).data)
+
+
+@cache_public("chef-{chef_id}")
+@require_safe
+async def chef_dishes(request, chef_id, meal_type=None):
+    try:
+        chef = await User.objects.select_related('chefprofile').aget(id=chef_id, role="chef")
+    except User.DoesNotExist:
+        return not_found("No User matches the given query.")
+
+    dishes = Dish.objects.filter(chef=chef).select_related('chef__chefprofile').order_by('id')
+    if meal_type:
+        dishes = dishes.filter(available_time=meal_type)
+    paginator = StandardResultsSetPagination()
+    try:
+        paginated_dishes = await paginator.apaginate_queryset(dishes, request)
+    except NotFound as e:
+        return not_found(str(e.detail))
+
+    return json_response({
+        "chef": UserSerializer(chef, context={'request': request}).data,
+        "dishes": DishSerializer(paginated_dishes, many=True, context={'request': request}).data,
+        "pagination": {"next": paginator.get_next_link(), "previous": paginator.get_previous_link()},
+    })
+
+
+@cache_public("dish-{dish_id}")
+@require_safe
+async def get_dish(request, dish_id):
+    try:
+        dish = await Dish.objects.select_related('chef__chefprofile').aget(id=dish_id)
+    except Dish.DoesNotExist:
+        return not_found("No Dish matches the given query.")
+    return json_response(DishSerializer(dish, context={'request': request}).data)
+
+
+@require_safe
+async def user_info(request):
+    return json_response(user_info_data(await get_user(request)))
@@ -0,0 +1,32 @@
+from django.core import signing
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+
+from .tokens import read_access_token, user_from_claims
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """
+    Authenticates "Authorization: Bearer <access token>" without touching the
+    database. Requests without a bearer token fall through to the next class
+    (SessionAuthentication). Failures are 401s with a WWW-Authenticate header.
+    """
+    keyword = b"bearer"
+    www_authenticate_realm = "api"
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword:
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed("Invalid Authorization header.")
+
+        try:
+            claims = read_access_token(auth[1].decode())
+            user = user_from_claims(claims)
+        except (signing.BadSignature, UnicodeDecodeError, KeyError, TypeError):
+            raise exceptions.AuthenticationFailed("Invalid or expired token.")
+        return user, claims
+
+    def authenticate_header(self, request):
+        return f'Bearer realm="{self.www_authenticate_realm}"'
@@ -0,0 +1,176 @@
+"""
+Sub-request dispatch for /api/batch/ (api.views.batch).
+
+Each sub-request is a copy of the batch request (same cookies, session,
+user and Authorization header) with its own method, path and JSON body.
+It is passed straight to the view its path resolves to, without going
+through the middleware again. Consecutive GETs run together in a thread
+pool. Other methods run on the request thread in the order listed, after
+the GETs before them finish. Once a write succeeds, the sub-requests after
+it carry the read-replica pin cookie, so they read from the primary and a
+GET listed after a write sees it (see ReadReplicaMiddleware).
+Sub-requests skip the CSRF check because the batch request itself passed it.
+Each one is checked against its own QUERY_BUDGET and counted under its
+own route in /metrics.
+"""
+import contextvars
+import io
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+from urllib.parse import unquote_to_bytes
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import close_old_connections
+from django.http import Http404
+from django.urls import resolve
+
+from .context import current_request
+from .dbstats import QueryStats, start_recording, stop_recording
+from .metrics import record_request
+from .middleware import check_query_budget
+from .renderers import dumps
+from .routers import SAFE_METHODS
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class NotBatchable(Exception):
+    pass
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(settings.BATCH["MAX_WORKERS"], thread_name_prefix="batch")
+    return _executor
+
+
+def build_request(parent, index, method, path, body=None):
+    """A request like ``parent`` (the batch request) for one sub-request."""
+    path, _, query = path.partition("?")
+    content = dumps(body) if body is not None else b""
+    script_name = parent.META.get("SCRIPT_NAME", "")
+    if script_name and path.startswith(script_name):
+        path = path[len(script_name):]
+    request = WSGIRequest({
+        **parent.META,
+        "REQUEST_METHOD": method,
+        "PATH_INFO": unquote_to_bytes(path).decode("iso-8859-1"),  # WSGI's encoding of the path
+        "QUERY_STRING": query,
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(content)),
+        "HTTP_ACCEPT": "application/json",
+        "wsgi.input": io.BytesIO(content),
+        "wsgi.url_scheme": parent.scheme,
+    })
+    for name in ("session", "user", "auser"):
+        if hasattr(parent, name):
+            setattr(request, name, getattr(parent, name))
+    request.request_id = f"{getattr(parent, 'request_id', '')}.{index}"
+    request._dont_enforce_csrf_checks = True
+    return request
+
+
+def pin_primary(request):
+    """Reads of ``request`` go to the primary, as if the client had just written."""
+    request.COOKIES[settings.READ_REPLICA_PIN_COOKIE] = "1"
+
+
+def call_view(request):
+    if not request.path_info.startswith(settings.BATCH["PATH_PREFIX"]):
+        raise NotBatchable(f"Only {settings.BATCH['PATH_PREFIX']} paths can be batched.")
+    match = request.resolver_match = resolve(request.path_info)
+    if match.url_name in settings.BATCH["EXCLUDE_VIEWS"]:
+        raise NotBatchable(f"{request.path} can't be batched.")
+    view = match.func
+    if iscoroutinefunction(view):
+        view = async_to_sync(view)
+    return view(request, *match.args, **match.kwargs)
+
+
+def render(response):
+    """The response body as a JSON value."""
+    if response.streaming:
+        response.close()
+        raise NotBatchable("Streaming responses can't be batched.")
+    if hasattr(response, "render"):
+        response.render()  # DRF Response
+    if not response.content:
+        return b"null"
+    if response.get("Content-Type", "").startswith("application/json"):
+        return response.content
+    return dumps(response.content.decode(response.charset, "replace"))
+
+
+def dispatch(request):
+    """(status, JSON body) of one sub-request."""
+    stats = request.query_stats = QueryStats()
+    token = current_request.set(request)
+    recording = start_recording(stats, alone=True)
+    started = time.perf_counter()
+    try:
+        response = call_view(request)
+        body = render(response)
+        record_request(request, response, time.perf_counter() - started)
+        check_query_budget(request, stats)
+    except NotBatchable as e:
+        return 400, dumps({"detail": str(e)})
+    except Http404:
+        return 404, dumps({"detail": "Not found."})
+    except PermissionDenied:
+        return 403, dumps({"detail": "You do not have permission to perform this action."})
+    except Exception:
+        logger.exception("Batch sub-request %s %s failed", request.method, request.path)
+        return 500, dumps({"detail": "Server error."})
+    finally:
+        stop_recording(recording)
+        current_request.reset(token)
+    return response.status_code, body
+
+
+def dispatch_in_thread(request):
+    # Pool threads have their own connections, handled like a request thread's
+    close_old_connections()
+    try:
+        return dispatch(request)
+    finally:
+        close_old_connections()
+
+
+def run_batch(parent, items):
+    """
+    Runs the validated sub-requests (dicts with method, path and body) of
+    the batch request ``parent`` and returns the batch response body.
+    """
+    requests = [build_request(parent, index, **item) for index, item in enumerate(items)]
+    results = []
+    wrote = False
+    for is_get, group in groupby(requests, key=lambda request: request.method == "GET"):
+        group = list(group)
+        if is_get and len(group) > 1:
+            if wrote:
+                for request in group:
+                    pin_primary(request)
+            # Each sub-request gets its own copy of the context (current request, query recording)
+            futures = [executor().submit(contextvars.copy_context().run, dispatch_in_thread, r) for r in group]
+            results.extend(future.result() for future in futures)
+        else:
+            for request in group:
+                if wrote:
+                    pin_primary(request)
+                status, body = dispatch(request)
+                results.append((status, body))
+                wrote = wrote or (request.method not in SAFE_METHODS and status < 400)
+    parts = [b'{"status":%d,"body":%s}' % (status, body) for status, body in results]
+    return b'{"responses":[' + b",".join(parts) + b"]}"
@@ -0,0 +1,148 @@
+"""
+Shared-cache (CDN) policy for the public read endpoints.
+
+@cache_public lets shared caches keep a view's anonymous responses:
+Cache-Control public with s-maxage and stale-while-revalidate, plus a
+Surrogate-Key header naming the data in them. Responses to logged-in
+users get ``private``. CachePolicyMiddleware then strips Set-Cookie from
+the public ones and drops Cookie from their Vary header: they don't
+depend on cookies, and varying on the csrftoken cookie would give every
+visitor their own cache entry. So the cache has to pass requests that
+carry a session cookie straight through (``manage.py cache_proxy`` is a
+local proxy that does this).
+
+When a Dish or ChefProfile changes, the signals in api/signals.py call
+purge() with the surrogate keys to drop, which also invalidates the
+anonymous /api/home/ response every worker keeps in its local cache: its
+cache key includes a version stored in the shared HOME_VERSION_CACHE.
+"""
+import logging
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+logger = logging.getLogger(__name__)
+
+HOME_VERSION_KEY = "home:version"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def cache_public(*keys):
+    """
+    Make anonymous GET/HEAD responses of the view cacheable by shared caches.
+    ``keys`` are surrogate keys, formatted with the URL kwargs: "chef-{chef_id}".
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def wrapper(request, *args, **kwargs):
+                response = await view(request, *args, **kwargs)
+                anonymous = not (await request.auser()).is_authenticated
+                apply_policy(request, response, anonymous, [key.format(**kwargs) for key in keys])
+                return response
+            markcoroutinefunction(wrapper)
+        else:
+            @wraps(view)
+            def wrapper(request, *args, **kwargs):
+                response = view(request, *args, **kwargs)
+                # DRF has authenticated the request (session or token) by now
+                anonymous = not request.user.is_authenticated
+                apply_policy(request, response, anonymous, [key.format(**kwargs) for key in keys])
+                return response
+        return wrapper
+    return decorator
+
+
+def apply_policy(request, response, anonymous, keys):
+    config = settings.CDN
+    if not config["ENABLED"] or request.method not in ("GET", "HEAD"):
+        return
+    if "HTTP_AUTHORIZATION" in request.META or not anonymous:
+        patch_cache_control(response, private=True, max_age=0)
+        return
+    if response.status_code != 200:
+        return
+    patch_cache_control(
+        response, public=True, max_age=config["MAX_AGE"], s_maxage=config["S_MAXAGE"],
+        stale_while_revalidate=config["STALE_WHILE_REVALIDATE"],
+    )
+    # Token-authenticated requests get a different body and must not share the entry
+    patch_vary_headers(response, ("Authorization",))
+    response[config["SURROGATE_KEY_HEADER"]] = " ".join(keys)
+    response.cache_public = True
+
+
+def strip_cookies(response):
+    """Remove what would make a public response per-visitor (CachePolicyMiddleware)."""
+    response.cookies.clear()
+    vary = [value.strip() for value in response.get("Vary", "").split(",")]
+    vary = [value for value in vary if value and value.lower() != "cookie"]
+    if vary:
+        response["Vary"] = ", ".join(vary)
+    elif response.has_header("Vary"):
+        del response["Vary"]
+
+
+def home_cache_key(request):
+    # The version moves on every purge of "chefs"; image URLs are absolute, hence scheme and host
+    version = caches[settings.HOME_VERSION_CACHE].get(HOME_VERSION_KEY, 0)
+    return f"home:anonymous:{version}:{request.scheme}:{request.get_host()}"
+
+
+def invalidate_home_cache():
+    versions = caches[settings.HOME_VERSION_CACHE]
+    versions.add(HOME_VERSION_KEY, 0, None)
+    try:
+        versions.incr(HOME_VERSION_KEY)
+    except ValueError:
+        pass  # evicted in between; the next home_cache_key() starts over at 0
+
+
+def purge(keys, more_keys=None):
+    """
+    Drop cached responses tagged with any of ``keys`` once the current
+    transaction commits. ``more_keys`` is an optional function returning
+    further keys; it is only called (after the commit) when there is a
+    PURGE_URL to send them to.
+    """
+    keys = set(keys)
+    if "chefs" in keys:
+        transaction.on_commit(invalidate_home_cache)
+    if settings.CDN["PURGE_URL"]:
+        def send():
+            executor().submit(send_purge, sorted(keys.union(more_keys() if more_keys else ())))
+        transaction.on_commit(send)
+
+
+def executor():
+    """One background thread, so purges never hold up the request that caused them."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cdn-purge")
+    return _executor
+
+
+def send_purge(keys):
+    config = settings.CDN
+    request = urllib.request.Request(
+        config["PURGE_URL"], method=config["PURGE_METHOD"],
+        headers={config["SURROGATE_KEY_HEADER"]: " ".join(keys)},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=config["PURGE_TIMEOUT"]) as response:
+            response.read()
+    except OSError as e:
+        logger.warning("CDN purge of %s failed: %s", " ".join(keys), e)
+    else:
+        logger.info("Purged %s from the CDN", " ".join(keys))
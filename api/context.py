@@ -0,0 +1,19 @@
+"""
+The request being handled, for code that runs below the view without access
+to it (database router, query logging). Set by RequestContextMiddleware.
+"""
+from contextvars import ContextVar
+
+current_request = ContextVar("current_request", default=None)
+
+
+def current_view():
+    """url_name of the view handling the current request, once URL resolving has happened."""
+    request = current_request.get()
+    match = getattr(request, "resolver_match", None)
+    return match.url_name if match else None
+
+
+def current_request_id():
+    """Id of the current request (RequestContextMiddleware), as used in logs and the X-Request-ID header."""
+    return getattr(current_request.get(), "request_id", None)
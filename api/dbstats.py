@@ -0,0 +1,104 @@
+"""
+Per-request database query recording shared by the query-budget middleware,
+the profiler and the test helpers in api.testing.
+
+query_recorder is installed on every connection when it is created
+(api/signals.py) and reports each query to the QueryStats objects active in
+the current context. Going through a context variable rather than
+per-connection execute_wrapper() blocks also catches queries that async
+views run through sync_to_async, on another thread's connection.
+"""
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+_recorders = ContextVar("query_recorders", default=())
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """SQL with literals and parameter lists collapsed, so per-row queries compare equal."""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = sql.replace("%s", "?")
+    sql = _IN_LIST.sub("(...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+class QueryStats:
+    def __init__(self, keep_queries=False):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+        # (alias, sql, seconds) for each query when keep_queries is set
+        self.queries = [] if keep_queries else None
+
+    def record(self, alias, sql, elapsed):
+        self.duration += elapsed
+        self.count += 1
+        self.fingerprints[fingerprint(sql)] += 1
+        if self.queries is not None:
+            self.queries.append((alias, sql, elapsed))
+
+    def duplicates(self, threshold):
+        """Fingerprints run more than ``threshold`` times, most repeated first."""
+        return [(sql, n) for sql, n in self.fingerprints.most_common() if n > threshold]
+
+
+def budget_problems(stats, view, config):
+    """Human-readable reasons ``stats`` breaks the QUERY_BUDGET ``config`` for ``view``."""
+    problems = []
+    budget = config["VIEWS"].get(view, config["DEFAULT"])
+    if budget is not None and stats.count > budget:
+        problems.append(f"{stats.count} queries, budget {budget}")
+    for sql, n in stats.duplicates(config["DUPLICATE_THRESHOLD"]):
+        problems.append(f"repeated {n}x: {sql[:200]}")
+    return problems
+
+
+def query_recorder(execute, sql, params, many, context):
+    recorders = _recorders.get()
+    if not recorders:
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = perf_counter() - started
+        for stats in recorders:
+            stats.record(context["connection"].alias, sql, elapsed)
+
+
+def install(connection):
+    if query_recorder not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, query_recorder)
+
+
+def start_recording(stats, alone=False):
+    """
+    Record queries in this context into ``stats`` as well; returns a token for
+    stop_recording(). With ``alone`` they are recorded into ``stats`` only,
+    not the enclosing recorders (batch sub-requests are checked on their own).
+    """
+    return _recorders.set((stats,) if alone else _recorders.get() + (stats,))
+
+
+def stop_recording(token):
+    _recorders.reset(token)
+
+
+@contextmanager
+def record_queries(stats=None):
+    """Record every query run in this context, on any database alias, into ``stats``."""
+    stats = stats if stats is not None else QueryStats()
+    token = start_recording(stats)
+    try:
+        yield stats
+    finally:
+        stop_recording(token)
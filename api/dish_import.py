@@ -0,0 +1,63 @@
+import csv
+import io
+import json
+import os
+import zipfile
+
+from django.conf import settings
+
+
+def parse_manifest(upload):
+    """Read a CSV or JSON dish manifest into a list of row dicts."""
+    content = upload.read()
+    name = (upload.name or "").lower()
+
+    if name.endswith(".json"):
+        try:
+            data = json.loads(content)
+        except ValueError:
+            raise ValueError("Manifest is not valid JSON.")
+        if isinstance(data, dict):
+            data = data.get("dishes")
+        if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+            raise ValueError("JSON manifest must be a list of dish objects.")
+        return data
+
+    if name.endswith(".csv"):
+        try:
+            text = content.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            raise ValueError("CSV manifest must be UTF-8 encoded.")
+        reader = csv.DictReader(io.StringIO(text))
+        # Blank cells are treated as missing so optional columns can be left empty.
+        return [
+            {key.strip(): value.strip() for key, value in row.items() if key and value and value.strip()}
+            for row in reader
+        ]
+
+    raise ValueError("Manifest must be a .csv or .json file.")
+
+
+class ImageArchive:
+    """Pictures from an uploaded zip, looked up by file name."""
+
+    def __init__(self, upload):
+        try:
+            self.zip = zipfile.ZipFile(upload)
+        except zipfile.BadZipFile:
+            raise ValueError("Images must be uploaded as a zip archive.")
+        self.members = {}
+        for info in self.zip.infolist():
+            filename = os.path.basename(info.filename)
+            if info.is_dir() or not filename or filename.startswith(".") or info.filename.startswith("__MACOSX/"):
+                continue
+            self.members[filename] = info
+
+    def __contains__(self, filename):
+        return filename in self.members
+
+    def read(self, filename):
+        info = self.members[filename]
+        if info.file_size > settings.DISH_IMPORT_MAX_IMAGE_SIZE:
+            raise ValueError("Image is too large.")
+        return self.zip.read(info)
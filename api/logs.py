@@ -0,0 +1,131 @@
+"""
+Logging setup used by settings.LOGGING.
+
+Request threads only filter a record and put it on a queue; formatting it
+as a JSON line and writing it happen in a background thread, so a slow
+stdout or log collector never holds up a request. When the queue is full,
+records are dropped rather than waited for, and a warning with the count
+follows once there is room. Each line carries the id of the request it
+was logged in (X-Request-ID, set by RequestContextMiddleware), and chatty
+loggers can be sampled below WARNING with LOG_SAMPLING.
+"""
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from .context import current_request_id
+
+# Attributes every LogRecord has; anything else was passed with extra={...}
+RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps records with the current request id; must run before the record is queued."""
+
+    def filter(self, record):
+        # django.request logs after the middleware is done, but passes the request along
+        record.request_id = current_request_id() or getattr(getattr(record, "request", None), "request_id", None)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a ``rates[logger]`` fraction of a logger's records below WARNING.
+    The most specific configured name wins, so {"api": 0.1, "api.views": 1}
+    samples everything under api except api.views.
+    """
+
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = rates or {}
+
+    def rate(self, name):
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition(".")[0]
+        return 1.0
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.rate(record.name)
+
+
+class JSONFormatter(logging.Formatter):
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in RECORD_ATTRS)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, default=str)
+
+
+class QueueingHandler(QueueHandler):
+    """
+    Queues records for a listener thread that writes them to ``stream`` as
+    JSON lines. Forked processes (gunicorn workers of a preloaded app)
+    get their own queue and listener thread.
+    """
+
+    def __init__(self, stream=None, max_size=10000):
+        self.stream = stream
+        self.max_size = max_size
+        self.dropped = 0
+        self.listener = None
+        super().__init__(None)
+        self.start()
+        os.register_at_fork(after_in_child=self.start)
+        atexit.register(self.stop)
+
+    def start(self):
+        # A fresh queue: the parent's listener thread may have held its lock when we forked
+        self.queue = queue.SimpleQueue()
+        target = logging.StreamHandler(self.stream)
+        target.setFormatter(JSONFormatter())
+        self.listener = QueueListener(self.queue, target)
+        self.listener.start()
+
+    def stop(self):
+        if self.listener is not None:
+            self.listener.stop()  # writes out what is still queued
+            self.listener = None
+
+    def prepare(self, record):
+        # The message is merged here, while its arguments still have their
+        # current values; the JSON formatting happens in the listener
+        message = record.getMessage()
+        exc_text = record.exc_text
+        if record.exc_info and not exc_text:
+            exc_text = logging.Formatter().formatException(record.exc_info)
+        record = copy.copy(record)  # other handlers may still format the original
+        record.msg, record.args = message, None
+        record.exc_info, record.exc_text = None, exc_text
+        return record
+
+    def enqueue(self, record):
+        if self.queue.qsize() >= self.max_size:
+            self.dropped += 1
+            return
+        if self.dropped:
+            self.queue.put_nowait(logging.makeLogRecord({
+                "name": __name__, "levelno": logging.WARNING, "levelname": "WARNING",
+                "msg": f"Dropped {self.dropped} log records, the log queue was full",
+            }))
+            self.dropped = 0
+        self.queue.put_nowait(record)
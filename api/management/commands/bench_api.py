@@ -0,0 +1,312 @@
+import io
+import json
+import logging
+import statistics
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from api.management.commands.seed_load_data import PASSWORD
+from api.models import Booking, ChefProfile, Dish, User
+from api.testing import route_names
+from api.tokens import issue_tokens
+
+
+class Route:
+    """
+    One benchmarked request. ``kwargs`` and ``data`` are callables taking the
+    context built by Command.prepare() and the iteration number. ``write``
+    requests run in a transaction that is rolled back, so every iteration
+    sees the same data.
+    """
+
+    def __init__(self, name, method="get", user=None, kwargs=None, data=None, write=False,
+                 multipart=False, relogin=False, fresh_client=False, expect=None):
+        self.name = name
+        self.method = method
+        self.user = user  # None, "customer" or "chef"
+        self.kwargs = kwargs or (lambda ctx, i: None)
+        self.data = data or (lambda ctx, i: None)
+        self.write = write
+        self.multipart = multipart
+        self.relogin = relogin  # the request ends the session, log in again before each iteration
+        self.fresh_client = fresh_client  # a new visitor (no cookies) each iteration
+        self.expect = expect  # status that isn't an error; by default any status below 400
+
+
+def png_bytes():
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), (200, 120, 40)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def dish_form(ctx, i):
+    return {
+        "name": f"Bench dish {i}", "description": "Benchmark dish", "available_time": ctx["meal"],
+        "serving_number": 2, "price": 900, "picture": SimpleUploadedFile("dish.png", ctx["png"], content_type="image/png"),
+    }
+
+
+def manifest(ctx, i):
+    rows = "name,description,available_time,serving_number,price\n" + "".join(
+        f"Imported {i}-{n},Benchmark dish,{ctx['meal']},2,{500 + n}\n" for n in range(20)
+    )
+    return {"manifest": SimpleUploadedFile("menu.csv", rows.encode(), content_type="text/csv")}
+
+
+ROUTES = [
+    # Authorization
+    Route("register", "post", write=True, fresh_client=True, data=lambda ctx, i: {
+        "username": f"bench_user_{i}", "email": f"bench_user_{i}@example.com", "role": "customer",
+        "password": "bench-pass-1", "confirm_password": "bench-pass-1",
+    }),
+    Route("login", "post", write=True, fresh_client=True, data=lambda ctx, i: {"username": ctx["customer"].username, "password": ctx["password"]}),
+    Route("change-password", "post", user="customer", write=True, relogin=True,
+          data=lambda ctx, i: {"old_password": ctx["password"], "new_password": "bench-new-pass-1"}),
+    Route("user_info", user="customer"),
+    Route("logout", "post", user="customer", write=True, relogin=True),
+    Route("token", "post", data=lambda ctx, i: {"username": ctx["customer"].username, "password": ctx["password"]}),
+    Route("token-refresh", "post", data=lambda ctx, i: {"refresh": ctx["refresh"]}),
+    Route("token-revoke", "post", user="customer", write=True),
+
+    # landing page; the anonymous response is cached, so this measures the logged-in path
+    Route("home", user="customer"),
+    # A client fetching a chef's dishes and its own rating of the chef in one round trip
+    Route("batch", "post", user="customer", data=lambda ctx, i: {"requests": [
+        {"method": "GET", "path": reverse("get_dish", kwargs={"dish_id": ctx["dish"].id})},
+        {"method": "GET", "path": reverse("chef_dishes", kwargs={"chef_id": ctx["chef"].id, "meal_type": ctx["meal"]})},
+        {"method": "GET", "path": reverse("get-chef-rating", kwargs={"chef_id": ctx["chef"].id})},
+    ]}),
+
+    # chef
+    Route("chef-profile", user="chef"),
+    # Seeded chefs have the default picture, so this measures the 400 path
+    Route("delete-profile-picture", "delete", user="chef", write=True, expect=400),
+    Route("chefs_list"),
+    Route("featured-Chef"),
+    Route("chef_dishes", kwargs=lambda ctx, i: {"chef_id": ctx["chef"].id, "meal_type": ctx["meal"]}),
+    Route("chef-availability", user="chef"),
+
+    # dishes
+    Route("dish-catalog", data=lambda ctx, i: {"meal_type": ctx["meal"], "max_price": 2000}),
+    Route("get_dish", kwargs=lambda ctx, i: {"dish_id": ctx["dish"].id}),
+    Route("add_dishes", "post", user="chef", write=True, multipart=True, data=dish_form),
+    Route("edit_dishes", "put", user="chef", write=True, multipart=True,
+          kwargs=lambda ctx, i: {"dish_id": ctx["dish"].id}, data=lambda ctx, i: {"price": 1000 + i}),
+    Route("delete-dish", "delete", user="chef", write=True, kwargs=lambda ctx, i: {"dish_id": ctx["dish"].id}),
+    Route("import-dishes", "post", user="chef", write=True, multipart=True, data=manifest),
+
+    # Booking
+    Route("create-booking", "post", user="customer", write=True, data=lambda ctx, i: {
+        "customer": ctx["customer"].id, "chef": ctx["chef"].id, "dishes": [ctx["dish"].id], "slot": [ctx["meal"]], "booking_type": "prebooking",
+        "date": str(timezone.localdate() + timedelta(days=2)), "address": "House 12, Street 4, Lahore",
+        "contact_number": "03001234567",
+    }),
+    # Both lists write status changes for bookings that have expired or finished
+    Route("customer-bookings", user="customer", write=True),
+    Route("chef-upcoming-bookings", user="chef", write=True),
+    Route("update-booking-status", "patch", user="chef", write=True,
+          kwargs=lambda ctx, i: {"booking_id": ctx["booking"].id}, data=lambda ctx, i: {"status": "rejected"}),
+    Route("mark-booking-paid", "patch", user="chef", write=True, kwargs=lambda ctx, i: {"booking_id": ctx["booking"].id}),
+
+    # Rating
+    Route("rate-chef", "post", user="customer", write=True, kwargs=lambda ctx, i: {"chef_id": ctx["chef"].id},
+          data=lambda ctx, i: {"rating": 4}),
+    Route("get-chef-rating", user="customer", kwargs=lambda ctx, i: {"chef_id": ctx["chef"].id}),
+
+    # Async read endpoints
+    Route("async-user-info", user="customer"),
+    Route("async-chefs-list"),
+    Route("async-featured-chef"),
+    Route("async-chef-dishes", kwargs=lambda ctx, i: {"chef_id": ctx["chef"].id, "meal_type": ctx["meal"]}),
+    Route("async-get-dish", kwargs=lambda ctx, i: {"dish_id": ctx["dish"].id}),
+]
+
+
+def bench_settings():
+    """Settings for running many test client requests against the real database."""
+    return override_settings(
+        ALLOWED_HOSTS=["testserver"],
+        REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK,
+            "DEFAULT_THROTTLE_RATES": {scope: "1000000/s" for scope in settings.REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"]},
+        },
+        QUERY_BUDGET={**settings.QUERY_BUDGET, "ACTION": "log"},
+        # Uploads from rolled-back requests must not be left on disk
+        STORAGES={**settings.STORAGES, "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"}},
+    )
+
+
+def percentile(latencies, p):
+    return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every route in api/urls.py through the test client against the configured (seeded) "
+        "database and report per-route throughput and latency percentiles. Write requests are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument("--routes", nargs="*", help="Only these url names.")
+        parser.add_argument("--password", default=PASSWORD, help="Password of the benchmarked users (seed_load_data's by default).")
+        parser.add_argument("--json", dest="json_path", help="Write results as JSON to this file.")
+        parser.add_argument("--baseline", help="JSON from an earlier run to compare against.")
+        parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95 slowdown against the baseline.")
+        parser.add_argument("--fail-on-regression", action="store_true")
+
+    def handle(self, *args, **options):
+        routes = ROUTES
+        if options["routes"]:
+            unknown = set(options["routes"]) - {r.name for r in ROUTES}
+            if unknown:
+                raise CommandError(f"Unknown routes: {', '.join(sorted(unknown))}")
+            routes = [r for r in ROUTES if r.name in options["routes"]]
+        missing = route_names() - {r.name for r in ROUTES}
+        if missing:
+            self.stderr.write(f"Not benchmarked (no scenario): {', '.join(sorted(missing))}")
+
+        overrides = bench_settings()
+        request_logger = logging.getLogger("django.request")
+        level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        try:
+            with overrides:
+                ctx = self.prepare(options["password"])
+                results = {route.name: self.run_route(route, ctx, options) for route in routes}
+        finally:
+            request_logger.setLevel(level)
+
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"]) as f:
+                baseline = json.load(f)["routes"]
+        regressions = self.report(results, baseline, options["tolerance"])
+
+        if options["json_path"]:
+            with open(options["json_path"], "w") as f:
+                json.dump({
+                    "created": timezone.now().isoformat(),
+                    "iterations": options["iterations"],
+                    "routes": results,
+                }, f, indent=2)
+        if regressions and options["fail_on_regression"]:
+            raise CommandError(f"p95 regressed for: {', '.join(regressions)}")
+
+    def prepare(self, password):
+        customer = (
+            User.objects.filter(role="customer").annotate(n=Count("customer_bookings")).order_by("-n", "id").first()
+        )
+        # The busiest chef that takes pre-bookings makes chef_upcoming_bookings the worst case
+        chef = (
+            User.objects.filter(
+                role="chef",
+                chefprofile__availability__in=ChefProfile.availability_values(
+                    ChefProfile.AVAILABLE | ChefProfile.PRE_BOOKING
+                ),
+            )
+            .annotate(n=Count("chef_bookings"), dish_count=Count("dishes", distinct=True))
+            .filter(dish_count__gt=0).order_by("-n", "id").first()
+        )
+        if not customer or not chef:
+            raise CommandError("Needs at least one customer and one available chef with dishes; run seed_load_data.")
+        if not (customer.check_password(password) and chef.check_password(password)):
+            raise CommandError("--password doesn't match the selected users' password.")
+
+        profile = chef.chefprofile
+        open_meals = [meal for meal in ("lunch", "dinner", "breakfast") if getattr(profile, f"{meal}_available")]
+        dish = Dish.objects.filter(chef=chef, available_time__in=open_meals).order_by("id").first()
+        if dish is None:
+            raise CommandError(f"Chef {chef.username} has no dish in an open slot.")
+        booking = Booking.objects.filter(chef=chef).order_by("-date", "-id").first()
+        if booking is None:
+            raise CommandError(f"Chef {chef.username} has no bookings.")
+        return {
+            "customer": customer, "chef": chef, "dish": dish, "meal": dish.available_time, "booking": booking,
+            "password": password, "refresh": issue_tokens(customer)["refresh"], "png": png_bytes(),
+        }
+
+    def client_for(self, route, ctx):
+        client = Client()
+        if route.user:
+            client.force_login(ctx[route.user])
+        return client
+
+    def request(self, client, route, ctx, i):
+        url = reverse(route.name, kwargs=route.kwargs(ctx, i))
+        data = route.data(ctx, i)
+        if route.method == "get":
+            return client.get(url, data)
+        if route.multipart:
+            return client.generic(route.method.upper(), url, encode_multipart(BOUNDARY, data or {}), MULTIPART_CONTENT)
+        return client.generic(route.method.upper(), url, json.dumps(data or {}), "application/json")
+
+    def run_route(self, route, ctx, options):
+        client = self.client_for(route, ctx)
+        latencies, errors = [], 0
+        total = options["warmup"] + options["iterations"]
+        for i in range(total):
+            if route.fresh_client:
+                client = self.client_for(route, ctx)
+            elif route.relogin and i:
+                client.force_login(ctx[route.user])
+            started = time.perf_counter()
+            if route.write:
+                with transaction.atomic():
+                    response = self.request(client, route, ctx, i)
+                    transaction.set_rollback(True)
+            else:
+                response = self.request(client, route, ctx, i)
+            elapsed = time.perf_counter() - started
+            if i < options["warmup"]:
+                continue
+            latencies.append(elapsed)
+            errors += response.status_code != route.expect if route.expect else response.status_code >= 400
+
+        latencies.sort()
+        return {
+            "method": route.method.upper(),
+            "user": route.user or "anonymous",
+            "requests": len(latencies),
+            "errors": errors,
+            "last_status": response.status_code,
+            "rps": len(latencies) / sum(latencies),
+            "mean_ms": statistics.fmean(latencies) * 1000,
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p95_ms": percentile(latencies, 0.95) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+        }
+
+    def report(self, results, baseline, tolerance):
+        regressions = []
+        self.stdout.write(
+            f"{'route':<24}{'method':<8}{'user':<10}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}"
+            + (f"{'p95 vs base':>13}" if baseline else "")
+        )
+        for name, r in results.items():
+            line = (
+                f"{name:<24}{r['method']:<8}{r['user']:<10}{r['rps']:>9.0f}{r['p50_ms']:>9.2f}"
+                f"{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}{r['errors']:>8}"
+            )
+            base = baseline.get(name) if baseline else None
+            if base:
+                change = r["p95_ms"] / base["p95_ms"] - 1
+                line += f"{change:>+12.0%}"
+                if change > tolerance:
+                    regressions.append(name)
+                    line = self.style.ERROR(line + " !")
+            self.stdout.write(line)
+        return regressions
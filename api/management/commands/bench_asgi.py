@@ -0,0 +1,189 @@
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+HOST = "127.0.0.1"
+
+# Path prefix of the endpoint on each server
+PREFIXES = {"sync": "/api/", "async": "/api/async/"}
+
+
+def server_command(label, port, workers):
+    if label == "sync":
+        return ["-m", "gunicorn", "backend.wsgi:application", "--bind", f"{HOST}:{port}",
+                "--workers", str(workers), "--log-level", "warning"]
+    return ["-m", "uvicorn", "backend.asgi:application", "--host", HOST, "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning", "--no-access-log"]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def process_tree(pid):
+    """pid and all of its descendants, from /proc."""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces, the ppid is the 2nd field after it
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    pids, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        pids.append(current)
+        stack.extend(children.get(current, []))
+    return pids
+
+
+def rss_kb(pid):
+    """Resident memory of a server: the master plus its workers."""
+    total = 0
+    for child in process_tree(pid):
+        try:
+            with open(f"/proc/{child}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+        except OSError:
+            pass
+    return total
+
+
+async def fetch(reader, writer, request):
+    """Send one request on an open connection; return (status, keep_alive)."""
+    writer.write(request)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip().lower()
+
+    if headers.get("transfer-encoding") == "chunked":
+        while size := int((await reader.readline()).split(b";")[0], 16):
+            await reader.readexactly(size + 2)
+        await reader.readline()
+    elif "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    else:
+        await reader.read()
+        return status, False
+    return status, headers.get("connection") != "close"
+
+
+async def client(port, path, deadline, latencies, errors):
+    """One keep-alive connection sending requests back to back until the deadline."""
+    request = f"GET {path} HTTP/1.1\r\nHost: {HOST}\r\nAccept: application/json\r\n\r\n".encode()
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        if writer is None:
+            try:
+                reader, writer = await asyncio.open_connection(HOST, port)
+            except OSError:
+                errors.append("connect")
+                await asyncio.sleep(0.05)
+                continue
+        started = time.perf_counter()
+        try:
+            status, keep_alive = await fetch(reader, writer, request)
+        except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+            errors.append("read")
+            status, keep_alive = None, False
+        else:
+            latencies.append(time.perf_counter() - started)
+            if status >= 400:
+                errors.append(status)
+        if not keep_alive:
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Start the sync (gunicorn) and the async (uvicorn) server and compare throughput, latency "
+        "and memory per connection of an endpoint and its /api/async/ version at several concurrency levels."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--endpoint", default="chefs-list/", help="Path below /api/ that also exists below /api/async/.")
+        parser.add_argument("--connections", type=int, nargs="+", default=[10, 100, 500])
+        parser.add_argument("--duration", type=float, default=10, help="Seconds per concurrency level.")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes of each server.")
+        parser.add_argument("--servers", nargs="+", choices=list(PREFIXES), default=list(PREFIXES))
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'server':<8}{'conns':>7}{'req/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}"
+            f"{'idle MB':>9}{'peak MB':>9}{'KB/conn':>9}"
+        )
+        for label in options["servers"]:
+            process = self.start(label, options["workers"])
+            try:
+                path = PREFIXES[label] + options["endpoint"].lstrip("/")
+                # First requests import views and open DB connections, keep them out of the numbers
+                asyncio.run(self.load(process, path, min(options["connections"]), 1))
+                for connections in options["connections"]:
+                    self.report(label, connections, *asyncio.run(self.load(process, path, connections, options["duration"])))
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+
+    def start(self, label, workers):
+        self.port = free_port()
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "backend.settings")}
+        if label == "async":
+            env["DB_CONN_MAX_AGE"] = "0"
+        process = subprocess.Popen([sys.executable, *server_command(label, self.port, workers)], cwd=settings.BASE_DIR, env=env)
+
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f"The {label} server exited with status {process.returncode}.")
+            try:
+                socket.create_connection((HOST, self.port), timeout=1).close()
+                # Give the other workers time to boot as well
+                time.sleep(1)
+                return process
+            except OSError:
+                time.sleep(0.2)
+        process.terminate()
+        raise CommandError(f"The {label} server didn't start listening on port {self.port}.")
+
+    async def load(self, process, path, connections, duration):
+        idle = rss_kb(process.pid)
+        latencies, errors, peak = [], [], idle
+        deadline = time.perf_counter() + duration
+        tasks = [asyncio.create_task(client(self.port, path, deadline, latencies, errors)) for _ in range(connections)]
+        while not all(task.done() for task in tasks):
+            await asyncio.sleep(0.25)
+            peak = max(peak, rss_kb(process.pid))
+        await asyncio.gather(*tasks)
+        return latencies, errors, duration, idle, peak
+
+    def report(self, label, connections, latencies, errors, duration, idle, peak):
+        if latencies:
+            p50 = statistics.median(latencies) * 1000
+            p99 = statistics.quantiles(latencies, n=100)[98] * 1000 if len(latencies) > 1 else p50
+        else:
+            p50 = p99 = 0
+        self.stdout.write(
+            f"{label:<8}{connections:>7}{len(latencies) / duration:>10.1f}{p50:>9.2f}{p99:>9.2f}{len(errors):>8}"
+            f"{idle / 1024:>9.1f}{peak / 1024:>9.1f}{(peak - idle) / connections:>9.1f}"
+        )
@@ -0,0 +1,78 @@
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.management.commands.bench_asgi import HOST, free_port
+
+
+def get(port, path, timeout=60):
+    """Request on a new connection; return (status, seconds)."""
+    started = time.perf_counter()
+    conn = http.client.HTTPConnection(HOST, port, timeout=timeout)
+    try:
+        conn.request("GET", path, headers={"Accept": "application/json"})
+        response = conn.getresponse()
+        response.read()
+    finally:
+        conn.close()
+    return response.status, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = (
+        "Start gunicorn with and without the warm-up in gunicorn.conf.py and report the startup time, "
+        "the first request's latency and the steady-state latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default="/api/chefs-list/")
+        parser.add_argument("--runs", type=int, default=3, help="Server starts per mode.")
+        parser.add_argument("--requests", type=int, default=20, help="Requests after the first one, for the steady state.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'mode':<8}{'listen s':>10}{'ready s':>9}{'first ms':>10}{'steady p50 ms':>15}")
+        for mode, warmup in (("cold", "0"), ("warm", "1")):
+            runs = [self.run(warmup, options["path"], options["requests"]) for _ in range(options["runs"])]
+            listen, ready, first, steady = (statistics.median(column) for column in zip(*runs))
+            self.stdout.write(f"{mode:<8}{listen:>10.2f}{ready:>9.2f}{first * 1000:>10.1f}{steady * 1000:>15.1f}")
+
+    def run(self, warmup, path, requests):
+        """One server start: (seconds until listening, seconds until the first response, first and steady latency)."""
+        port = free_port()
+        env = {**os.environ, "WARMUP": warmup}
+        started = time.perf_counter()
+        # One worker, so the first request is sure to hit a fresh one
+        process = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "backend.wsgi:application", "--bind", f"{HOST}:{port}",
+             "--workers", "1", "--log-level", "warning"],
+            cwd=settings.BASE_DIR, env=env,
+        )
+        try:
+            listen = self.wait_listening(process, port, started)
+            status, first = get(port, path)
+            ready = time.perf_counter() - started
+            if status >= 400:
+                raise CommandError(f"{path} returned {status}.")
+            steady = statistics.median(get(port, path)[1] for _ in range(requests))
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+        return listen, ready, first, steady
+
+    def wait_listening(self, process, port, started):
+        while time.perf_counter() - started < 60:
+            if process.poll() is not None:
+                raise CommandError(f"gunicorn exited with status {process.returncode}.")
+            try:
+                socket.create_connection((HOST, port), timeout=1).close()
+                return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise CommandError(f"gunicorn didn't start listening on port {port}.")
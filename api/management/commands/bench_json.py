@@ -0,0 +1,83 @@
+import io
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api.management.commands.bench_api import ROUTES, Command as BenchApiCommand, bench_settings
+from api.management.commands.seed_load_data import PASSWORD
+from api.models import User
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer, orjson
+from api.serializers import UserSerializer
+
+# Endpoints with the largest response bodies
+PAYLOAD_ROUTES = [
+    "chefs_list", "featured-Chef", "chef_dishes", "dish-catalog", "get_dish",
+    "customer-bookings", "chef-upcoming-bookings",
+]
+
+
+def per_call(func, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare DRF's stdlib JSON renderer and parser with api.renderers/api.parsers on response "
+        "payloads captured from the endpoints (run seed_load_data first)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=200)
+        parser.add_argument("--password", default=PASSWORD, help="Password of the benchmarked users (seed_load_data's by default).")
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stderr.write("orjson isn't installed, the fast renderer and parser fall back to the stdlib.")
+        bench = BenchApiCommand()
+        with bench_settings():
+            ctx = bench.prepare(options["password"])
+            payloads = [(route.name, self.capture(bench, route, ctx)) for route in ROUTES if route.name in PAYLOAD_ROUTES]
+        # Every chef at once, for a payload far bigger than one page
+        chefs = User.objects.filter(role="chef").select_related('chefprofile').order_by('id')
+        payloads.append(("all chefs", UserSerializer(chefs, many=True).data))
+
+        self.stdout.write(
+            f"{'payload':<24}{'KB':>8}{'render std µs':>15}{'fast µs':>10}{'x':>6}"
+            f"{'parse std µs':>14}{'fast µs':>10}{'x':>6}{'same':>6}"
+        )
+        for name, data in payloads:
+            self.report(name, data, options["iterations"])
+
+    def capture(self, bench, route, ctx):
+        client = bench.client_for(route, ctx)
+        if route.write:
+            with transaction.atomic():
+                response = bench.request(client, route, ctx, 0)
+                transaction.set_rollback(True)
+        else:
+            response = bench.request(client, route, ctx, 0)
+        if response.status_code >= 400:
+            raise CommandError(f"{route.name} returned {response.status_code}.")
+        return response.data
+
+    def report(self, name, data, iterations):
+        std_renderer, fast_renderer = JSONRenderer(), FastJSONRenderer()
+        body = std_renderer.render(data)
+        same = fast_renderer.render(data) == body
+
+        render_std = per_call(lambda: std_renderer.render(data), iterations)
+        render_fast = per_call(lambda: fast_renderer.render(data), iterations)
+        parse_std = per_call(lambda: JSONParser().parse(io.BytesIO(body)), iterations)
+        parse_fast = per_call(lambda: FastJSONParser().parse(io.BytesIO(body)), iterations)
+        self.stdout.write(
+            f"{name:<24}{len(body) / 1024:>8.1f}{render_std * 1e6:>15.1f}{render_fast * 1e6:>10.1f}"
+            f"{render_std / render_fast:>6.1f}{parse_std * 1e6:>14.1f}{parse_fast * 1e6:>10.1f}"
+            f"{parse_std / parse_fast:>6.1f}{'yes' if same else 'NO':>6}"
+        )
@@ -0,0 +1,120 @@
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+SCHEMA = """
+CREATE TABLE booking (
+    id INTEGER PRIMARY KEY,
+    chef_id INTEGER NOT NULL,
+    customer_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX booking_chef ON booking (chef_id);
+"""
+
+
+def connect(path, managed, pragmas):
+    conn = sqlite3.connect(path, timeout=5 if not managed else 20, isolation_level=None)
+    if managed:
+        for name, value in pragmas.items():
+            conn.execute(f"PRAGMA {name}={value}")
+    return conn
+
+
+def run_worker(path, managed, pragmas, seconds, write_ratio, seed):
+    """One simulated gunicorn worker issuing booking reads and writes until the deadline."""
+    rng = random.Random(seed)
+    conn = connect(path, managed, pragmas) if managed else None
+    reads, writes, errors, latencies = 0, 0, 0, []
+    deadline = time.perf_counter() + seconds
+
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        # Without CONN_MAX_AGE every request opens the database again
+        c = conn or connect(path, managed, pragmas)
+        try:
+            if rng.random() < write_ratio:
+                c.execute("BEGIN IMMEDIATE" if managed else "BEGIN")
+                c.execute(
+                    "INSERT INTO booking (chef_id, customer_id, status, created_at) VALUES (?, ?, 'pending', ?)",
+                    (rng.randint(1, 200), rng.randint(1, 2000), time.time()),
+                )
+                c.execute("COMMIT")
+                writes += 1
+            else:
+                c.execute("SELECT id, status FROM booking WHERE chef_id = ? ORDER BY id DESC LIMIT 8", (rng.randint(1, 200),)).fetchall()
+                reads += 1
+            latencies.append(time.perf_counter() - started)
+        except sqlite3.OperationalError:
+            errors += 1
+            if c.in_transaction:
+                c.execute("ROLLBACK")
+        finally:
+            if conn is None:
+                c.close()
+    if conn is not None:
+        conn.close()
+    return reads, writes, errors, latencies
+
+
+class Command(BaseCommand):
+    help = "Compare SQLite read/write throughput with default settings vs. the managed SQLITE_PRAGMAS profile."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4, help="Concurrent processes, like gunicorn workers.")
+        parser.add_argument("--seconds", type=float, default=5)
+        parser.add_argument("--write-ratio", type=float, default=0.2)
+        parser.add_argument("--rows", type=int, default=20000, help="Bookings to seed before the run.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{options['workers']} workers, {options['seconds']}s per profile, {options['write_ratio']:.0%} writes\n"
+        )
+        self.stdout.write(f"{'profile':<10}{'reads/s':>10}{'writes/s':>10}{'locked':>8}{'p50 ms':>9}{'p99 ms':>9}")
+        for label, managed in (("default", False), ("managed", True)):
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "bench.sqlite3")
+                self.seed(path, managed, options["rows"])
+                self.report(label, self.run_profile(path, managed, options), options["seconds"])
+
+    def seed(self, path, managed, rows):
+        conn = connect(path, managed, settings.SQLITE_PRAGMAS)
+        conn.executescript(SCHEMA)
+        rng = random.Random(0)
+        conn.execute("BEGIN")
+        conn.executemany(
+            "INSERT INTO booking (chef_id, customer_id, status, created_at) VALUES (?, ?, 'pending', ?)",
+            ((rng.randint(1, 200), rng.randint(1, 2000), time.time()) for _ in range(rows)),
+        )
+        conn.execute("COMMIT")
+        conn.close()
+
+    def run_profile(self, path, managed, options):
+        with ProcessPoolExecutor(max_workers=options["workers"]) as pool:
+            futures = [
+                pool.submit(run_worker, path, managed, settings.SQLITE_PRAGMAS, options["seconds"], options["write_ratio"], seed)
+                for seed in range(options["workers"])
+            ]
+            return [f.result() for f in futures]
+
+    def report(self, label, results, seconds):
+        reads = sum(r[0] for r in results)
+        writes = sum(r[1] for r in results)
+        errors = sum(r[2] for r in results)
+        latencies = sorted(l for r in results for l in r[3])
+        if latencies:
+            p50 = statistics.median(latencies) * 1000
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+        else:
+            p50 = p99 = 0
+        self.stdout.write(
+            f"{label:<10}{reads / seconds:>10.0f}{writes / seconds:>10.0f}{errors:>8}{p50:>9.2f}{p99:>9.2f}"
+        )
@@ -0,0 +1,74 @@
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test.utils import override_settings
+
+from api.writer import run_write
+
+TABLE = "bench_write_queue"
+
+
+def insert_row(value):
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {TABLE} (value, created_at) VALUES (%s, %s)", [value, time.time()])
+
+
+class Command(BaseCommand):
+    help = "Measure write latency with many concurrent request threads, with and without the single-writer queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=32)
+        parser.add_argument("--writes", type=int, default=100, help="Writes per thread.")
+
+    def handle(self, *args, **options):
+        with connection.cursor() as cursor:
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {TABLE} (id INTEGER PRIMARY KEY, value INTEGER, created_at REAL)")
+        try:
+            self.stdout.write(f"{'mode':<8}{'writes/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+            for label, enabled in (("inline", False), ("queue", True)):
+                with override_settings(WRITE_QUEUE={**settings.WRITE_QUEUE, "ENABLED": enabled}):
+                    self.report(label, *self.run_threads(options["threads"], options["writes"]))
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+    def run_threads(self, thread_count, writes):
+        latencies, errors = [], []
+        lock = threading.Lock()
+        start = threading.Barrier(thread_count)
+
+        def worker():
+            local, failed = [], 0
+            start.wait()
+            for i in range(writes):
+                began = time.perf_counter()
+                try:
+                    run_write(insert_row, i)
+                except Exception:
+                    failed += 1
+                local.append(time.perf_counter() - began)
+            connections.close_all()
+            with lock:
+                latencies.extend(local)
+                errors.append(failed)
+
+        threads = [threading.Thread(target=worker) for _ in range(thread_count)]
+        began = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return sorted(latencies), sum(errors), time.perf_counter() - began
+
+    def report(self, label, latencies, errors, elapsed):
+        def pct(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+        self.stdout.write(
+            f"{label:<8}{len(latencies) / elapsed:>10.0f}{statistics.median(latencies) * 1000:>9.2f}"
+            f"{pct(0.95):>9.2f}{pct(0.99):>9.2f}{errors:>8}"
+        )
@@ -0,0 +1,210 @@
+import http.client
+import threading
+import time
+from http.cookies import CookieError, SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+HOP_BY_HOP = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailers", "transfer-encoding", "upgrade",
+}
+
+
+class Entry:
+
+    def __init__(self, status, headers, body, vary, s_maxage, stale, keys):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.vary = vary  # {request header: value it had}
+        self.s_maxage = s_maxage
+        self.stale = stale
+        self.keys = keys
+        self.stored = time.monotonic()
+        self.refreshing = False
+
+    def age(self):
+        return time.monotonic() - self.stored
+
+
+class Store:
+    """Responses by path, one entry per combination of the Vary request headers."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+
+    def lookup(self, path, request_headers):
+        with self.lock:
+            for entry in self.entries.get(path, []):
+                if all(request_headers.get(name, "") == value for name, value in entry.vary.items()):
+                    return entry
+        return None
+
+    def store(self, path, entry):
+        with self.lock:
+            variants = [e for e in self.entries.get(path, []) if e.vary != entry.vary]
+            self.entries[path] = variants + [entry]
+
+    def purge(self, keys):
+        removed = 0
+        with self.lock:
+            for path, variants in list(self.entries.items()):
+                kept = [e for e in variants if not e.keys & keys]
+                removed += len(variants) - len(kept)
+                self.entries[path] = kept
+        return removed
+
+
+def cache_control(header):
+    """Cache-Control as {directive: value or True}."""
+    directives = {}
+    for part in header.split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.strip().lower()] = value.strip().strip('"') or True
+    return directives
+
+
+def cache_lifetime(headers):
+    """(s-maxage, stale-while-revalidate) if a shared cache may store the response, else None."""
+    names = {name.lower() for name, _ in headers}
+    values = {name.lower(): value for name, value in headers}
+    if "set-cookie" in names or values.get("vary", "").strip() == "*":
+        return None
+    directives = cache_control(values.get("cache-control", ""))
+    if "public" not in directives or "private" in directives or "no-store" in directives:
+        return None
+    try:
+        s_maxage = int(directives.get("s-maxage", 0))
+        stale = int(directives.get("stale-while-revalidate", 0))
+    except (TypeError, ValueError):
+        return None
+    return (s_maxage, stale) if s_maxage > 0 else None
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a small caching reverse proxy in front of the API, for testing the Cache-Control, Vary and "
+        "surrogate-key headers locally. It honours s-maxage and stale-while-revalidate, passes requests "
+        "with a session cookie or Authorization header through, and drops entries on "
+        "`PURGE` requests carrying a Surrogate-Key header (set CDN_PURGE_URL to this proxy)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--port", type=int, default=8080)
+        parser.add_argument("--upstream", default="http://127.0.0.1:8000")
+
+    def handle(self, *args, **options):
+        upstream = urlsplit(options["upstream"])
+        store = Store()
+        stdout = self.stdout
+        key_header = settings.CDN["SURROGATE_KEY_HEADER"]
+        session_cookie = settings.SESSION_COOKIE_NAME
+
+        def fetch(method, path, headers, body=None):
+            conn = http.client.HTTPConnection(upstream.hostname, upstream.port or 80, timeout=60)
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                content = response.read()
+            finally:
+                conn.close()
+            return response.status, [(k, v) for k, v in response.getheaders() if k.lower() not in HOP_BY_HOP], content
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def request_headers(self):
+                return {k: v for k, v in self.headers.items() if k.lower() not in HOP_BY_HOP}
+
+            def bypass(self):
+                if "Authorization" in self.headers:
+                    return True
+                try:
+                    return session_cookie in SimpleCookie(self.headers.get("Cookie", ""))
+                except CookieError:
+                    return True
+
+            def send(self, status, headers, body, cache_status, age=None):
+                self.send_response(status)
+                for name, value in headers:
+                    if name.lower() != "content-length":
+                        self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("X-Cache", cache_status)
+                if age is not None:
+                    self.send_header("Age", str(int(age)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(body)
+                stdout.write(f"{cache_status:<7} {self.command} {self.path} -> {status}")
+
+            def store(self, status, headers, body):
+                lifetime = cache_lifetime(headers) if status == 200 else None
+                if lifetime is None:
+                    return False
+                values = {name.lower(): value for name, value in headers}
+                vary = [v.strip() for v in values.get("vary", "").split(",") if v.strip()]
+                store.store(self.path, Entry(
+                    status, headers, body, {name: self.headers.get(name, "") for name in vary},
+                    *lifetime, set(values.get(key_header.lower(), "").split()),
+                ))
+                return True
+
+            def refresh(self, entry, headers):
+                try:
+                    status, response_headers, body = fetch("GET", self.path, headers)
+                    if not self.store(status, response_headers, body):
+                        store.purge(entry.keys)
+                finally:
+                    entry.refreshing = False
+
+            def do_GET(self):
+                headers = self.request_headers()
+                if self.bypass():
+                    return self.send(*fetch(self.command, self.path, headers), "BYPASS")
+                entry = store.lookup(self.path, self.headers)
+                if entry is not None:
+                    age = entry.age()
+                    if age < entry.s_maxage:
+                        return self.send(entry.status, entry.headers, entry.body, "HIT", age)
+                    if age < entry.s_maxage + entry.stale:
+                        if not entry.refreshing:
+                            entry.refreshing = True
+                            threading.Thread(target=self.refresh, args=(entry, headers), daemon=True).start()
+                        return self.send(entry.status, entry.headers, entry.body, "STALE", age)
+                status, response_headers, body = fetch("GET", self.path, headers)
+                self.store(status, response_headers, body)
+                self.send(status, response_headers, body, "MISS")
+
+            do_HEAD = do_GET
+
+            def forward(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else None
+                self.send(*fetch(self.command, self.path, self.request_headers(), body), "BYPASS")
+
+            do_POST = do_PUT = do_PATCH = do_DELETE = do_OPTIONS = forward
+
+            def do_PURGE(self):
+                keys = set(self.headers.get(key_header, "").split())
+                removed = store.purge(keys)
+                self.send(200, [("Content-Type", "text/plain")], f"purged {removed}\n".encode(), "PURGE")
+                stdout.write(f"        keys: {' '.join(sorted(keys))}")
+
+        server = ThreadingHTTPServer(("127.0.0.1", options["port"]), Handler)
+        self.stdout.write(f"Caching proxy on http://127.0.0.1:{options['port']}/ for {options['upstream']}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,52 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.media_gc import delete_media, is_protected, iter_media_files, referenced_media_names
+
+
+class Command(BaseCommand):
+    help = "Delete uploaded media files that no Dish or ChefProfile references any more."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="List orphaned files without deleting them.")
+        parser.add_argument("--batch-size", type=int, default=settings.MEDIA_GC_BATCH_SIZE)
+        parser.add_argument(
+            "--min-age", type=int, default=60 * 60,
+            help="Skip files modified in the last N seconds (uploads whose row is not committed yet).",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        batch_size = options["batch_size"]
+        cutoff = time.time() - options["min_age"]
+
+        referenced = referenced_media_names()
+        scanned = orphaned = deleted = freed = 0
+        batch = []
+
+        def flush():
+            nonlocal deleted
+            if dry_run:
+                for name in batch:
+                    self.stdout.write(name)
+            else:
+                deleted += delete_media(batch)
+            batch.clear()
+
+        for name, stat in iter_media_files(settings.MEDIA_ROOT, settings.MEDIA_GC_DIRS):
+            scanned += 1
+            if name in referenced or is_protected(name) or stat.st_mtime > cutoff:
+                continue
+            orphaned += 1
+            freed += stat.st_size
+            batch.append(name)
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+
+        action = "would be deleted" if dry_run else f"deleted {deleted}"
+        self.stdout.write(self.style.SUCCESS(
+            f"Scanned {scanned} files, {orphaned} orphaned ({freed / 1024:.1f} KiB), {action}."
+        ))
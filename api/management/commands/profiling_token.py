@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from api.profiling import make_token
+
+
+class Command(BaseCommand):
+    help = "Print a token for the X-Profile header; requests carrying it are profiled (see api/profiling.py)."
+
+    def handle(self, *args, **options):
+        self.stdout.write(make_token())
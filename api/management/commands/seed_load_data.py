@@ -0,0 +1,192 @@
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from api.models import Booking, ChefProfile, ChefRating, Dish, User
+
+PASSWORD = "loadtest-pass"
+
+FIRST_NAMES = ["Ayesha", "Bilal", "Fatima", "Hamza", "Hina", "Imran", "Kashif", "Maryam", "Nadia", "Omar",
+               "Rabia", "Saad", "Sana", "Usman", "Zainab", "Ali", "Amna", "Farhan", "Mehwish", "Tariq"]
+LAST_NAMES = ["Khan", "Ahmed", "Malik", "Butt", "Qureshi", "Sheikh", "Raza", "Siddiqui", "Chaudhry", "Hussain"]
+CITIES = ["Lahore", "Karachi", "Islamabad", "Rawalpindi", "Faisalabad", "Multan", "Peshawar", "Quetta"]
+SPECIALTIES = ["Desi", "BBQ", "Chinese", "Continental", "Baking", "Seafood", "Vegetarian", "Street food"]
+DISHES = {
+    "breakfast": ["Halwa Puri", "Paratha", "Omelette", "Nihari", "Chana", "Anda Shami", "Lassi", "Pancakes"],
+    "lunch": ["Biryani", "Karahi", "Daal Chawal", "Pulao", "Qorma", "Haleem", "Sabzi", "Kofta"],
+    "dinner": ["Seekh Kabab", "Tikka", "Nihari", "Handi", "Paya", "Fish Fry", "Sajji", "Steak"],
+}
+STYLES = ["Special", "Homestyle", "Spicy", "Classic", "Family", "Deluxe"]
+
+# Share of bookings per status, for past and for upcoming dates
+PAST_STATUSES = [("completed", 60), ("expired", 15), ("cancelled", 15), ("rejected", 10)]
+UPCOMING_STATUSES = [("pending", 45), ("confirmed", 35), ("cancelled", 10), ("rejected", 10)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a reproducible synthetic dataset (chefs with profiles, dishes, customers, bookings and "
+        "ratings) for load testing. Generated users share the password '%s'." % PASSWORD
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chefs", type=int, default=1000)
+        parser.add_argument("--customers", type=int, default=5000)
+        parser.add_argument("--dishes-per-chef", type=int, default=12)
+        parser.add_argument("--bookings", type=int, default=100000)
+        parser.add_argument("--ratings-per-chef", type=int, default=20)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--prefix", default="load", help="Username prefix of generated users.")
+        parser.add_argument("--clear", action="store_true", help="Delete previously generated users (and their data) first.")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        prefix = options["prefix"]
+        generated = User.objects.filter(username__startswith=f"{prefix}_")
+
+        if options["clear"]:
+            deleted, _ = generated.delete()
+            self.stdout.write(f"Deleted {deleted} rows from a previous run")
+        elif generated.exists():
+            raise CommandError(f"Users with prefix '{prefix}_' exist already; use --clear or another --prefix.")
+        if options["ratings_per_chef"] > options["customers"]:
+            raise CommandError("--ratings-per-chef can't exceed --customers.")
+
+        with transaction.atomic():
+            chef_ids = self.create_users(prefix, "chef", options["chefs"])
+            customer_ids = self.create_users(prefix, "customer", options["customers"])
+            ratings = self.create_ratings(chef_ids, customer_ids, options["ratings_per_chef"])
+            self.create_profiles(chef_ids, ratings)
+            dishes = self.create_dishes(chef_ids, options["dishes_per_chef"])
+            self.create_bookings(chef_ids, customer_ids, dishes, options["bookings"])
+
+        self.stdout.write(self.style.SUCCESS("Done"))
+
+    def log(self, label, count):
+        self.stdout.write(f"  {label:<12}{count:>10}")
+
+    def create_users(self, prefix, role, count):
+        password = make_password(PASSWORD)  # hashed once; hashing per user would dominate the run
+        users = []
+        for i in range(count):
+            first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+            username = f"{prefix}_{role}_{i}"
+            users.append(User(
+                username=username, email=f"{username}@example.com", password=password,
+                first_name=first, last_name=last, role=role,
+            ))
+        User.objects.bulk_create(users, batch_size=self.batch_size)
+        ids = list(
+            User.objects.filter(username__startswith=f"{prefix}_{role}_").order_by("id").values_list("id", flat=True)
+        )
+        self.log(f"{role}s", len(ids))
+        return ids
+
+    def create_ratings(self, chef_ids, customer_ids, per_chef):
+        ratings = {}
+        rows = []
+        for chef_id in chef_ids:
+            count = self.rng.randint(0, per_chef)
+            # Most chefs are rated well, a few badly
+            values = [min(5, max(1, round(self.rng.gauss(4.1, 0.9)))) for _ in range(count)]
+            ratings[chef_id] = values
+            for user_id, value in zip(self.rng.sample(customer_ids, count), values):
+                rows.append(ChefRating(chef_id=chef_id, user_id=user_id, rating=value))
+        ChefRating.objects.bulk_create(rows, batch_size=self.batch_size)
+        self.log("ratings", len(rows))
+        return ratings
+
+    def create_profiles(self, chef_ids, ratings):
+        # bulk_create doesn't send post_save, so this stands in for the create_chef_profile signal
+        profiles = []
+        for chef_id in chef_ids:
+            values = ratings[chef_id]
+            available = self.rng.random() < 0.85
+            profiles.append(ChefProfile(
+                user_id=chef_id,
+                full_name=f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}",
+                bio="Home chef cooking fresh meals to order.",
+                experience=self.rng.randint(1, 25),
+                specialties=", ".join(self.rng.sample(SPECIALTIES, 2)),
+                location=self.rng.choice(CITIES),
+                gender=self.rng.choice(["male", "female"]),
+                age=self.rng.randint(21, 65),
+                contact_number=f"03{self.rng.randint(0, 10 ** 9 - 1):09d}",
+                is_available=available,
+                breakfast_available=available and self.rng.random() < 0.7,
+                lunch_available=available and self.rng.random() < 0.9,
+                dinner_available=available and self.rng.random() < 0.9,
+                urgent_booking_available=available and self.rng.random() < 0.6,
+                pre_booking_available=available,
+                average_rating=sum(values) / len(values) if values else 0,
+                total_ratings=len(values),
+            ))
+        ChefProfile.objects.bulk_create(profiles, batch_size=self.batch_size)
+        self.log("profiles", len(profiles))
+
+    def create_dishes(self, chef_ids, per_chef):
+        dishes = []
+        for chef_id in chef_ids:
+            for _ in range(per_chef):
+                meal = self.rng.choice(list(DISHES))
+                dish = Dish(
+                    chef_id=chef_id,
+                    name=f"{self.rng.choice(STYLES)} {self.rng.choice(DISHES[meal])}",
+                    description="Freshly prepared with seasonal ingredients.",
+                    available_time=meal,
+                    serving_number=self.rng.choice([1, 2, 4, 6, 8]),
+                    price=self.rng.randrange(150, 4000, 50),
+                )
+                dish.set_time_range()  # bulk_create skips save()
+                dishes.append(dish)
+        Dish.objects.bulk_create(dishes, batch_size=self.batch_size)
+
+        by_chef = {}
+        for dish_id, chef_id, meal in Dish.objects.filter(chef_id__in=chef_ids).values_list("id", "chef_id", "available_time"):
+            by_chef.setdefault((chef_id, meal), []).append(dish_id)
+        self.log("dishes", len(dishes))
+        return by_chef
+
+    def create_bookings(self, chef_ids, customer_ids, dishes, count):
+        today = timezone.localdate()
+        now = timezone.now()
+        menus = list(dishes.items())
+        past = ([s for s, _ in PAST_STATUSES], [w for _, w in PAST_STATUSES])
+        upcoming = ([s for s, _ in UPCOMING_STATUSES], [w for _, w in UPCOMING_STATUSES])
+        created = 0
+
+        for start in range(0, count, self.batch_size):
+            bookings, menu_picks = [], []
+            for _ in range(min(self.batch_size, count - start)):
+                (chef_id, meal), dish_ids = self.rng.choice(menus)
+                offset = self.rng.randint(-90, 7)
+                statuses, weights = past if offset < 0 else upcoming
+                status = self.rng.choices(statuses, weights)[0]
+                bookings.append(Booking(
+                    customer_id=self.rng.choice(customer_ids),
+                    chef_id=chef_id,
+                    slot=meal,
+                    booking_type="prebooking" if offset > 0 else self.rng.choice(["urgent", "prebooking"]),
+                    date=today + timedelta(days=offset),
+                    address=f"House {self.rng.randint(1, 999)}, Street {self.rng.randint(1, 60)}, {self.rng.choice(CITIES)}",
+                    contact_number=f"03{self.rng.randint(0, 10 ** 9 - 1):09d}",
+                    status=status,
+                    status_updated_at=None if status == "pending" else now,
+                    is_paid=status == "completed" and self.rng.random() < 0.9,
+                ))
+                menu_picks.append(self.rng.sample(dish_ids, min(len(dish_ids), self.rng.randint(1, 3))))
+
+            Booking.objects.bulk_create(bookings)  # SQLite returns the new ids
+            Booking.dishes.through.objects.bulk_create([
+                Booking.dishes.through(booking_id=booking.id, dish_id=dish_id)
+                for booking, picks in zip(bookings, menu_picks)
+                for dish_id in picks
+            ], batch_size=self.batch_size)
+            created += len(bookings)
+        self.log("bookings", created)
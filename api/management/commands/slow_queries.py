@@ -0,0 +1,56 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Summarize the slow-query log (SLOW_QUERY['LOG_FILE']) by query fingerprint, worst total time first."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--file", default=None, help="Log file to read instead of SLOW_QUERY['LOG_FILE'].")
+        parser.add_argument("--top", type=int, default=10)
+        parser.add_argument("--since", type=float, help="Only entries from the last N hours.")
+        parser.add_argument("--view", help="Only queries run by this url_name.")
+
+    def handle(self, *args, **options):
+        path = options["file"] or settings.SLOW_QUERY["LOG_FILE"]
+        since = time.time() - options["since"] * 3600 if options["since"] else None
+        groups = {}
+        try:
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # partially written line
+                    if since and entry["time"] < since:
+                        continue
+                    if options["view"] and entry["view"] != options["view"]:
+                        continue
+                    group = groups.setdefault(entry["fingerprint"], {"durations": [], "views": set(), "last": entry})
+                    group["durations"].append(entry["ms"])
+                    group["views"].add(entry["view"] or "-")
+                    group["last"] = entry
+        except FileNotFoundError:
+            raise CommandError(f"No slow-query log at {path}")
+
+        if not groups:
+            self.stdout.write("No slow queries logged.")
+            return
+        ranked = sorted(groups.items(), key=lambda item: sum(item[1]["durations"]), reverse=True)
+        for rank, (fp, group) in enumerate(ranked[:options["top"]], start=1):
+            durations = sorted(group["durations"])
+            plan = group["last"]["plan"] or []
+            # A SCAN of a table (as opposed to a covering index) usually means a missing index
+            scans = [step for step in plan if "SCAN" in step and "COVERING INDEX" not in step]
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"#{rank}  {len(durations)}x  total {sum(durations):.1f} ms  max {durations[-1]:.1f} ms  "
+                f"median {durations[len(durations) // 2]:.1f} ms  views: {', '.join(sorted(group['views']))}"
+            ))
+            self.stdout.write(f"  {fp}")
+            for step in plan:
+                line = f"    {step}"
+                self.stdout.write(self.style.WARNING(line) if step in scans else line)
+            self.stdout.write("")
@@ -0,0 +1,166 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core import checks
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# MEDIA_SENDFILE_BACKEND value: header that hands the transfer to the proxy
+SENDFILE_HEADERS = {"nginx": "X-Accel-Redirect", "apache": "X-Sendfile"}
+
+
+@checks.register()
+def check_sendfile_backend(app_configs, **kwargs):
+    """A wrong MEDIA_SENDFILE_BACKEND fails at startup rather than on every media request."""
+    backend = settings.MEDIA_SENDFILE_BACKEND
+    if backend and backend not in SENDFILE_HEADERS:
+        return [checks.Error(
+            f"Unknown MEDIA_SENDFILE_BACKEND: {backend!r}.",
+            hint=f"Use one of {', '.join(sorted(SENDFILE_HEADERS))}, or leave it unset to stream files from Django.",
+            id="api.E001",
+        )]
+    return []
+
+
+class RangeFile:
+    """Read-only view over ``length`` bytes of an open file, starting at ``start``."""
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        self.file.seek(start)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b""
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def resolve_media_path(request, path):
+    """Return the absolute path of a media file the request may read, or raise 404."""
+    parts = path.split("/")
+    if any(not part or part.startswith(".") for part in parts):
+        raise Http404("Invalid media path")
+
+    # Uploaded pictures and the admin login logo are public (MEDIA_PUBLIC_DIRS), anything else is staff only.
+    if parts[0] not in settings.MEDIA_PUBLIC_DIRS and not request.user.is_staff:
+        raise Http404("Media file not found")
+
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except ValueError:
+        raise Http404("Invalid media path")
+    if not os.path.isfile(full_path):
+        raise Http404("Media file not found")
+    return full_path
+
+
+def parse_range(header, size):
+    """Parse a single-range ``Range`` header into ``(start, end)``, inclusive.
+
+    Returns ``None`` when the header should be ignored and raises ``ValueError``
+    when the range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:  # suffix range: last N bytes
+        length = int(end)
+        if length == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError("Unsatisfiable range")
+    return start, end
+
+
+@require_safe
+def serve_media(request, path):
+    """Serve a file from MEDIA_ROOT.
+
+    When MEDIA_SENDFILE_BACKEND is set the transfer is handed to the front
+    proxy (X-Accel-Redirect for nginx, X-Sendfile for apache) and no bytes go
+    through Python. Otherwise the file is streamed with ETag, conditional
+    request and single byte-range support.
+    """
+    full_path = resolve_media_path(request, path)
+    stat = os.stat(full_path)
+    etag = '"%x-%x"' % (int(stat.st_mtime), stat.st_size)
+    last_modified = int(stat.st_mtime)
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or "application/octet-stream"
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        patch_cache_control(response, public=True, max_age=settings.MEDIA_CACHE_MAX_AGE)
+        return response
+
+    backend = settings.MEDIA_SENDFILE_BACKEND
+    if backend:
+        # The value is validated by check_sendfile_backend
+        response = HttpResponse(content_type=content_type)
+        if backend == "nginx":
+            response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + path
+        else:
+            response["X-Sendfile"] = full_path
+    else:
+        response = file_response(request, full_path, stat.st_size, etag, last_modified, content_type)
+
+    if encoding:
+        response["Content-Encoding"] = encoding
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(response, public=True, max_age=settings.MEDIA_CACHE_MAX_AGE)
+    return response
+
+
+def file_response(request, full_path, size, etag, last_modified, content_type):
+    byte_range = None
+    range_header = request.META.get("HTTP_RANGE")
+    if range_header and if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+    if byte_range is None:
+        # A plain file object lets the WSGI server use sendfile().
+        response = FileResponse(open(full_path, "rb"), content_type=content_type)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(RangeFile(open(full_path, "rb"), start, length), status=206, content_type=content_type)
+        response["Content-Length"] = str(length)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+def if_range_matches(request, etag, last_modified):
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if not if_range:
+        return True
+    if if_range.startswith(('"', "W/")):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
@@ -0,0 +1,122 @@
+import logging
+import os
+import queue
+import threading
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousOperation
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+_pending = queue.Queue(maxsize=10000)
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def is_protected(name):
+    """Shared default pictures are never deleted."""
+    return not name or name.startswith("defaults/")
+
+
+def referenced_media_names(names=None):
+    """Return the media names still referenced by a Dish or ChefProfile.
+
+    With ``names`` only those names are checked, otherwise every reference is loaded.
+    """
+    from .models import ChefProfile, Dish
+
+    dishes = Dish.objects.values_list("picture", flat=True)
+    profiles = ChefProfile.objects.values_list("profile_picture", flat=True)
+    if names is not None:
+        dishes = dishes.filter(picture__in=names)
+        profiles = profiles.filter(profile_picture__in=names)
+    referenced = set(dishes.iterator(chunk_size=2000))
+    referenced.update(profiles.iterator(chunk_size=2000))
+    return referenced
+
+
+def iter_media_files(root, dirs):
+    """Yield ``(name, stat)`` for every file under the given MEDIA_ROOT subdirectories.
+
+    The tree is walked lazily with ``os.scandir`` so large directories never
+    have to be listed in memory. Names use "/" like FieldFile names do.
+    """
+    stack = [os.path.join(root, d) for d in dirs]
+    while stack:
+        path = stack.pop()
+        try:
+            entries = os.scandir(path)
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    name = os.path.relpath(entry.path, root).replace(os.sep, "/")
+                    yield name, entry.stat(follow_symlinks=False)
+
+
+def delete_media(names):
+    """Delete media files, skipping protected names. Returns the number removed."""
+    deleted = 0
+    for name in names:
+        if is_protected(name):
+            continue
+        try:
+            default_storage.delete(name)
+            deleted += 1
+        except (OSError, SuspiciousOperation):
+            logger.warning("Could not delete media file %s", name, exc_info=True)
+    return deleted
+
+
+def queue_media_delete(name):
+    """Delete a media file off the request path once the current transaction commits.
+
+    Call it once the row no longer points at ``name``: the file is only
+    removed if nothing references it by the time the background worker gets
+    to it, and outside a transaction that can be right away. Anything the worker misses (e.g. a
+    restart) is picked up later by the ``gc_media`` command.
+    """
+    if is_protected(name):
+        return
+    transaction.on_commit(lambda: _enqueue(name))
+
+
+def _enqueue(name):
+    _ensure_worker()
+    try:
+        _pending.put_nowait(name)
+    except queue.Full:
+        logger.warning("Media delete queue is full, leaving %s for gc_media", name)
+
+
+def _ensure_worker():
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run_worker, name="media-gc", daemon=True)
+            _worker.start()
+
+
+def _run_worker():
+    batch_size = settings.MEDIA_GC_BATCH_SIZE
+    while True:
+        batch = [_pending.get()]
+        while len(batch) < batch_size:
+            try:
+                batch.append(_pending.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            still_used = referenced_media_names(batch)
+            delete_media(name for name in set(batch) if name not in still_used)
+        except Exception:
+            logger.exception("Deferred media delete failed")
+        finally:
+            connection.close()
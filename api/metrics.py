@@ -0,0 +1,218 @@
+"""
+Per-route request metrics in Prometheus text format.
+
+Each thread counts into its own dict, so recording takes no lock; /metrics
+sums the per-thread shards. With METRICS["MULTIPROC_DIR"] set, every worker
+process also writes its totals to <dir>/metrics-<pid>.json at most every
+DUMP_INTERVAL seconds (and on each scrape), and /metrics adds up all the
+files, so any gunicorn worker can answer the scrape. gunicorn.conf.py
+clears the directory when the master starts.
+
+/metrics answers requests from METRICS["ALLOWED_IPS"] that carry
+"Authorization: Bearer <METRICS["TOKEN"]>" when a token is set. Behind a
+front proxy every request comes from the proxy's address, so the token (or
+a deny rule in the proxy) is what keeps the endpoint private there.
+"""
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core import checks
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_safe
+
+PREFIX = "easycook"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+HELP = {
+    "request_duration_seconds": ("histogram", "Request latency by route."),
+    "responses_total": ("counter", "Responses by route and status code."),
+    "db_queries_total": ("counter", "Database queries run by requests to the route."),
+    "db_duration_seconds_total": ("counter", "Time spent in database queries."),
+    "session_io_seconds_total": ("counter", "Time spent loading and saving sessions."),
+    "response_bytes_total": ("counter", "Response body bytes as sent, after compression (non-streaming responses)."),
+    "compression_input_bytes_total": ("counter", "Response bytes before compression, by route and encoding."),
+    "compression_output_bytes_total": ("counter", "Response bytes after compression, by route and encoding."),
+    "compression_cpu_seconds_total": ("counter", "CPU time spent compressing responses."),
+}
+
+
+class Registry:
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()  # only taken when a thread records for the first time
+
+    def _shard(self):
+        shard = getattr(self._local, "counters", None)
+        if shard is None:
+            shard = self._local.counters = defaultdict(float)
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def inc(self, name, labels, value=1):
+        self._shard()[(name, labels)] += value
+
+    def observe(self, name, labels, value):
+        shard = self._shard()
+        for le in LATENCY_BUCKETS:
+            # Cumulative buckets; empty ones are still written so every series has all of them
+            shard[(name + "_bucket", labels + (("le", str(le)),))] += value <= le
+        shard[(name + "_bucket", labels + (("le", "+Inf"),))] += 1
+        shard[(name + "_sum", labels)] += value
+        shard[(name + "_count", labels)] += 1
+
+    def snapshot(self):
+        with self._shards_lock:
+            shards = list(self._shards)
+        totals = defaultdict(float)
+        for shard in shards:
+            for key, value in shard.copy().items():
+                totals[key] += value
+        return totals
+
+
+registry = Registry()
+_last_dump = 0.0
+_dump_lock = threading.Lock()
+
+
+def route_label(request):
+    match = request.resolver_match
+    return (match.url_name or match.view_name) if match else "unmatched"
+
+
+def record_request(request, response, duration):
+    labels = (("route", route_label(request)), ("method", request.method))
+    registry.observe("request_duration_seconds", labels, duration)
+    registry.inc("responses_total", labels + (("status", str(response.status_code)),))
+
+    stats = getattr(request, "query_stats", None)
+    if stats is not None:
+        registry.inc("db_queries_total", labels, stats.count)
+        registry.inc("db_duration_seconds_total", labels, stats.duration)
+    session_io = getattr(request, "session_io", None)
+    if session_io:
+        registry.inc("session_io_seconds_total", labels, session_io.duration)
+    if not response.streaming:
+        registry.inc("response_bytes_total", labels, len(response.content))
+
+    if settings.METRICS["MULTIPROC_DIR"] and time.monotonic() - _last_dump > settings.METRICS["DUMP_INTERVAL"]:
+        dump()
+
+
+def record_compression(route, encoding, raw, compressed, cpu_seconds):
+    if not settings.METRICS["ENABLED"]:
+        return
+    labels = (("route", route), ("encoding", encoding))
+    registry.inc("compression_input_bytes_total", labels, raw)
+    registry.inc("compression_output_bytes_total", labels, compressed)
+    registry.inc("compression_cpu_seconds_total", labels, cpu_seconds)
+
+
+def dump():
+    """Write this process's totals to the multiprocess directory (skipped if another thread is at it)."""
+    global _last_dump
+    if not _dump_lock.acquire(blocking=False):
+        return
+    try:
+        _last_dump = time.monotonic()
+        directory = settings.METRICS["MULTIPROC_DIR"]
+        path = os.path.join(directory, f"metrics-{os.getpid()}.json")
+        rows = [[name, list(labels), value] for (name, labels), value in registry.snapshot().items()]
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(rows, f)
+        os.replace(tmp, path)
+    finally:
+        _dump_lock.release()
+
+
+def clear():
+    """Remove the files of earlier worker processes."""
+    directory = settings.METRICS["MULTIPROC_DIR"]
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    for entry in os.scandir(directory):
+        if entry.name.startswith("metrics-"):
+            os.remove(entry.path)
+
+
+def collect():
+    directory = settings.METRICS["MULTIPROC_DIR"]
+    if not directory:
+        return registry.snapshot()
+    dump()
+    totals = defaultdict(float)
+    for entry in os.scandir(directory):
+        if not (entry.name.startswith("metrics-") and entry.name.endswith(".json")):
+            continue
+        try:
+            with open(entry.path) as f:
+                rows = json.load(f)
+        except (OSError, ValueError):
+            continue  # a worker is replacing it or it is damaged
+        for name, labels, value in rows:
+            totals[(name, tuple(tuple(pair) for pair in labels))] += value
+    return totals
+
+
+def render(totals):
+    lines = []
+    by_metric = defaultdict(list)
+    for (name, labels), value in totals.items():
+        base = next((m for m in HELP if name == m or name.startswith(m + "_")), name)
+        by_metric[base].append((name, labels, value))
+
+    for base in sorted(by_metric):
+        kind, text = HELP.get(base, ("untyped", base))
+        lines.append(f"# HELP {PREFIX}_{base} {text}")
+        lines.append(f"# TYPE {PREFIX}_{base} {kind}")
+        for name, labels, value in sorted(by_metric[base], key=sort_key):
+            label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+            lines.append(f"{PREFIX}_{name}{{{label_text}}} {float(value)!r}")
+    return "\n".join(lines) + "\n"
+
+
+def sort_key(row):
+    name, labels, _ = row
+    # Keep histogram buckets in numeric order
+    le = dict(labels).get("le")
+    return (tuple(pair for pair in labels if pair[0] != "le"), name, float(le) if le else 0)
+
+
+@checks.register(deploy=True)
+def check_metrics_access(app_configs, **kwargs):
+    """`check --deploy` warns when a front proxy makes /metrics look local to every client."""
+    config = settings.METRICS
+    loopback = {"127.0.0.1", "::1"} & set(config["ALLOWED_IPS"])
+    if settings.MEDIA_SENDFILE_BACKEND and loopback and not config["TOKEN"]:
+        return [checks.Warning(
+            "/metrics trusts loopback addresses, which every request has behind the front proxy.",
+            hint="Set METRICS_TOKEN, or deny /metrics in the proxy and scrape gunicorn directly.",
+            id="api.W001",
+        )]
+    return []
+
+
+def scrape_allowed(request):
+    config = settings.METRICS
+    if request.META.get("REMOTE_ADDR") not in config["ALLOWED_IPS"]:
+        return False
+    if not config["TOKEN"]:
+        return True
+    return constant_time_compare(request.META.get("HTTP_AUTHORIZATION", ""), f"Bearer {config['TOKEN']}")
+
+
+@require_safe
+def metrics_view(request):
+    if not scrape_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(render(collect()), content_type="text/plain; version=0.0.4; charset=utf-8")
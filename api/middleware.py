@@ -0,0 +1,260 @@
+import logging
+import re
+import uuid
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from .caching import strip_cookies
+from .compression import choose_encoding, compress_response
+from .context import current_request
+from .dbstats import QueryStats, budget_problems, start_recording, stop_recording
+from .metrics import record_request, route_label
+from .profiling import QUERY_PARAM, ProfileRun, should_profile
+from .routers import SAFE_METHODS, replica_configured
+from .sessions import SessionIOStats, current_session_io
+
+logger = logging.getLogger(__name__)
+
+REQUEST_ID_RE = re.compile(r"[A-Za-z0-9._-]{1,64}")
+
+
+class HookMiddleware:
+    """
+    Base for the middleware below. Subclasses implement before(), cleanup()
+    and after(); they run inline on both the WSGI and the ASGI stack, so
+    async views aren't pushed through a thread for them. cleanup() always
+    runs, in the same context as before(), and undoes its context variables.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self.before(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            self.cleanup(request, state)
+        return self.after(request, response, state)
+
+    async def __acall__(self, request):
+        state = self.before(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            self.cleanup(request, state)
+        return self.after(request, response, state)
+
+    def before(self, request):
+        return None
+
+    def cleanup(self, request, state):
+        pass
+
+    def after(self, request, response, state):
+        return response
+
+
+class RequestContextMiddleware(HookMiddleware):
+    """
+    Makes the request available through api.context.current_request and
+    gives it an id for the logs: the proxy's X-Request-ID when it sends a
+    sane one, otherwise a new one. The id is echoed in the response.
+    """
+
+    def before(self, request):
+        request_id = request.headers.get("X-Request-ID", "")
+        request.request_id = request_id if REQUEST_ID_RE.fullmatch(request_id) else uuid.uuid4().hex
+        return current_request.set(request)
+
+    def cleanup(self, request, token):
+        current_request.reset(token)
+
+    def after(self, request, response, token):
+        response["X-Request-ID"] = request.request_id
+        return response
+
+
+class SessionIOMiddleware(HookMiddleware):
+    """
+    Counts session store loads/DB reads/writes for each request and reports them
+    in a Server-Timing header. Must sit above SessionMiddleware so the
+    response-phase save is included.
+    """
+
+    def before(self, request):
+        stats = SessionIOStats()
+        return stats, current_session_io.set(stats)
+
+    def cleanup(self, request, state):
+        current_session_io.reset(state[1])
+
+    def after(self, request, response, state):
+        stats = request.session_io = state[0]
+        if stats:
+            timing = response.get("Server-Timing")
+            response["Server-Timing"] = f"{timing}, {stats.server_timing()}" if timing else stats.server_timing()
+            logger.debug("session io %s %s: %s", request.method, request.path, stats.server_timing())
+        return response
+
+
+class ReadReplicaMiddleware(HookMiddleware):
+    """
+    Reads for safe requests to READ_REPLICA_VIEWS go to the read replica
+    (see api.routers). After a client sends a write it gets a short-lived
+    pin cookie, and while that cookie is present its reads stay on the
+    primary so it sees its own writes despite replication lag. Without a
+    replica there is nothing to pin, so no cookie is set.
+    """
+
+    def after(self, request, response, state):
+        if request.method not in SAFE_METHODS and response.status_code < 400 and replica_configured():
+            response.set_cookie(
+                settings.READ_REPLICA_PIN_COOKIE, "1",
+                max_age=settings.READ_REPLICA_PIN_SECONDS,
+                httponly=True,
+                secure=settings.SESSION_COOKIE_SECURE,
+                samesite=settings.SESSION_COOKIE_SAMESITE,
+            )
+        return response
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryBudgetMiddleware(HookMiddleware):
+    """
+    Records query count, DB time and repeated SQL for each request and checks
+    them against QUERY_BUDGET. With ACTION "log" an exceeded budget or an
+    N+1 pattern is logged; with "raise" the request fails. The test helpers
+    in api.testing don't depend on ACTION: they pass request.query_stats to
+    budget_problems() themselves.
+    """
+
+    def before(self, request):
+        stats = QueryStats()
+        return stats, start_recording(stats)
+
+    def cleanup(self, request, state):
+        stop_recording(state[1])
+
+    def after(self, request, response, state):
+        stats = request.query_stats = state[0]
+        config = settings.QUERY_BUDGET
+        if config["HEADERS"]:
+            response["X-DB-Queries"] = str(stats.count)
+            response["X-DB-Time"] = f"{stats.duration * 1000:.2f}"
+            response["X-DB-Duplicates"] = str(len(stats.duplicates(config["DUPLICATE_THRESHOLD"])))
+        check_query_budget(request, stats)
+        return response
+
+
+def check_query_budget(request, stats):
+    """Logs, or with ACTION "raise" raises, what is wrong with the request's queries."""
+    config = settings.QUERY_BUDGET
+    match = request.resolver_match
+    view = match.url_name if match else None
+    problems = budget_problems(stats, view, config)
+    if problems:
+        message = f"{request.method} {request.path} ({view}): " + "; ".join(problems)
+        if config["ACTION"] == "raise":
+            raise QueryBudgetExceeded(message)
+        logger.warning("Query budget exceeded: %s", message)
+
+
+class MetricsMiddleware(HookMiddleware):
+    """
+    Records latency, status, DB time, session I/O and response size per
+    resolved route for /metrics. Sits above SessionIOMiddleware and
+    QueryBudgetMiddleware so their per-request stats are available.
+    """
+
+    def before(self, request):
+        return perf_counter() if settings.METRICS["ENABLED"] else None
+
+    def after(self, request, response, started):
+        if started is not None:
+            record_request(request, response, perf_counter() - started)
+        return response
+
+
+class CompressionMiddleware(HookMiddleware):
+    """
+    Compresses responses of the COMPRESSION["CONTENT_TYPES"] with brotli or
+    gzip (api.compression), when they are at least MIN_SIZE bytes or
+    streamed. Sits right below MetricsMiddleware, so request latency
+    includes compression and response_bytes_total counts the bytes sent.
+    """
+
+    def after(self, request, response, state):
+        config = settings.COMPRESSION
+        if not config["ENABLED"] or response.has_header("Content-Encoding"):
+            return response
+        if response.get("Content-Type", "").split(";")[0].strip() not in config["CONTENT_TYPES"]:
+            return response
+        if not response.streaming and len(response.content) < config["MIN_SIZE"]:
+            return response
+        route = route_label(request)
+        if route in config["EXCLUDE_VIEWS"]:
+            return response
+
+        # Set even when this client gets the plain body, so caches keep both variants apart
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = choose_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding:
+            compress_response(response, encoding, route)
+        return response
+
+
+class CachePolicyMiddleware(HookMiddleware):
+    """
+    Finishes responses that api.caching.cache_public made public: drops
+    their cookies and Vary: Cookie. Sits above SessionMiddleware and
+    CsrfViewMiddleware, which add both on the way out.
+    """
+
+    def after(self, request, response, state):
+        if getattr(response, "cache_public", False):
+            strip_cookies(response)
+        return response
+
+
+class ProfilingMiddleware(HookMiddleware):
+    """
+    Runs requests selected by api.profiling.should_profile() under cProfile
+    and reports the saved profile in an X-Profile-Id header. Must sit below
+    AuthenticationMiddleware for the staff check; other requests only pay
+    for a header lookup.
+    """
+
+    def before(self, request):
+        user = getattr(request, "profiling_user", None) or getattr(request, "user", None)
+        trigger = should_profile(request, user)
+        return ProfileRun(trigger) if trigger else None
+
+    def cleanup(self, request, run):
+        if run is not None:
+            run.stop()
+
+    def after(self, request, response, run):
+        if run is not None:
+            profile_id = run.save(request, response)
+            if run.trigger != "sample":
+                response["X-Profile-Id"] = profile_id
+        return response
+
+    async def __acall__(self, request):
+        # request.user would query synchronously here, load the user the async way
+        if QUERY_PARAM in request.GET:
+            request.profiling_user = await request.auser()
+        return await super().__acall__(request)
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.6 on 2026-10-19 14:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_chefprofile_average_rating_chefprofile_total_ratings'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(fields=['available_time', 'price'], name='api_dish_availab_333d1b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(fields=['chef', 'available_time'], name='api_dish_chef_id_b20846_idx'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.1.6 on 2026-10-19 15:11
+
+from django.db import migrations, models
+
+# Bits of ChefProfile.availability, by the boolean field they replace
+FLAGS = {
+    'is_available': 1,
+    'breakfast_available': 2,
+    'lunch_available': 4,
+    'dinner_available': 8,
+    'urgent_booking_available': 16,
+    'pre_booking_available': 32,
+}
+
+
+def booleans_to_bitmask(apps, schema_editor):
+    ChefProfile = apps.get_model('api', 'ChefProfile')
+    profiles = list(ChefProfile.objects.only('pk', *FLAGS))
+    for profile in profiles:
+        profile.availability = sum(bit for name, bit in FLAGS.items() if getattr(profile, name))
+    ChefProfile.objects.bulk_update(profiles, ['availability'], batch_size=500)
+
+
+def bitmask_to_booleans(apps, schema_editor):
+    ChefProfile = apps.get_model('api', 'ChefProfile')
+    profiles = list(ChefProfile.objects.only('pk', 'availability'))
+    for profile in profiles:
+        for name, bit in FLAGS.items():
+            setattr(profile, name, bool(profile.availability & bit))
+    ChefProfile.objects.bulk_update(profiles, list(FLAGS), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_user_token_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chefprofile',
+            name='availability',
+            field=models.PositiveSmallIntegerField(db_index=True, default=63),
+        ),
+        migrations.RunPython(booleans_to_bitmask, bitmask_to_booleans),
+        migrations.RemoveField(
+            model_name='chefprofile',
+            name='breakfast_available',
+        ),
+        migrations.RemoveField(
+            model_name='chefprofile',
+            name='dinner_available',
+        ),
+        migrations.RemoveField(
+            model_name='chefprofile',
+            name='is_available',
+        ),
+        migrations.RemoveField(
+            model_name='chefprofile',
+            name='lunch_available',
+        ),
+        migrations.RemoveField(
+            model_name='chefprofile',
+            name='pre_booking_available',
+        ),
+        migrations.RemoveField(
+            model_name='chefprofile',
+            name='urgent_booking_available',
+        ),
+    ]
@@ -1,7 +1,9 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.conf import settings
-from django.db.models import Avg
+from django.db.models import Avg, F
+
+from . import caching
 
 class User(AbstractUser):
     ROLE_CHOICES = [
@@ -10,6 +12,7 @@ class User(AbstractUser):
     ]
     role = models.CharField(max_length=10, choices=ROLE_CHOICES)  
     email = models.EmailField(unique=True, blank=False, null=False)
+    token_version = models.PositiveIntegerField(default=0)  # bump to revoke issued API tokens
 
 
     def __str__(self):
@@ -26,6 +29,18 @@ GENDER_CHOICES = [
     ('other', 'Other'),
 ]
 
+def availability_flag(bit):
+    """A boolean attribute backed by one bit of ChefProfile.availability."""
+    def get(self):
+        return bool(self.availability & bit)
+
+    def set(self, value):
+        self.availability = self.availability | bit if value else self.availability & ~bit
+
+    get.boolean = True  # checkmark icons in the admin's list_display
+    return property(get, set)
+
+
 class ChefProfile(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     full_name = models.CharField(max_length=100, blank=True, null=True)
@@ -39,13 +54,32 @@ class ChefProfile(models.Model):
     age = models.PositiveIntegerField(null=True, blank=True)
     contact_number = models.CharField(max_length=11, null=True, blank=True)
 
-    # Availability fields
-    is_available = models.BooleanField(default=True)  # Global availability
-    breakfast_available = models.BooleanField(default=True)
-    lunch_available = models.BooleanField(default=True)
-    dinner_available = models.BooleanField(default=True)
-    urgent_booking_available = models.BooleanField(default=True)
-    pre_booking_available = models.BooleanField(default=True)
+    # Availability bits; the *_available properties below read and set them
+    AVAILABLE = 1  # Global availability
+    BREAKFAST = 2
+    LUNCH = 4
+    DINNER = 8
+    URGENT_BOOKING = 16
+    PRE_BOOKING = 32
+    ALL_AVAILABLE = 63
+    MEAL_FLAGS = {'breakfast': BREAKFAST, 'lunch': LUNCH, 'dinner': DINNER}
+
+    availability = models.PositiveSmallIntegerField(default=ALL_AVAILABLE, db_index=True)
+
+    is_available = availability_flag(AVAILABLE)
+    breakfast_available = availability_flag(BREAKFAST)
+    lunch_available = availability_flag(LUNCH)
+    dinner_available = availability_flag(DINNER)
+    urgent_booking_available = availability_flag(URGENT_BOOKING)
+    pre_booking_available = availability_flag(PRE_BOOKING)
+    AVAILABILITY_FIELDS = {
+        'is_available': AVAILABLE,
+        'breakfast_available': BREAKFAST,
+        'lunch_available': LUNCH,
+        'dinner_available': DINNER,
+        'urgent_booking_available': URGENT_BOOKING,
+        'pre_booking_available': PRE_BOOKING,
+    }
 
     # Rating fields
     average_rating = models.FloatField(default=0) 
@@ -66,21 +100,47 @@ class ChefProfile(models.Model):
     def __str__(self):
         return self.full_name if self.full_name else self.user.username
     
-    def update_availability(self):
-        # Automatically disable individual meal slots, urgent booking, and pre-booking if is_available is False
-        if not self.is_available:
-            self.breakfast_available = False
-            self.lunch_available = False
-            self.dinner_available = False
-            self.urgent_booking_available = False
-            self.pre_booking_available = False
-        elif self.is_available:
-            self.breakfast_available = True
-            self.lunch_available = True
-            self.dinner_available = True
-            self.urgent_booking_available = True
-            self.pre_booking_available = True
-        self.save()
+    @classmethod
+    def availability_values(cls, flags):
+        """
+        Every availability value with all of ``flags`` set. There are only 64,
+        so availability__in=... finds e.g. the chefs taking dinner pre-bookings
+        with the index, which a bitwise expression couldn't use.
+        """
+        return [value for value in range(cls.ALL_AVAILABLE + 1) if value & flags == flags]
+
+    def set_availability(self, **changes):
+        """
+        Sets the given *_available fields; returns the bits turned (on, off).
+        Turning is_available off disables individual meal slots, urgent
+        booking, and pre-booking; turning it on enables them all.
+        """
+        if 'is_available' in changes:
+            on, off = (self.ALL_AVAILABLE, 0) if changes['is_available'] else (0, self.ALL_AVAILABLE)
+        else:
+            on = sum(self.AVAILABILITY_FIELDS[name] for name, value in changes.items() if value)
+            off = sum(self.AVAILABILITY_FIELDS[name] for name, value in changes.items() if not value)
+        self.availability = self.availability & ~off | on
+        return on, off
+
+    def update_availability(self, **changes):
+        """set_availability() and save it with a single UPDATE of the availability column."""
+        on, off = self.set_availability(**changes)
+        # Computed in the database, so concurrent toggles of other bits aren't lost
+        ChefProfile.objects.filter(pk=self.pk).update(
+            availability=F('availability').bitand(self.ALL_AVAILABLE & ~off).bitor(on)
+        )
+        # update() sends no post_save, which is what purges the cached chef responses
+        caching.purge(self.cache_keys(), self.dish_cache_keys)
+
+    def cache_keys(self):
+        """Surrogate keys of the cached chef lists that include this profile (api.caching)."""
+        return ['chefs', f'chef-{self.user_id}']
+
+    def dish_cache_keys(self):
+        """Surrogate keys of the chef's dish pages, which embed the profile too. Needs a query."""
+        dish_ids = Dish.objects.filter(chef_id=self.user_id).values_list('pk', flat=True)
+        return [f'dish-{pk}' for pk in dish_ids]
 
 
 class Dish(models.Model):
@@ -96,6 +156,14 @@ class Dish(models.Model):
         'dinner': ('18:00', '20:00'),
     }
 
+    # Price buckets used for catalog facets: (label, lower bound, upper bound exclusive)
+    PRICE_BUCKETS = [
+        ('0-500', 0, 500),
+        ('500-1000', 500, 1000),
+        ('1000-2000', 1000, 2000),
+        ('2000+', 2000, None),
+    ]
+
     chef = models.ForeignKey(
         settings.AUTH_USER_MODEL, 
         on_delete=models.CASCADE, 
@@ -111,13 +179,22 @@ class Dish(models.Model):
     time_range_start = models.TimeField(null=True, blank=True)  # Start time of the slot
     time_range_end = models.TimeField(null=True, blank=True)  # End time of the slot
 
-    def save(self, *args, **kwargs):
+    class Meta:
+        indexes = [
+            models.Index(fields=['available_time', 'price']),
+            models.Index(fields=['chef', 'available_time']),
+        ]
+
+    def set_time_range(self):
         # Automatically set time range based on the available_time (meal type)
         if not self.time_range_start and not self.time_range_end:  # Only set if not already set
             time_range = self.AVAILABLE_TIME_RANGES.get(self.available_time)
             if time_range:
                 self.time_range_start = time_range[0]
                 self.time_range_end = time_range[1]
+
+    def save(self, *args, **kwargs):
+        self.set_time_range()
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -1,5 +1,27 @@
+from django.core.paginator import InvalidPage
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.request import Request
 
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 8  # Default page size
     max_page_size = 8 # Maximum page size
+
+    async def apaginate_queryset(self, queryset, request):
+        """
+        paginate_queryset() for the async views (api.async_views), which pass a
+        plain Django request: the same page size and page numbers, with the
+        count and the page fetched through the async ORM. get_next_link(),
+        get_previous_link() and get_paginated_response() work as usual after it.
+        """
+        request = Request(request)
+        paginator = self.django_paginator_class(queryset, self.get_page_size(request))
+        paginator.count = await queryset.acount()  # a cached_property, so the sync count() never runs
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        self.page.object_list = [obj async for obj in self.page.object_list]
+        self.request = request
+        return list(self.page)
@@ -0,0 +1,116 @@
+"""
+Opt-in request profiling for ProfilingMiddleware.
+
+A request is profiled when it carries an ``X-Profile`` header holding a
+token from make_token() (``python manage.py profiling_token``), when a
+staff user adds ``?_profile=1``, or at random with PROFILING["SAMPLE_RATE"].
+Each profile is a cProfile dump (open with ``python -m pstats`` or
+snakeviz) next to a JSON file with the request and its SQL timings, in
+PROFILING["DIR"], which keeps the newest MAX_FILES profiles.
+"""
+import cProfile
+import json
+import os
+import random
+import time
+
+from django.conf import settings
+from django.core import signing
+
+from .dbstats import QueryStats, start_recording, stop_recording
+
+HEADER = "HTTP_X_PROFILE"
+QUERY_PARAM = "_profile"
+SALT = "api.profiling"
+
+
+def make_token():
+    return signing.TimestampSigner(salt=SALT).sign("profile")
+
+
+def token_valid(token):
+    try:
+        signing.TimestampSigner(salt=SALT).unsign(token, max_age=settings.PROFILING["TOKEN_MAX_AGE"])
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def should_profile(request, user):
+    """Return "header", "staff" or "sample" when the request should be profiled, otherwise None."""
+    config = settings.PROFILING
+    if not config["ENABLED"]:
+        return None
+    token = request.META.get(HEADER)
+    if token and token_valid(token):
+        return "header"
+    if QUERY_PARAM in request.GET and user is not None and user.is_staff:
+        return "staff"
+    if config["SAMPLE_RATE"] and random.random() < config["SAMPLE_RATE"]:
+        return "sample"
+    return None
+
+
+class ProfileRun:
+    """cProfile plus SQL recording for one request, from creation until stop()."""
+
+    def __init__(self, trigger):
+        self.trigger = trigger
+        self.stats = QueryStats(keep_queries=True)
+        self.profiler = cProfile.Profile()
+        self.token = start_recording(self.stats)
+        self.started = time.perf_counter()
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+        self.duration = time.perf_counter() - self.started
+        stop_recording(self.token)
+
+    def save(self, request, response):
+        """Write the results and return the profile id."""
+        return save_profile(request, response, self.trigger, self.profiler, self.stats, self.duration)
+
+
+def save_profile(request, response, trigger, profiler, stats, duration):
+    config = settings.PROFILING
+    os.makedirs(config["DIR"], exist_ok=True)
+    match = request.resolver_match
+    view = match.url_name if match and match.url_name else "unmatched"
+    now = time.time()
+    profile_id = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}.{int(now * 1000) % 1000:03d}-{os.getpid()}-{view}-{duration * 1000:.0f}ms"
+    path = os.path.join(config["DIR"], profile_id)
+
+    profiler.dump_stats(f"{path}.prof")
+    with open(f"{path}.json", "w") as f:
+        json.dump({
+            "method": request.method,
+            "path": request.get_full_path(),
+            "view": view,
+            "trigger": trigger,
+            "status": response.status_code,
+            "duration_ms": duration * 1000,
+            "db_queries": stats.count,
+            "db_ms": stats.duration * 1000,
+            "queries": [
+                {"alias": alias, "sql": sql, "ms": seconds * 1000}
+                for alias, sql, seconds in stats.queries
+            ],
+        }, f, indent=2)
+    rotate(config["DIR"], config["MAX_FILES"])
+    return profile_id
+
+
+def rotate(directory, keep):
+    """Delete all but the newest ``keep`` profiles."""
+    profiles = sorted(
+        (entry for entry in os.scandir(directory) if entry.name.endswith(".prof")),
+        key=lambda entry: entry.stat().st_mtime,
+    )
+    for entry in profiles[:max(0, len(profiles) - keep)]:
+        base = entry.path[:-len(".prof")]
+        for suffix in (".prof", ".json"):
+            try:
+                os.remove(base + suffix)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,72 @@
+"""
+orjson-backed JSON rendering, several times faster than the stdlib json
+module DRF uses on large nested payloads. The output is the same JSON as
+DRF's JSONRenderer: compact UTF-8, U+2028/U+2029 escaped, and dates,
+decimals, lazy strings etc. encoded by DRF's JSONEncoder. Only float
+exponents are spelled differently (1e16 and 1.5e-7 where the stdlib writes
+1e+16 and 1.5e-07), which parse to the same numbers. NaN and Infinity are
+rejected with the stdlib's ValueError, as DRF's strict renderer does; orjson
+alone would write them as null. Without orjson, with STRICT_JSON off, or when
+pretty-printing is asked for, DRF's stdlib implementation is used.
+`manage.py bench_json` compares the two.
+"""
+import math
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+if orjson is not None:
+    # Types orjson would format differently from DRF go through JSONEncoder.default
+    OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+_encoder = JSONEncoder()
+
+
+def has_non_finite(data):
+    """Whether ``data`` holds a NaN or infinite float or Decimal."""
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, float):
+            if not math.isfinite(value):
+                return True
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+        elif isinstance(value, Decimal) and not value.is_finite():
+            return True
+    return False
+
+
+def dumps(data):
+    """Encode data like DRF's JSONRenderer does by default (see the module docstring for float formatting)."""
+    if orjson is not None:
+        try:
+            ret = orjson.dumps(data, default=_encoder.default, option=OPTIONS)
+        except orjson.JSONEncodeError:
+            pass  # e.g. integers beyond 64 bits; the stdlib handles them or raises the usual error
+        else:
+            if b"null" in ret and has_non_finite(data):
+                return JSONRenderer().render(data)  # raises "Out of range float values are not JSON compliant"
+            if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+                ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+            return ret
+    return JSONRenderer().render(data)
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (orjson is None or self.ensure_ascii or not self.compact or not self.strict
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
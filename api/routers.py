@@ -0,0 +1,65 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .context import current_request
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+use_read_replica = ContextVar("use_read_replica", default=False)
+
+
+@contextmanager
+def read_from_replica():
+    """Route ORM reads inside the block to READ_REPLICA_ALIAS (if it is configured)."""
+    token = use_read_replica.set(True)
+    try:
+        yield
+    finally:
+        use_read_replica.reset(token)
+
+
+def replica_configured():
+    return settings.READ_REPLICA_ALIAS in connections.databases
+
+
+def request_uses_replica(request):
+    """
+    Safe requests to READ_REPLICA_VIEWS read from the replica, unless the
+    client wrote recently and carries the pin cookie (see ReadReplicaMiddleware).
+    """
+    match = request.resolver_match
+    return (
+        match is not None
+        and request.method in SAFE_METHODS
+        and match.url_name in settings.READ_REPLICA_VIEWS
+        and settings.READ_REPLICA_PIN_COOKIE not in request.COOKIES
+    )
+
+
+class ReadReplicaRouter:
+    """
+    Sends reads to the replica for requests selected by request_uses_replica()
+    and inside read_from_replica(). Everything else, including all writes,
+    uses the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not replica_configured():
+            return DEFAULT_DB_ALIAS
+        request = current_request.get()
+        if use_read_replica.get() or (request is not None and request_uses_replica(request)):
+            return settings.READ_REPLICA_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # the replica holds the same data as the primary
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is a copy of the primary and is never migrated on its own
+        return db != settings.READ_REPLICA_ALIAS
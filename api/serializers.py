@@ -1,17 +1,20 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth import authenticate
+from django.conf import settings
 from .models import ChefProfile, Dish, Booking, ChefRating
+from .media_gc import queue_media_delete
+import io
 import re
-from django.core.files.storage import default_storage
-from django.core.exceptions import SuspiciousOperation
 from datetime import date, timedelta
 from rest_framework.validators import UniqueValidator
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError as DjangoValidationError
 from PIL import Image
+import logging
 
 User = get_user_model()  
+logger = logging.getLogger(__name__)
 
 class RegisterSerializer(serializers.ModelSerializer):
 
@@ -74,6 +77,13 @@ class LoginSerializer(serializers.Serializer):
 class ChefProfileSerializer(serializers.ModelSerializer):
     # profile_picture = serializers.SerializerMethodField()
     profile_picture = serializers.ImageField(required=False, use_url=True)  # Allow file upload
+    # Bits of ChefProfile.availability
+    is_available = serializers.BooleanField(required=False)
+    breakfast_available = serializers.BooleanField(required=False)
+    lunch_available = serializers.BooleanField(required=False)
+    dinner_available = serializers.BooleanField(required=False)
+    urgent_booking_available = serializers.BooleanField(required=False)
+    pre_booking_available = serializers.BooleanField(required=False)
 
     
     class Meta:
@@ -128,13 +138,7 @@ class ChefProfileSerializer(serializers.ModelSerializer):
 
         if not is_available:
             # If is_available is False, prevent any individual field from being set to True
-            restricted_fields = [
-                'breakfast_available',
-                'lunch_available',
-                'dinner_available',
-                'urgent_booking_available',
-                'pre_booking_available'
-            ]
+            restricted_fields = [field for field in ChefProfile.AVAILABILITY_FIELDS if field != 'is_available']
             errors = {}
             for field in restricted_fields:
                 if data.get(field) is True:
@@ -150,19 +154,23 @@ class ChefProfileSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         
         new_picture = validated_data.get('profile_picture', None)
+        old_picture = None
         if new_picture and instance.profile_picture and instance.profile_picture.name != "defaults/default_profile.png":
-            print('new_picture', new_picture)
-            try:
-                default_storage.delete(instance.profile_picture.name)
-            except SuspiciousOperation:
-                pass
-        instance = super().update(instance, validated_data)
-        print('instance', instance)
-        if 'is_available' in validated_data:
+            logger.debug("Replacing profile picture %s of chef %s", instance.profile_picture.name, instance.user_id)
+            old_picture = instance.profile_picture.name
+        availability = {
+            field: validated_data.pop(field) for field in ChefProfile.AVAILABILITY_FIELDS if field in validated_data
+        }
+        if validated_data:
+            instance.set_availability(**availability)  # saved along with the other fields
             instance = super().update(instance, validated_data)
-            instance.update_availability()
-            print('instance', instance)
-
+        elif availability:
+            instance.update_availability(**availability)  # a toggle: one UPDATE of one column
+        if availability:
+            logger.debug("Availability of chef %s set to %s", instance.user_id, availability)
+        if old_picture:
+            # Only once the row points at the new picture, or the worker still sees the old name in use
+            queue_media_delete(old_picture)
 
         return instance
         
@@ -213,22 +221,78 @@ class DishSerializer(serializers.ModelSerializer):
     
     def update(self, instance, validated_data):
         new_picture = validated_data.get('picture', None)
+        old_picture = None
         if new_picture and instance.picture and instance.picture.name != "defaults/default_dish.png":
-            try:
-                default_storage.delete(instance.picture.name)
-            except SuspiciousOperation:
-                pass
-        return super().update(instance, validated_data)
+            old_picture = instance.picture.name
+        instance = super().update(instance, validated_data)
+        if old_picture:
+            queue_media_delete(old_picture)  # after the save, so the worker no longer finds it referenced
+        return instance
+
+class DishImportSerializer(DishSerializer):
+    """
+    One manifest row of a bulk dish import. `picture` names a file in the
+    uploaded zip; it is checked here and read again when the dish is saved,
+    so only one image is held in memory at a time.
+    """
+    chef = None
+    picture = serializers.CharField(required=False, allow_blank=True)
+
+    class Meta:
+        model = Dish
+        fields = ['name', 'description', 'available_time', 'serving_number', 'price', 'picture']
+
+    def validate_picture(self, value):
+        if not value:
+            return None  # fall back to the default dish picture
+        images = self.context.get('images')
+        if images is None or value not in images:
+            raise serializers.ValidationError(f"Picture '{value}' was not found in the images archive.")
+        try:
+            data = images.read(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        super().validate_picture(io.BytesIO(data))
+        return value
+
 
 class DishSimpleSerializer(serializers.ModelSerializer):
     class Meta:
         model = Dish
         fields = ['id', 'name', 'price']
 
+class DishCatalogFilterSerializer(serializers.Serializer):
+    """Query parameters accepted by the dish catalog."""
+    meal_type = serializers.ChoiceField(choices=Dish.AVAILABLE_TIMES, required=False)
+    min_price = serializers.IntegerField(min_value=0, required=False)
+    max_price = serializers.IntegerField(min_value=0, required=False)
+    serving_number = serializers.IntegerField(min_value=1, required=False)
+    available = serializers.BooleanField(required=False, default=False)
+
+    def validate(self, data):
+        if 'min_price' in data and 'max_price' in data and data['min_price'] > data['max_price']:
+            raise serializers.ValidationError({"max_price": "Maximum price must not be lower than minimum price."})
+        return data
+
+class BatchItemSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=["GET", "POST", "PUT", "PATCH", "DELETE"])
+    path = serializers.CharField(max_length=2048)
+    body = serializers.JSONField(required=False, default=None)
+
+class BatchSerializer(serializers.Serializer):
+    """Body of /api/batch/: {"requests": [{"method", "path", "body"}, ...]}."""
+    requests = BatchItemSerializer(many=True, allow_empty=False)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Checked before the items are validated
+        self.fields['requests'].max_length = settings.BATCH['MAX_REQUESTS']
+
 # Booking
 class BookingSerializer(serializers.ModelSerializer):
     dishes_details = DishSimpleSerializer(source='dishes', many=True, read_only=True)
-    dishes = serializers.PrimaryKeyRelatedField(queryset=Dish.objects.all(), many=True)  # Handle multiple dishes
+    dishes = serializers.PrimaryKeyRelatedField(queryset=Dish.objects.select_related('chef'), many=True)  # Handle multiple dishes
+    chef = serializers.PrimaryKeyRelatedField(queryset=User.objects.select_related('chefprofile'))  # validate() reads the profile
     slot = serializers.ListField(child=serializers.CharField(), write_only=True)
     slot_display = serializers.CharField(source='slot', read_only=True)
 
@@ -242,6 +306,7 @@ class BookingSerializer(serializers.ModelSerializer):
             'id', 'customer','customer_name', 'chef', 'chef_name', 'dishes', 'dishes_details',  'slot', 'slot_display', 'booking_type', 'date',
             'address', 'contact_number', 'special_instructions', 'status', 'is_paid', 'created_at', 'status_updated_at'
         ]
+        read_only_fields = ['customer']  # always the requesting user, see create()
 
     def validate_address(self, value):
         cleaned_value = value.strip()
@@ -366,7 +431,7 @@ class BookingSerializer(serializers.ModelSerializer):
             booking_data['slot'] = slot  # Set the slot
 
             booking = Booking.objects.create(**booking_data)
-            booking.dishes.set([dish])  # Set the dish (many-to-many relation)
+            booking.dishes.add(dish)  # Set the dish (many-to-many relation)
             bookings.append(booking)
 
         if len(bookings) == 1:
@@ -0,0 +1,87 @@
+"""
+Cached-DB session store that writes at most once per login and records
+per-request session I/O for SessionIOMiddleware.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.contrib.sessions.backends.base import VALID_KEY_CHARS, CreateError
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.utils.crypto import get_random_string
+
+current_session_io = ContextVar("current_session_io", default=None)
+
+
+class SessionIOStats:
+    def __init__(self):
+        self.loads = 0
+        self.db_reads = 0
+        self.writes = 0
+        self.duration = 0.0
+
+    def __bool__(self):
+        return bool(self.loads or self.writes)
+
+    def server_timing(self):
+        return (
+            f'session;desc="loads={self.loads} db_reads={self.db_reads} writes={self.writes}";'
+            f'dur={self.duration * 1000:.2f}'
+        )
+
+
+@contextmanager
+def track(counter):
+    stats = current_session_io.get()
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        if stats is not None:
+            setattr(stats, counter, getattr(stats, counter) + 1)
+            stats.duration += perf_counter() - started
+
+
+class SessionStore(CachedDBStore):
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._pending_create = False
+
+    def load(self):
+        with track("loads"):
+            return super().load()
+
+    def _get_session_from_db(self):
+        with track("db_reads"):
+            return super()._get_session_from_db()
+
+    def cycle_key(self):
+        # login() calls this. Django's version INSERTs an empty row right away and the
+        # middleware UPDATEs it at the end of the request; here the new key is only
+        # reserved and the single INSERT happens in the response-phase save().
+        data = self._session
+        old_key = self.session_key
+        self._session_key = get_random_string(32, VALID_KEY_CHARS)
+        self._session_cache = data
+        self._pending_create = True
+        self.modified = True
+        if old_key:
+            self.delete(old_key)
+
+    def save(self, must_create=False):
+        with track("writes"):
+            if not self._pending_create:
+                return super().save(must_create)
+            while True:
+                try:
+                    super().save(must_create=True)
+                    break
+                except CreateError:
+                    # Key collision, pick another one
+                    self._session_key = get_random_string(32, VALID_KEY_CHARS)
+            self._pending_create = False
+
+    def delete(self, session_key=None):
+        with track("writes"):
+            super().delete(session_key)
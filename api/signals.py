@@ -1,7 +1,11 @@
-from django.db.models.signals import post_save
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.conf import settings
-from .models import ChefProfile
+from .models import ChefProfile, Dish
+from .media_gc import queue_media_delete
+from . import caching, dbstats, slowlog
+from .sqlite import apply_pragmas
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def create_chef_profile(sender, instance, created, **kwargs):
@@ -10,3 +14,54 @@ def create_chef_profile(sender, instance, created, **kwargs):
     """
     if created and instance.role == 'chef':  # Check if user is a chef
         ChefProfile.objects.create(user=instance)
+
+
+@receiver(post_delete, sender=Dish)
+def delete_dish_picture(sender, instance, **kwargs):
+    """
+    Removes the dish picture once the dish is gone (also covers chef cascade deletes).
+    """
+    if instance.picture:
+        queue_media_delete(instance.picture.name)
+
+
+@receiver(post_delete, sender=ChefProfile)
+def delete_profile_picture(sender, instance, **kwargs):
+    if instance.profile_picture:
+        queue_media_delete(instance.profile_picture.name)
+
+
+@receiver([post_save, post_delete], sender=Dish)
+def purge_dish(sender, instance, **kwargs):
+    """Drops the dish page and its chef's dish lists from shared caches."""
+    caching.purge([f"dish-{instance.pk}", f"chef-{instance.chef_id}"])
+
+
+@receiver([post_save, post_delete], sender=ChefProfile)
+def purge_chef(sender, instance, **kwargs):
+    """
+    Drops the chef lists, the chef's dish lists and their dish pages, which
+    all embed the profile.
+    """
+    caching.purge(instance.cache_keys(), instance.dish_cache_keys)
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    """
+    Applies SQLITE_PRAGMAS (WAL, busy timeout, mmap, cache size) to every new SQLite connection.
+    """
+    if connection.vendor == 'sqlite':
+        # Raw DB-API cursor: connection setup shouldn't count towards request query stats
+        cursor = connection.connection.cursor()
+        try:
+            apply_pragmas(cursor)
+        finally:
+            cursor.close()
+
+
+@receiver(connection_created)
+def install_query_wrappers(sender, connection, **kwargs):
+    """Per-request query stats and the slow-query log, on every connection."""
+    dbstats.install(connection)
+    slowlog.install(connection)
@@ -0,0 +1,75 @@
+"""
+Slow-query log. With SLOW_QUERY["ENABLED"], slow_query_wrapper is
+installed on every database connection (api/signals.py) and appends one
+JSON line per query slower than SLOW_QUERY["THRESHOLD_MS"] to
+SLOW_QUERY["LOG_FILE"]. Each entry has the SQL, its fingerprint, the view
+that ran it and the EXPLAIN QUERY PLAN output. ``manage.py slow_queries``
+summarizes the file.
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+
+from .context import current_view
+from .dbstats import fingerprint
+
+logger = logging.getLogger(__name__)
+
+_write_lock = threading.Lock()
+
+
+def install(connection):
+    if settings.SLOW_QUERY["ENABLED"] and slow_query_wrapper not in connection.execute_wrappers:
+        # Outermost, and at the front so execute_wrapper() blocks that are open
+        # while the connection is created still pop their own wrapper
+        connection.execute_wrappers.insert(0, slow_query_wrapper)
+
+
+def slow_query_wrapper(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if elapsed_ms >= settings.SLOW_QUERY["THRESHOLD_MS"]:
+            log_slow_query(context["connection"], sql, None if many else params, elapsed_ms)
+
+
+def explain(connection, sql, params):
+    """The query plan as text lines, or None if it can't be explained."""
+    if not sql.lstrip().upper().startswith(("SELECT", "WITH")):
+        return None
+    # A backend cursor bypasses execute wrappers, so the EXPLAIN isn't logged or counted itself
+    cursor = connection.create_cursor()
+    try:
+        cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+        # SQLite rows are (id, parent, notused, detail)
+        return [str(row[-1]) for row in cursor.fetchall()]
+    except Exception as e:
+        return [f"EXPLAIN failed: {e}"]
+    finally:
+        cursor.close()
+
+
+def log_slow_query(connection, sql, params, elapsed_ms):
+    # Plans of statements in a failed transaction can't be fetched, skip them
+    plan = None if connection.needs_rollback else explain(connection, sql, params)
+    entry = {
+        "time": time.time(),
+        "ms": round(elapsed_ms, 3),
+        "alias": connection.alias,
+        "view": current_view(),
+        "fingerprint": fingerprint(sql),
+        "sql": sql,
+        "plan": plan,
+    }
+    logger.warning("Slow query (%.1f ms) in %s: %s", elapsed_ms, entry["view"], entry["fingerprint"][:200])
+    path = settings.SLOW_QUERY["LOG_FILE"]
+    with _write_lock:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
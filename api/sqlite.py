@@ -0,0 +1,9 @@
+from django.conf import settings
+
+
+def apply_pragmas(cursor, pragmas=None):
+    """Run ``PRAGMA name=value`` for each entry of SQLITE_PRAGMAS (or ``pragmas``)."""
+    if pragmas is None:
+        pragmas = settings.SQLITE_PRAGMAS
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name}={value}")
@@ -0,0 +1,61 @@
+"""
+Test helpers for query budgets. Usage from a django.test.TestCase:
+
+    class QueryBudgetTests(QueryBudgetTestMixin, TestCase):
+        def test_routes(self):
+            self.assertRouteBudgets({
+                "chefs_list": {},
+                "get_dish": {"kwargs": {"dish_id": dish.id}},
+                "create-booking": {"method": "post", "data": {...}, "user": customer},
+                ...
+            })
+
+assertRouteBudgets fails if a route in api/urls.py has no case, so new
+endpoints get a budget before they ship. Routes that need another kind of
+test case (e.g. a TransactionTestCase for batch's pool threads) are listed
+in ``elsewhere`` and checked there.
+"""
+from django.conf import settings
+from django.urls import reverse
+
+from . import urls
+from .dbstats import budget_problems
+
+
+def route_names():
+    return {pattern.name for pattern in urls.urlpatterns if pattern.name}
+
+
+class QueryBudgetTestMixin:
+
+    def assertQueryBudget(self, url_name, kwargs=None, method="get", data=None, user=None, budget=None,
+                          status=None, content_type="application/json"):
+        """Request ``url_name`` and fail if it breaks its QUERY_BUDGET entry (or ``budget``)."""
+        config = dict(settings.QUERY_BUDGET)
+        if budget is not None:
+            config["VIEWS"] = {**config["VIEWS"], url_name: budget}
+
+        self.client.logout()
+        if user is not None:
+            self.client.force_login(user)
+        url = reverse(url_name, kwargs=kwargs)
+        if method == "get":
+            response = self.client.get(url, data)
+        else:
+            response = getattr(self.client, method)(url, data, content_type=content_type)
+
+        if status is not None:
+            self.assertEqual(response.status_code, status, f"{url_name}: {response.content[:200]!r}")
+        problems = budget_problems(response.wsgi_request.query_stats, url_name, config)
+        if problems:
+            self.fail(f"{method.upper()} {url_name}: " + "; ".join(problems))
+        return response
+
+    def assertRouteBudgets(self, cases, elsewhere=()):
+        """Run assertQueryBudget for every case; every named route in api/urls.py needs one."""
+        missing = sorted(route_names() - set(cases) - set(elsewhere))
+        if missing:
+            self.fail(f"No query budget case for: {', '.join(missing)}")
+        for url_name, case in cases.items():
+            with self.subTest(route=url_name):
+                self.assertQueryBudget(url_name, **case)
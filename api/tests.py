@@ -1,3 +1,826 @@
-from django.test import TestCase
+import io
+import json
+import shutil
+import tempfile
+import time
+import zipfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils.crypto import get_random_string
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+
+from . import batch, caching, metrics, renderers, routers, throttling
+from .models import Booking, ChefProfile, ChefRating, Dish, User
+from .testing import QueryBudgetTestMixin
+from .tokens import issue_tokens
+
+# More rows than QUERY_BUDGET's DUPLICATE_THRESHOLD, so a per-row query shows up as repeated SQL
+ROWS = 5
+
+
+def png(name="dish.png"):
+    buffer = io.BytesIO()
+    Image.new("RGB", (4, 4)).save(buffer, "PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+
+def make_user(username, role, **fields):
+    return User.objects.create_user(
+        username=username, email=f"{username}@example.com", password="budget-pass-1", role=role, **fields
+    )
+
+
+def make_chef(username, **profile):
+    chef = make_user(username, "chef")
+    ChefProfile.objects.filter(user=chef).update(full_name=username.title(), **profile)  # created by a signal
+    return chef
+
+
+def make_dish(chef, name, available_time="lunch", price=800):
+    return Dish.objects.create(
+        chef=chef, name=name, description=f"{name} description", available_time=available_time,
+        serving_number=2, price=price,
+    )
+
+
+def make_booking(customer, chef, dishes, **fields):
+    booking = Booking.objects.create(
+        customer=customer, chef=chef, slot="lunch", booking_type="prebooking",
+        date=date.today() + timedelta(days=2), address="12 Mall Road, Lahore", contact_number="03001234567",
+        **fields,
+    )
+    booking.dishes.set(dishes)
+    return booking
+
+
+class QueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    """Every route in api/urls.py against its QUERY_BUDGET entry, with enough rows to expose N+1 queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.chef = make_chef("budget_chef", average_rating=4.5)
+        cls.other_chefs = [make_chef(f"budget_chef_{i}", average_rating=i) for i in range(ROWS)]
+        cls.customer = make_user("budget_customer", "customer")
+        cls.dishes = [make_dish(cls.chef, f"Dish {i}", price=500 + i * 100) for i in range(ROWS)]
+        for chef in cls.other_chefs:
+            make_dish(chef, f"{chef.username} special", available_time="dinner")
+        cls.bookings = [make_booking(cls.customer, cls.chef, cls.dishes[:2]) for _ in range(ROWS)]
+        ChefRating.objects.create(chef=cls.chef, user=cls.customer, rating=4)
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def test_route_budgets(self):
+        chef, customer = self.chef, self.customer
+        dish = self.dishes[0]
+        doomed_dish = make_dish(chef, "Doomed dish")
+        password_user = make_user("budget_password", "customer")
+        manifest = SimpleUploadedFile("menu.csv", b"name,description,available_time,serving_number,price\n"
+                                                  b"Pulao,Rice with stock,lunch,2,900\n"
+                                                  b"Karahi,Chicken karahi,dinner,3,1500\n")
+
+        self.assertRouteBudgets({
+            "register": {"method": "post", "status": 201, "data": {
+                "username": "budget_new", "email": "budget_new@example.com", "role": "customer",
+                "password": "Budget-pass-123", "confirm_password": "Budget-pass-123",
+            }},
+            "login": {"method": "post", "status": 200,
+                      "data": {"username": customer.username, "password": "budget-pass-1"}},
+            "change-password": {"method": "post", "user": password_user, "status": 200,
+                                "data": {"old_password": "budget-pass-1", "new_password": "budget-pass-2"}},
+            "user_info": {"user": customer, "status": 200},
+            "logout": {"method": "post", "user": customer, "status": 200},
+            "token": {"method": "post", "status": 200,
+                      "data": {"username": customer.username, "password": "budget-pass-1"}},
+            "token-refresh": {"method": "post", "status": 200, "data": {"refresh": issue_tokens(chef)["refresh"]}},
+            "token-revoke": {"method": "post", "user": customer, "status": 200},
+            "home": {"status": 200},
+            "chef-profile": {"user": chef, "status": 200},
+            "delete-profile-picture": {"method": "delete", "user": chef, "status": 400},
+            "chefs_list": {"status": 200},
+            "featured-Chef": {"status": 200},
+            "chef_dishes": {"kwargs": {"chef_id": chef.id, "meal_type": "lunch"}, "status": 200},
+            "chef-availability": {"method": "patch", "user": chef, "status": 200, "data": {"dinner_available": False}},
+            "dish-catalog": {"data": {"available": "true"}, "status": 200},
+            "get_dish": {"kwargs": {"dish_id": dish.id}, "status": 200},
+            "add_dishes": {"method": "post", "user": chef, "status": 201, "content_type": MULTIPART_CONTENT, "data": {
+                "name": "Haleem", "description": "Slow cooked", "available_time": "dinner",
+                "serving_number": 4, "price": 1200, "picture": png(),
+            }},
+            "edit_dishes": {"method": "put", "kwargs": {"dish_id": dish.id}, "user": chef, "status": 200,
+                            "content_type": MULTIPART_CONTENT, "data": encode_multipart(BOUNDARY, {"price": 950})},
+            "delete-dish": {"method": "delete", "kwargs": {"dish_id": doomed_dish.id}, "user": chef, "status": 204},
+            "import-dishes": {"method": "post", "user": chef, "status": 201, "content_type": MULTIPART_CONTENT,
+                              "data": {"manifest": manifest}},
+            "create-booking": {"method": "post", "user": customer, "status": 201, "data": {
+                "customer": customer.id, "chef": chef.id, "dishes": [dish.id], "slot": ["lunch"], "booking_type": "prebooking",
+                "date": str(date.today() + timedelta(days=3)), "address": "45 Canal View, Lahore",
+                "contact_number": "03001234567",
+            }},
+            "customer-bookings": {"user": customer, "status": 200},
+            "chef-upcoming-bookings": {"user": chef, "status": 200},
+            "update-booking-status": {"method": "patch", "kwargs": {"booking_id": self.bookings[0].id}, "user": chef,
+                                      "status": 200, "data": {"status": "confirmed"}},
+            "mark-booking-paid": {"method": "patch", "kwargs": {"booking_id": self.bookings[1].id}, "user": chef,
+                                  "status": 200},
+            "rate-chef": {"method": "post", "kwargs": {"chef_id": chef.id}, "user": customer, "status": 200,
+                          "data": {"rating": 5}},
+            "get-chef-rating": {"kwargs": {"chef_id": chef.id}, "user": customer, "status": 200},
+            "async-user-info": {"user": customer, "status": 200},
+            "async-chefs-list": {"status": 200},
+            "async-featured-chef": {"status": 200},
+            "async-chef-dishes": {"kwargs": {"chef_id": chef.id, "meal_type": "lunch"}, "status": 200},
+            "async-get-dish": {"kwargs": {"dish_id": dish.id}, "status": 200},
+        }, elsewhere=["batch"])
+
+    def test_lists_have_more_rows_than_the_duplicate_threshold(self):
+        # The N+1 checks above only bite if every list returns enough rows
+        response = self.assertQueryBudget("chef_dishes", kwargs={"chef_id": self.chef.id, "meal_type": "lunch"})
+        self.assertEqual(len(response.json()["dishes"]), ROWS)
+        response = self.assertQueryBudget("chef-upcoming-bookings", user=self.chef)
+        self.assertEqual(len(response.json()["results"]), ROWS)
+        response = self.assertQueryBudget("customer-bookings", user=self.customer)
+        self.assertEqual(len(response.json()["results"]), ROWS)
+        self.assertTrue(all(len(booking["dishes_details"]) == 2 for booking in response.json()["results"]))
+        response = self.assertQueryBudget("chefs_list")
+        self.assertEqual(len(response.json()["results"]), ROWS + 1)
+
+    def test_bookings_expire_and_complete_in_one_update(self):
+        stale = self.bookings[2]
+        Booking.objects.filter(pk=stale.pk).update(created_at=stale.created_at - timedelta(hours=2))
+        done = self.bookings[3]
+        Booking.objects.filter(pk=done.pk).update(status="confirmed", date=date.today() - timedelta(days=1))
+
+        self.assertQueryBudget("chef-upcoming-bookings", user=self.chef, status=200)
+        statuses = dict(Booking.objects.filter(chef=self.chef).values_list("pk", "status"))
+        self.assertEqual(statuses[stale.pk], "expired")
+        self.assertEqual(statuses[done.pk], "completed")
+        self.assertEqual(statuses[self.bookings[4].pk], "pending")
+
+    def test_booking_lists_write_nothing_when_nothing_is_stale(self):
+        self.client.force_login(self.customer)
+        with mock.patch("api.views.run_write") as run_write, CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("customer-bookings"))
+        self.assertEqual(response.status_code, 200)
+        run_write.assert_not_called()
+        self.assertFalse([q["sql"] for q in queries if q["sql"].startswith(("UPDATE", "BEGIN", "SAVEPOINT"))])
+
+
+class CachePurgeTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.chef = make_user("purge_chef", "chef")
+        cls.dishes = [make_dish(cls.chef, f"Dish {i}") for i in range(3)]
+
+    def test_profile_save_without_purge_url_runs_no_extra_query(self):
+        profile = self.chef.chefprofile
+        with override_settings(CDN={**settings.CDN, "PURGE_URL": ""}), self.assertNumQueries(1):
+            profile.save()
+
+    def test_profile_save_purges_its_dish_pages_after_commit(self):
+        profile = self.chef.chefprofile
+        with override_settings(CDN={**settings.CDN, "PURGE_URL": "http://cdn.invalid/"}), \
+                mock.patch.object(caching, "executor") as executor:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                profile.save()
+                executor.assert_not_called()
+        self.assertTrue(callbacks)
+        expected = sorted(["chefs", f"chef-{self.chef.pk}", *(f"dish-{dish.pk}" for dish in self.dishes)])
+        executor().submit.assert_called_once_with(caching.send_purge, expected)
+
+    def test_dish_import_purges_the_chefs_dish_pages(self):
+        self.client.force_login(self.chef)
+        manifest = SimpleUploadedFile("menu.json", b'[{"name": "Pulao", "description": "Rice", '
+                                                   b'"available_time": "lunch", "serving_number": 2, "price": 900}]')
+        with override_settings(CDN={**settings.CDN, "PURGE_URL": "http://cdn.invalid/"}), \
+                mock.patch.object(caching, "executor") as executor:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse("import-dishes"), {"manifest": manifest})
+                executor.assert_not_called()
+        self.assertEqual(response.status_code, 201)
+        executor().submit.assert_called_once_with(caching.send_purge, [f"chef-{self.chef.pk}"])
+
+    def test_profile_change_moves_the_shared_home_version(self):
+        request = RequestFactory().get("/api/home/")
+        before = caching.home_cache_key(request)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.chef.chefprofile.save()
+        self.assertNotEqual(caching.home_cache_key(request), before)
+        self.assertIsNotNone(caching.caches[settings.HOME_VERSION_CACHE].get(caching.HOME_VERSION_KEY))
+
+
+class BatchTests(QueryBudgetTestMixin, TransactionTestCase):
+    # Consecutive GETs run on pool threads, which only see committed rows
+
+    def setUp(self):
+        self.chef = make_chef("batch_chef")
+        self.dish = make_dish(self.chef, "Biryani")
+
+    def test_query_budget(self):
+        customer = make_user("batch_customer", "customer")
+        response = self.assertQueryBudget("batch", method="post", user=customer, status=200, data={"requests": [
+            {"method": "GET", "path": f"/api/get-dish/{self.dish.id}/"},
+            {"method": "GET", "path": "/api/featured-Chef/"},
+            {"method": "GET", "path": "/api/user-info/"},
+        ]})
+        self.assertEqual([part["status"] for part in response.json()["responses"]], [200, 200, 200])
+
+    def batch(self, *items, client=None, **extra):
+        client = client or self.client
+        response = client.post(reverse("batch"), {"requests": list(items)}, content_type="application/json", **extra)
+        if response.status_code != 200:
+            return response, None
+        return response, [(part["status"], part["body"]) for part in response.json()["responses"]]
+
+    def test_responses_keep_the_request_order_and_see_earlier_writes(self):
+        self.client.force_login(self.chef)
+        availability = "/api/chef-availability/"
+        _, results = self.batch(
+            {"method": "GET", "path": f"/api/get-dish/{self.dish.id}/"},
+            {"method": "GET", "path": availability},
+            {"method": "GET", "path": "/api/get-dish/999999/"},
+            {"method": "PATCH", "path": availability, "body": {"dinner_available": False}},
+            {"method": "GET", "path": availability},
+            {"method": "GET", "path": "/api/user-info/"},
+        )
+        self.assertEqual([status for status, _ in results], [200, 200, 404, 200, 200, 200])
+        self.assertEqual(results[0][1]["name"], "Biryani")
+        self.assertTrue(results[1][1]["dinner_available"])
+        self.assertFalse(results[3][1]["dinner_available"])
+        self.assertFalse(results[4][1]["dinner_available"])
+        self.assertEqual(results[5][1]["username"], self.chef.username)
+
+    def test_at_most_max_requests(self):
+        self.client.force_login(self.chef)
+        patch = {"method": "PATCH", "path": "/api/chef-availability/", "body": {"lunch_available": False}}
+        with override_settings(BATCH={**settings.BATCH, "MAX_REQUESTS": 2}):
+            response, _ = self.batch(patch, patch, patch)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("requests", response.json())
+        self.chef.chefprofile.refresh_from_db()
+        self.assertTrue(self.chef.chefprofile.lunch_available)  # nothing ran
+
+    def test_only_batchable_api_paths(self):
+        self.client.force_login(self.chef)
+        _, results = self.batch(
+            {"method": "GET", "path": "/admin/"},
+            {"method": "POST", "path": "/api/login/", "body": {"username": "batch_chef", "password": "budget-pass-1"}},
+            {"method": "POST", "path": "/api/batch/", "body": {"requests": []}},
+            {"method": "GET", "path": "/api/user-info/"},
+        )
+        self.assertEqual([status for status, _ in results], [400, 400, 400, 200])
+        self.assertEqual(results[0][1]["detail"], "Only /api/ paths can be batched.")
+        self.assertEqual(results[1][1]["detail"], "/api/login/ can't be batched.")
+
+    def test_sub_requests_rely_on_the_batch_csrf_check(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.chef)
+        token = get_random_string(32)
+        client.cookies[settings.CSRF_COOKIE_NAME] = token
+        patch = {"method": "PATCH", "path": "/api/chef-availability/", "body": {"lunch_available": False}}
+
+        response, _ = self.batch(patch, client=client)
+        self.assertEqual(response.status_code, 403)
+        direct = client.patch("/api/chef-availability/", {"lunch_available": False}, content_type="application/json",
+                              HTTP_X_CSRFTOKEN=token)
+        self.assertEqual(direct.status_code, 200)  # the token is valid
+
+        _, results = self.batch(patch, client=client, HTTP_X_CSRFTOKEN=token)
+        self.assertEqual(results[0][0], 200)  # the sub-request itself carries no token
+
+    def test_reads_after_a_successful_write_stay_on_the_primary(self):
+        self.client.force_login(self.chef)
+        replica_reads = {}
+        call_view = batch.call_view
+
+        def record(request):
+            request.resolver_match = resolve(request.path_info)
+            replica_reads[int(request.request_id.rsplit(".", 1)[1])] = routers.request_uses_replica(request)
+            return call_view(request)
+
+        dish = {"method": "GET", "path": f"/api/get-dish/{self.dish.id}/"}
+        with mock.patch.object(batch, "call_view", side_effect=record):
+            self.batch(
+                dish, dish,
+                {"method": "PATCH", "path": "/api/chef-availability/", "body": {"age": 5}},  # invalid, not written
+                dish,
+                {"method": "PATCH", "path": "/api/chef-availability/", "body": {"lunch_available": False}},
+                dish, dish,
+            )
+        self.assertEqual(replica_reads, {0: True, 1: True, 2: False, 3: True, 4: False, 5: False, 6: False})
+
+
+class ChefAvailabilityTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.chef = make_chef("availability_chef")
+
+    def profile(self):
+        return ChefProfile.objects.get(user=self.chef)
+
+    def test_availability_values(self):
+        flags = ChefProfile.AVAILABLE | ChefProfile.DINNER
+        values = ChefProfile.availability_values(flags)
+        self.assertEqual(values, [v for v in range(64) if v & 1 and v & 8])
+        self.assertEqual(len(values), 16)  # 4 other bits, free to be on or off
+        self.assertEqual(ChefProfile.availability_values(ChefProfile.ALL_AVAILABLE), [ChefProfile.ALL_AVAILABLE])
+        self.assertEqual(ChefProfile.availability_values(0), list(range(64)))
+
+    def test_update_availability_is_one_update(self):
+        profile = self.profile()
+        with override_settings(CDN={**settings.CDN, "PURGE_URL": ""}), self.assertNumQueries(1):
+            profile.update_availability(dinner_available=False, urgent_booking_available=False)
+        expected = ChefProfile.ALL_AVAILABLE & ~ChefProfile.DINNER & ~ChefProfile.URGENT_BOOKING
+        self.assertEqual(profile.availability, expected)
+        self.assertEqual(self.profile().availability, expected)
+
+        profile.update_availability(dinner_available=True)
+        self.assertEqual(self.profile().availability, expected | ChefProfile.DINNER)
+        profile.update_availability(is_available=False)
+        self.assertEqual(self.profile().availability, 0)
+        profile.update_availability(is_available=True)
+        self.assertEqual(self.profile().availability, ChefProfile.ALL_AVAILABLE)
+
+    def test_concurrent_toggles_of_different_bits_both_survive(self):
+        # Both requests loaded the profile before either wrote
+        first, second = self.profile(), self.profile()
+        first.update_availability(dinner_available=False)
+        second.update_availability(lunch_available=False)
+
+        profile = self.profile()
+        self.assertFalse(profile.dinner_available)
+        self.assertFalse(profile.lunch_available)
+        self.assertTrue(profile.breakfast_available and profile.is_available)
+
+
+class AvailabilityMigrationTests(TransactionTestCase):
+    before = [("api", "0019_user_token_version")]
+    after = [("api", "0020_chefprofile_availability")]
+    flags = {
+        "is_available": 1, "breakfast_available": 2, "lunch_available": 4,
+        "dinner_available": 8, "urgent_booking_available": 16, "pre_booking_available": 32,
+    }
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_booleans_to_bitmask_and_back(self):
+        apps = self.migrate(self.before)
+        User = apps.get_model("api", "User")
+        ChefProfile = apps.get_model("api", "ChefProfile")
+        rows = {
+            "all": dict.fromkeys(self.flags, True),
+            "none": dict.fromkeys(self.flags, False),
+            "dinner_prebooking": {**dict.fromkeys(self.flags, False), "is_available": True,
+                                  "dinner_available": True, "pre_booking_available": True},
+        }
+        for username, values in rows.items():
+            user = User.objects.create(username=username, email=f"{username}@example.com", role="chef")
+            ChefProfile.objects.create(user=user, **values)
+
+        apps = self.migrate(self.after)
+        availability = dict(apps.get_model("api", "ChefProfile").objects.values_list("user__username", "availability"))
+        self.assertEqual(availability, {"all": 63, "none": 0, "dinner_prebooking": 1 | 8 | 32})
+
+        apps = self.migrate(self.before)
+        ChefProfile = apps.get_model("api", "ChefProfile")
+        for username, values in rows.items():
+            profile = ChefProfile.objects.get(user__username=username)
+            self.assertEqual({name: getattr(profile, name) for name in self.flags}, values)
+
+
+class MediaDeleteTests(TransactionTestCase):
+    # The media-gc worker thread only sees committed rows
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.chef = make_chef("media_chef")
+        self.client.force_login(self.chef)
+
+    def assertDeleted(self, name):
+        deadline = time.monotonic() + 5
+        while default_storage.exists(name) and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertFalse(default_storage.exists(name), f"{name} was left on disk")
+
+    def upload_profile_picture(self):
+        response = self.client.put(reverse("chef-profile"), encode_multipart(BOUNDARY, {"profile_picture": png("me.png")}),
+                                   content_type=MULTIPART_CONTENT)
+        self.assertEqual(response.status_code, 200)
+        return ChefProfile.objects.get(user=self.chef).profile_picture.name
+
+    def test_replaced_profile_pictures_are_deleted(self):
+        # Every upload goes to the same path, so a freed name can come back: check the directory instead
+        folder = f"chef_profiles/{self.chef.id}"
+        for _ in range(5):
+            current = self.upload_profile_picture()
+        deadline = time.monotonic() + 5
+        while len(default_storage.listdir(folder)[1]) > 1 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(default_storage.listdir(folder)[1], [current.rsplit("/", 1)[1]])
+
+        response = self.client.delete(reverse("delete-profile-picture"))
+        self.assertEqual(response.status_code, 200)
+        self.assertDeleted(current)
+
+    def test_replaced_dish_picture_is_deleted(self):
+        dish = Dish.objects.create(chef=self.chef, name="Nihari", description="Beef stew", available_time="dinner",
+                                   serving_number=2, price=900, picture=png("nihari.png"))
+        old = dish.picture.name
+        response = self.client.put(reverse("edit_dishes", kwargs={"dish_id": dish.id}),
+                                   encode_multipart(BOUNDARY, {"picture": png("nihari.png")}),
+                                   content_type=MULTIPART_CONTENT)
+        self.assertEqual(response.status_code, 200)
+        self.assertDeleted(old)
+        dish.refresh_from_db()
+        self.assertNotEqual(dish.picture.name, old)
+        self.assertTrue(default_storage.exists(dish.picture.name))
+
+
+def fresh_throttle_buckets(test):
+    store = mock.patch.object(throttling, "_store", throttling.LocalMemoryBucketStore())
+    store.start()
+    test.addCleanup(store.stop)
+
+
+class TokenTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user("token_user", "customer")
+
+    def setUp(self):
+        fresh_throttle_buckets(self)
+
+    def obtain(self, password="budget-pass-1"):
+        return self.client.post(reverse("token"), {"username": "token_user", "password": password},
+                                content_type="application/json")
+
+    def refresh(self, token):
+        return self.client.post(reverse("token-refresh"), {"refresh": token}, content_type="application/json")
+
+    def bearer(self, access):
+        return {"HTTP_AUTHORIZATION": f"Bearer {access}"}
+
+    def test_issue_and_use_an_access_token(self):
+        response = self.obtain()
+        self.assertEqual(response.status_code, 200)
+        tokens = response.json()
+        self.assertEqual(tokens["token_type"], "Bearer")
+        self.assertEqual(tokens["expires_in"], settings.ACCESS_TOKEN_LIFETIME)
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("user_info"), **self.bearer(tokens["access"]))
+        self.assertEqual(response.json()["username"], "token_user")
+
+        self.assertEqual(self.obtain("wrong-password").status_code, 400)
+
+    def test_refresh(self):
+        tokens = self.obtain().json()
+        response = self.refresh(tokens["refresh"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(reverse("user_info"), **self.bearer(response.json()["access"])).status_code, 200)
+        # An access token is no refresh token
+        self.assertEqual(self.refresh(tokens["access"]).status_code, 401)
+        self.assertEqual(self.refresh("garbage").status_code, 401)
+
+    def test_expired_tokens(self):
+        tokens = self.obtain().json()
+        later = time.time() + settings.ACCESS_TOKEN_LIFETIME + 1
+        with mock.patch("django.core.signing.time.time", return_value=later):
+            response = self.client.post(reverse("token-revoke"), **self.bearer(tokens["access"]))
+            self.assertEqual(response.status_code, 401)
+            self.assertEqual(response["WWW-Authenticate"], 'Bearer realm="api"')
+            self.assertEqual(self.refresh(tokens["refresh"]).status_code, 200)
+        later = time.time() + settings.REFRESH_TOKEN_LIFETIME + 1
+        with mock.patch("django.core.signing.time.time", return_value=later):
+            self.assertEqual(self.refresh(tokens["refresh"]).status_code, 401)
+
+    def test_bad_bearer_tokens_are_401(self):
+        for header in ["Bearer nonsense", "Bearer a b"]:
+            response = self.client.post(reverse("token-revoke"), HTTP_AUTHORIZATION=header)
+            self.assertEqual(response.status_code, 401)
+            self.assertEqual(response["WWW-Authenticate"], 'Bearer realm="api"')
+
+    def test_revoke(self):
+        tokens = self.obtain().json()
+        response = self.client.post(reverse("token-revoke"), **self.bearer(tokens["access"]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.refresh(tokens["refresh"]).status_code, 401)
+        self.assertEqual(self.refresh(self.obtain().json()["refresh"]).status_code, 200)
+
+    def test_password_change_with_a_bearer_token_revokes_tokens_issued_since_a_revoke(self):
+        first = self.obtain().json()
+        self.client.post(reverse("token-revoke"), **self.bearer(first["access"]))
+        second = self.obtain().json()
+
+        # The first access token still works until it expires, but carries the old token version
+        response = self.client.post(reverse("change-password"), {
+            "old_password": "budget-pass-1", "new_password": "budget-pass-2",
+        }, content_type="application/json", **self.bearer(first["access"]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.refresh(second["refresh"]).status_code, 401)
+
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual(user.token_version, 2)
+        self.assertTrue(user.check_password("budget-pass-2"))
+        self.assertEqual((user.username, user.email), ("token_user", "token_user@example.com"))
+
+
+class ThrottleTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user("throttle_user", "customer")
+
+    def setUp(self):
+        fresh_throttle_buckets(self)
+
+    def login(self, username="throttle_user", **extra):
+        return self.client.post(reverse("login"), {"username": username, "password": "wrong"},
+                                content_type="application/json", **extra)
+
+    def rates(self, **rates):
+        rest_framework = settings.REST_FRAMEWORK
+        return override_settings(REST_FRAMEWORK={
+            **rest_framework, "DEFAULT_THROTTLE_RATES": {**rest_framework["DEFAULT_THROTTLE_RATES"], **rates},
+        })
+
+    def test_forwarded_for_is_ignored_without_proxies(self):
+        with self.rates(login="3/m", login_username="100/h"):
+            statuses = [self.login(HTTP_X_FORWARDED_FOR=f"203.0.113.{i}").status_code for i in range(4)]
+        self.assertEqual(statuses, [400, 400, 400, 429])
+
+    def test_forwarded_for_behind_a_proxy(self):
+        with self.rates(login="3/m", login_username="100/h"), \
+                override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, "NUM_PROXIES": 1}):
+            statuses = [
+                self.login(HTTP_X_FORWARDED_FOR=f"198.51.100.7, 203.0.113.{i}").status_code for i in range(4)
+            ]
+            self.assertEqual(statuses, [400] * 4)  # one client IP each, as reported by the proxy
+            statuses = [self.login(HTTP_X_FORWARDED_FOR="203.0.113.9").status_code for _ in range(4)]
+            self.assertEqual(statuses, [400, 400, 400, 429])
+
+    def test_one_username_from_many_ips(self):
+        with self.rates(login="100/m", login_username="3/h"):
+            statuses = [self.login(REMOTE_ADDR=f"203.0.113.{i}").status_code for i in range(4)]
+            self.assertEqual(statuses, [400, 400, 400, 429])
+            self.assertEqual(self.login("someone_else").status_code, 400)
+            token = self.client.post(reverse("token"), {"username": "throttle_user", "password": "budget-pass-1"},
+                                     content_type="application/json")
+            self.assertEqual(token.status_code, 429)  # the same bucket guards the token endpoint
+            self.assertIn("Retry-After", token)
+
+    def test_prune_uses_each_buckets_own_rate(self):
+        store = throttling.LocalMemoryBucketStore()
+        store.max_keys = 2
+        with mock.patch("api.throttling.time.monotonic", return_value=1000.0):
+            store.consume("slow", 1, 1 / 3600)  # full again after an hour
+            store.consume("fast", 1, 1.0)  # full again after a second
+        with mock.patch("api.throttling.time.monotonic", return_value=1010.0):
+            store.consume("new", 1, 1.0)
+            self.assertEqual(set(store._buckets), {"slow", "new"})
+            self.assertGreater(store.consume("slow", 1, 1 / 3600), 0)  # still empty
+
+
+class MetricsAccessTests(TestCase):
+
+    def scrape(self, **extra):
+        return self.client.get("/metrics", REMOTE_ADDR="127.0.0.1", **extra).status_code
+
+    def test_allowed_ips_without_a_token(self):
+        with override_settings(METRICS={**settings.METRICS, "TOKEN": ""}):
+            self.assertEqual(self.scrape(), 200)
+            self.assertEqual(self.client.get("/metrics", REMOTE_ADDR="203.0.113.5").status_code, 403)
+
+    def test_token_is_required_when_set(self):
+        with override_settings(METRICS={**settings.METRICS, "TOKEN": "scrape-secret"}):
+            self.assertEqual(self.scrape(), 403)
+            self.assertEqual(self.scrape(HTTP_AUTHORIZATION="Bearer wrong"), 403)
+            self.assertEqual(self.scrape(HTTP_AUTHORIZATION="Bearer scrape-secret"), 200)
+
+    def test_deploy_check_warns_behind_a_proxy_without_a_token(self):
+        with override_settings(MEDIA_SENDFILE_BACKEND="nginx", METRICS={**settings.METRICS, "TOKEN": ""}):
+            self.assertEqual([w.id for w in metrics.check_metrics_access(None)], ["api.W001"])
+        with override_settings(MEDIA_SENDFILE_BACKEND="nginx", METRICS={**settings.METRICS, "TOKEN": "secret"}):
+            self.assertEqual(metrics.check_metrics_access(None), [])
+
+
+class DishImportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.chef = make_chef("import_chef")
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.client.force_login(self.chef)
+
+    def manifest(self, *rows):
+        header = "name,description,available_time,serving_number,price,picture\n"
+        return SimpleUploadedFile("menu.csv", (header + "".join(f"{row}\n" for row in rows)).encode())
+
+    def images(self, files):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            for name, data in files.items():
+                archive.writestr(name, data)
+        return SimpleUploadedFile("images.zip", buffer.getvalue(), content_type="application/zip")
+
+    def post(self, manifest, images=None):
+        data = {"manifest": manifest}
+        if images is not None:
+            data["images"] = images
+        return self.client.post(reverse("import-dishes"), data)
+
+    def test_creates_dishes_with_their_pictures(self):
+        response = self.post(
+            self.manifest("Pulao,Rice with stock,lunch,2,900,pulao.png", "Karahi,Chicken karahi,dinner,3,1500,"),
+            self.images({"pulao.png": png().read()}),
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["created"], 2)
+        pulao, karahi = Dish.objects.get(name="Pulao"), Dish.objects.get(name="Karahi")
+        self.assertTrue(pulao.picture.name.startswith("dish_pictures/pulao"))
+        self.assertTrue(default_storage.exists(pulao.picture.name))
+        self.assertEqual(karahi.picture.name, "defaults/default_dish.png")
+
+    def test_row_errors_create_nothing(self):
+        response = self.post(
+            self.manifest("Pulao,Rice with stock,lunch,2,900,", "Karahi,Chicken karahi,brunch,3,-5,", ",,lunch,2,900,"),
+        )
+        self.assertEqual(response.status_code, 400)
+        body = response.json()
+        self.assertEqual(body["created"], 0)
+        self.assertEqual([error["row"] for error in body["errors"]], [2, 3])
+        self.assertEqual(set(body["errors"][0]["errors"]), {"available_time", "price"})
+        self.assertFalse(Dish.objects.filter(chef=self.chef).exists())
+
+    def test_bad_archives_and_pictures(self):
+        response = self.post(self.manifest("Pulao,Rice,lunch,2,900,pulao.png"),
+                             SimpleUploadedFile("images.zip", b"not a zip"))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "Images must be uploaded as a zip archive."})
+
+        response = self.post(self.manifest("Pulao,Rice,lunch,2,900,missing.png"), self.images({"pulao.png": png().read()}))
+        self.assertEqual(response.json()["errors"][0]["errors"]["picture"],
+                         ["Picture 'missing.png' was not found in the images archive."])
+
+        response = self.post(self.manifest("Pulao,Rice,lunch,2,900,pulao.png"), self.images({"pulao.png": b"not an image"}))
+        self.assertEqual(response.json()["errors"][0]["errors"]["picture"], ["Invalid image format."])
+
+    def test_oversized_image(self):
+        image = png().read()
+        with override_settings(DISH_IMPORT_MAX_IMAGE_SIZE=len(image) - 1):
+            response = self.post(self.manifest("Pulao,Rice,lunch,2,900,pulao.png"), self.images({"pulao.png": image}))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["errors"][0]["errors"]["picture"], ["Image is too large."])
+
+
+class MediaServeTests(TestCase):
+    content = bytes(range(100))
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root, MEDIA_SENDFILE_BACKEND=None)
+        media.enable()
+        self.addCleanup(media.disable)
+        for name in ["dish_pictures/data.bin", "admin-interface/logo/logo.png", "private/notes.txt", "secret.txt"]:
+            default_storage.save(name, io.BytesIO(self.content))
+
+    def get(self, path, **headers):
+        response = self.client.get(f"/media/{path}", **headers)
+        self.addCleanup(response.close)
+        return response
+
+    def body(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_whole_file(self):
+        response = self.get("dish_pictures/data.bin")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.content)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertIn("public", response["Cache-Control"])
+        self.assertTrue(response["ETag"].startswith('"'))
+
+    def test_conditional_requests(self):
+        etag = self.get("dish_pictures/data.bin")["ETag"]
+        self.assertEqual(self.get("dish_pictures/data.bin", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.get("dish_pictures/data.bin", HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_ranges(self):
+        cases = {
+            "bytes=10-19": (10, 19),
+            "bytes=90-": (90, 99),
+            "bytes=95-500": (95, 99),  # clamped to the file
+            "bytes=-5": (95, 99),
+            "bytes=-500": (0, 99),
+        }
+        for header, (start, end) in cases.items():
+            with self.subTest(range=header):
+                response = self.get("dish_pictures/data.bin", HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(self.body(response), self.content[start:end + 1])
+                self.assertEqual(response["Content-Range"], f"bytes {start}-{end}/100")
+                self.assertEqual(response["Content-Length"], str(end - start + 1))
+
+    def test_unsatisfiable_and_ignored_ranges(self):
+        for header in ["bytes=100-", "bytes=20-10", "bytes=-0"]:
+            with self.subTest(range=header):
+                response = self.get("dish_pictures/data.bin", HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 416)
+                self.assertEqual(response["Content-Range"], "bytes */100")
+        for header in ["bytes=0-1,5-6", "items=0-5", "bytes=-"]:
+            with self.subTest(range=header):
+                response = self.get("dish_pictures/data.bin", HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(self.body(response), self.content)
+
+    def test_if_range(self):
+        etag = self.get("dish_pictures/data.bin")["ETag"]
+        response = self.get("dish_pictures/data.bin", HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+        response = self.get("dish_pictures/data.bin", HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.content)
+
+    def test_paths_outside_the_public_dirs(self):
+        for path in ["dish_pictures/../secret.txt", "dish_pictures/%2e%2e/secret.txt", "dish_pictures//data.bin",
+                     "dish_pictures/.hidden", "private/notes.txt", "secret.txt"]:
+            with self.subTest(path=path):
+                self.assertEqual(self.get(path).status_code, 404)
+        staff = make_user("media_staff", "customer", is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.get("private/notes.txt").status_code, 200)
+        self.assertEqual(self.get("dish_pictures/../secret.txt").status_code, 404)
+
+    def test_admin_interface_logo_is_public(self):
+        self.assertEqual(self.get("admin-interface/logo/logo.png").status_code, 200)
+
+    def test_sendfile_offload(self):
+        with override_settings(MEDIA_SENDFILE_BACKEND="nginx"):
+            response = self.get("dish_pictures/data.bin")
+        self.assertEqual(response["X-Accel-Redirect"], settings.MEDIA_ACCEL_REDIRECT_PREFIX + "dish_pictures/data.bin")
+        self.assertEqual(response.content, b"")
+
+
+class RendererTests(SimpleTestCase):
+    payload = {
+        "name": "Nihari \u2028 \u2029 \u00e9 \U0001f35b", "quote": 'He said "hi" \\ </script>',
+        "price": Decimal("12.50"), "date": date(2026, 1, 2), "created": datetime(2026, 1, 2, 3, 4, 5, 678901),
+        "nested": [{"id": 1, "tags": ("a", "b"), "none": None, "ok": True}], 7: "int key",
+        "floats": [0.1, 2.5, -3.0, 1e16, 1.5e-7],
+    }
+
+    def test_same_json_as_drf(self):
+        fast = renderers.FastJSONRenderer().render(self.payload)
+        drf = JSONRenderer().render(self.payload)
+        self.assertEqual(json.loads(fast), json.loads(drf))
+        without_floats = {k: v for k, v in self.payload.items() if k != "floats"}
+        self.assertEqual(renderers.dumps(without_floats), JSONRenderer().render(without_floats))
+
+    def test_float_exponents_are_spelled_differently(self):
+        self.assertEqual(renderers.dumps([1e16, 1.5e-7]), b"[1e16,1.5e-7]")
+        self.assertEqual(JSONRenderer().render([1e16, 1.5e-7]), b"[1e+16,1.5e-07]")
+
+    def test_non_finite_numbers_are_rejected(self):
+        for value in [float("nan"), float("inf"), -float("inf"), Decimal("NaN")]:
+            with self.subTest(value=value):
+                with self.assertRaisesMessage(ValueError, "Out of range float values are not JSON compliant"):
+                    renderers.dumps({"rows": [{"rating": value, "note": None}]})
+                with self.assertRaises(ValueError):
+                    renderers.FastJSONRenderer().render([value])
+        self.assertEqual(renderers.dumps({"rating": None}), b'{"rating":null}')
@@ -0,0 +1,160 @@
+"""
+Token-bucket throttles. DRF runs throttles before the view body, so a
+rejected login never reaches password hashing.
+
+Rates come from REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"] as "<requests>/<period>"
+(period: s, m, h or d); the request count is also the burst size. Bucket state
+lives in THROTTLE_BUCKET_STORE: per-process memory by default, or
+CacheBucketStore to share buckets between workers through a Django cache.
+
+Client IPs come from DRF's get_ident(), which trusts X-Forwarded-For only as
+far as REST_FRAMEWORK["NUM_PROXIES"] says.
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+
+
+def take_token(state, capacity, refill_rate, now):
+    """Apply one request to a ``(tokens, last_seen)`` bucket.
+
+    Returns the new state and how long to wait before a token is available
+    (0 when the request is allowed).
+    """
+    tokens, last_seen = state if state else (capacity, now)
+    tokens = min(capacity, tokens + (now - last_seen) * refill_rate)
+    if tokens >= 1:
+        return (tokens - 1, now), 0
+    return (tokens, now), (1 - tokens) / refill_rate
+
+
+class LocalMemoryBucketStore:
+    """Buckets in a dict guarded by a lock; limits apply per worker process."""
+    max_keys = 50000
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, refill_rate):
+        now = time.monotonic()
+        with self._lock:
+            state, _ = self._buckets.get(key, (None, None))
+            state, wait = take_token(state, capacity, refill_rate, now)
+            self._buckets[key] = (state, capacity / refill_rate)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+        return wait
+
+    def _prune(self, now):
+        # Buckets that have refilled completely carry no information. Each scope refills at its own rate.
+        for key in [
+            k for k, ((_, last_seen), full_after) in self._buckets.items() if now - last_seen > full_after
+        ]:
+            del self._buckets[key]
+
+
+class CacheBucketStore:
+    """Buckets in a shared Django cache. Read-modify-write is not atomic, so
+    concurrent requests may occasionally get an extra token."""
+
+    def __init__(self):
+        self.cache = caches[getattr(settings, "THROTTLE_CACHE_ALIAS", "default")]
+
+    def consume(self, key, capacity, refill_rate):
+        state, wait = take_token(self.cache.get(key), capacity, refill_rate, time.time())
+        self.cache.set(key, state, timeout=int(capacity / refill_rate) + 1)
+        return wait
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_bucket_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = import_string(settings.THROTTLE_BUCKET_STORE)()
+    return _store
+
+
+class TokenBucketThrottle(BaseThrottle):
+    scope = None
+
+    def __init__(self):
+        self.wait_time = 0
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        if rate is None:
+            raise ImproperlyConfigured(f"No throttle rate set for scope '{self.scope}'")
+        self.capacity, self.refill_rate = self.parse_rate(rate)
+
+    @staticmethod
+    def parse_rate(rate):
+        num, period = rate.split("/")
+        num = int(num)
+        return num, num / PERIODS[period[0]]
+
+    def get_cache_key(self, request, view):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        self.wait_time = get_bucket_store().consume(key, self.capacity, self.refill_rate)
+        return self.wait_time == 0
+
+    def wait(self):
+        return self.wait_time
+
+
+class IPThrottle(TokenBucketThrottle):
+    def get_cache_key(self, request, view):
+        return f"throttle:{self.scope}:ip:{self.get_ident(request)}"
+
+
+class UserThrottle(TokenBucketThrottle):
+    """Per user when authenticated, per IP otherwise."""
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return f"throttle:{self.scope}:user:{request.user.pk}"
+        return f"throttle:{self.scope}:ip:{self.get_ident(request)}"
+
+
+class UsernameThrottle(TokenBucketThrottle):
+    """Per submitted username, whatever the IP, against guessing one account's password from many addresses."""
+
+    def get_cache_key(self, request, view):
+        username = request.data.get("username") if hasattr(request.data, "get") else None
+        if not username or not isinstance(username, str):
+            return None
+        digest = hashlib.sha256(username.encode()).hexdigest()[:32]  # any length or characters
+        return f"throttle:{self.scope}:username:{digest}"
+
+
+class LoginThrottle(IPThrottle):
+    scope = "login"
+
+
+class LoginUsernameThrottle(UsernameThrottle):
+    scope = "login_username"
+
+
+class RegisterThrottle(IPThrottle):
+    scope = "register"
+
+
+class BookingThrottle(UserThrottle):
+    scope = "booking"
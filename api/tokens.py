@@ -0,0 +1,62 @@
+"""
+Short-lived signed access tokens and longer-lived refresh tokens built on
+django.core.signing. Access tokens carry the user id, username, role and
+token version, so authenticating them needs no database query. Refresh
+tokens are checked against User.token_version, which is bumped to revoke
+everything issued before.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import F
+
+ACCESS_SALT = "api.tokens.access"
+REFRESH_SALT = "api.tokens.refresh"
+
+User = get_user_model()
+
+
+def claims_for(user):
+    return {"uid": user.pk, "usr": user.username, "role": user.role, "ver": user.token_version}
+
+
+def issue_tokens(user):
+    claims = claims_for(user)
+    return {
+        "access": signing.dumps(claims, salt=ACCESS_SALT, compress=True),
+        "refresh": signing.dumps(claims, salt=REFRESH_SALT, compress=True),
+        "token_type": "Bearer",
+        "expires_in": settings.ACCESS_TOKEN_LIFETIME,
+    }
+
+
+def read_access_token(token):
+    """Return the claims of a valid access token or raise signing.BadSignature."""
+    return signing.loads(token, salt=ACCESS_SALT, max_age=settings.ACCESS_TOKEN_LIFETIME)
+
+
+def user_from_claims(claims):
+    """
+    Build a User from token claims without a query. Every other field is
+    deferred, so code that needs e.g. the password still loads it lazily.
+    """
+    return User.from_db(
+        DEFAULT_DB_ALIAS,
+        ["id", "username", "role", "token_version"],
+        [claims["uid"], claims["usr"], claims["role"], claims["ver"]],
+    )
+
+
+def refresh_tokens(token):
+    """Exchange a refresh token for a new token pair, or raise signing.BadSignature."""
+    claims = signing.loads(token, salt=REFRESH_SALT, max_age=settings.REFRESH_TOKEN_LIFETIME)
+    user = User.objects.filter(pk=claims["uid"], is_active=True).first()
+    if user is None or user.token_version != claims["ver"]:
+        raise signing.BadSignature("Token has been revoked")
+    return issue_tokens(user)
+
+
+def revoke_tokens(user):
+    """Invalidate every refresh token issued to the user (access tokens expire on their own)."""
+    User.objects.filter(pk=user.pk).update(token_version=F("token_version") + 1)
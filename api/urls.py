@@ -1,6 +1,6 @@
 
 from django.urls import path
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     # Authorization
@@ -9,6 +9,15 @@ urlpatterns = [
     path('change-password/', views.change_password, name='change-password'),
     path("user-info/", views.user_info, name="user_info"),
     path("logout/", views.logout_user, name="logout"),
+    path("token/", views.obtain_token, name="token"),
+    path("token/refresh/", views.refresh_token, name="token-refresh"),
+    path("token/revoke/", views.revoke_token, name="token-revoke"),
+
+    # landing page: user info, featured chefs and the first chefs page in one request
+    path('home/', views.home, name='home'),
+
+    # several API requests in one round trip
+    path('batch/', views.batch, name='batch'),
 
     # chef
     path('chef-profile/', views.chef_profile_view, name='chef-profile'),
@@ -19,10 +28,12 @@ urlpatterns = [
     path('chef-availability/', views.chef_availability, name='chef-availability'),
 
     # dishes
+    path('dishes/', views.dish_catalog, name='dish-catalog'),
     path('get-dish/<int:dish_id>/', views.get_dish, name='get_dish'),
     path('add-dishes/', views.manage_dish, name='add_dishes'),
     path('edit-dish/<int:dish_id>/', views.manage_dish, name='edit_dishes'),
     path('delete-dish/<int:dish_id>/', views.manage_dish, name='delete-dish'),
+    path('import-dishes/', views.import_dishes, name='import-dishes'),
 
     # Booking
     path('book-chef/', views.create_booking, name='create-booking'),
@@ -36,6 +47,13 @@ urlpatterns = [
     path('rate-chef/<int:chef_id>/', views.rate_chef, name='rate-chef'),
     path('get-chef-rating/<int:chef_id>/', views.get_chef_rating, name='get-chef-rating'),
 
+    # Async versions of the read endpoints, for ASGI workers
+    path('async/user-info/', async_views.user_info, name='async-user-info'),
+    path('async/chefs-list/', async_views.chefs_list, name='async-chefs-list'),
+    path('async/featured-Chef/', async_views.featured_chefs, name='async-featured-chef'),
+    path('async/chef-dishes/<int:chef_id>/<str:meal_type>/', async_views.chef_dishes, name='async-chef-dishes'),
+    path('async/get-dish/<int:dish_id>/', async_views.get_dish, name='async-get-dish'),
+
     
 
 ]
@@ -1,28 +1,48 @@
-from rest_framework.decorators import api_view, permission_classes, parser_classes
+from rest_framework.decorators import api_view, permission_classes, parser_classes, throttle_classes
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from django.contrib.auth import get_user_model
-from .serializers import RegisterSerializer, LoginSerializer, ChefProfileSerializer, UserSerializer, DishSerializer, BookingSerializer, ChefRatingSerializer
+from .serializers import RegisterSerializer, LoginSerializer, ChefProfileSerializer, UserSerializer, DishSerializer, DishImportSerializer, DishSimpleSerializer, DishCatalogFilterSerializer, BookingSerializer, ChefRatingSerializer, BatchSerializer
 from django.contrib.auth import login, logout
 from django.views.decorators.csrf import ensure_csrf_cookie, csrf_protect
 from django.middleware.csrf import get_token
 from .models import ChefProfile, Dish, Booking, ChefRating
 # from .models import *
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404
 from datetime import timedelta
 from django.utils import timezone
 from datetime import datetime
-from django.db.models import Case, When, Value, IntegerField
+from django.db.models import Case, When, Value, IntegerField, Count, Q, Window, prefetch_related_objects
 from django.core.exceptions import ObjectDoesNotExist
 from .pagination import StandardResultsSetPagination
+from .dish_import import parse_manifest, ImageArchive
+from .media_gc import queue_media_delete
+from .tokens import issue_tokens, refresh_tokens, revoke_tokens
+from .throttling import LoginThrottle, LoginUsernameThrottle, RegisterThrottle, BookingThrottle
+from .writer import run_write, use_write_queue
+from .caching import cache_public, home_cache_key, purge
+from .batch import run_batch
+from django.core import signing
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.utils.urls import replace_query_param
+import logging
 
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
+
+FEATURED_CHEFS = 4
 
 @api_view(["POST"])
+@throttle_classes([RegisterThrottle])
 @ensure_csrf_cookie
 def register_user(request):
     serializer = RegisterSerializer(data=request.data)
@@ -31,15 +51,13 @@ def register_user(request):
         user = serializer.save()  
         login(request, user)
 
-        response = Response({"message": "User registered and logged in successfully!"}, status=status.HTTP_201_CREATED)
-
-        request.session.create()
-        response.set_cookie("sessionid", request.session.session_key, httponly=True)   
-        return response 
+        # login() cycles the session key, SessionMiddleware saves it and sets the cookie once
+        return Response({"message": "User registered and logged in successfully!"}, status=status.HTTP_201_CREATED)
 
     return Response( serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(["POST"])
+@throttle_classes([LoginThrottle, LoginUsernameThrottle])
 @ensure_csrf_cookie
 def login_user(request):
     serializer = LoginSerializer(data=request.data)
@@ -53,20 +71,46 @@ def login_user(request):
             "role": user.role,  
         }
 
-        response = Response({"message": "Login successful", "user": user_data}, status=status.HTTP_200_OK)
-        
-        request.session.create()
-        response.set_cookie("sessionid", request.session.session_key, httponly=True)
-        return response
+        return Response({"message": "Login successful", "user": user_data}, status=status.HTTP_200_OK)
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(["POST"])
+@throttle_classes([LoginThrottle, LoginUsernameThrottle])
+def obtain_token(request):
+    """Exchange username/password for an access and refresh token."""
+    serializer = LoginSerializer(data=request.data)
+    if serializer.is_valid():
+        return Response(issue_tokens(serializer.validated_data['user']), status=status.HTTP_200_OK)
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(["POST"])
+def refresh_token(request):
+    token = request.data.get('refresh')
+    if not token:
+        return Response({"refresh": "This field is required."}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        tokens = refresh_tokens(token)
+    except (signing.BadSignature, KeyError, TypeError):
+        return Response({"detail": "Invalid or expired refresh token."}, status=status.HTTP_401_UNAUTHORIZED)
+    return Response(tokens, status=status.HTTP_200_OK)
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def revoke_token(request):
+    """Revoke every token issued to the current user."""
+    revoke_tokens(request.user)
+    return Response({"detail": "Tokens revoked."}, status=status.HTTP_200_OK)
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def change_password(request):
-    user = request.user
-    print("user pasword", user)
+    # A bearer token's user is built from its claims, without the password or the current token_version
+    user = request.user if request.auth is None else User.objects.get(pk=request.user.pk)
     old_password = request.data.get('old_password')
     new_password = request.data.get('new_password')
 
@@ -77,10 +121,13 @@ def change_password(request):
         return Response({"detail": "New password cannot be the same as the old password."}, status=status.HTTP_400_BAD_REQUEST)
     
     if not user.check_password(old_password):
+        logger.warning("Password change for user %s rejected: wrong current password", user.id)
         return Response({"detail": "Incorrect current password."}, status=status.HTTP_400_BAD_REQUEST)
 
     user.set_password(new_password)
-    user.save()
+    user.save(update_fields=['password'])
+    revoke_tokens(user)
+    logger.info("Password changed for user %s", user.id)
 
     return Response({"detail": "Password changed successfully."}, status=status.HTTP_200_OK)
 
@@ -88,14 +135,7 @@ def change_password(request):
 
 @api_view(["GET"])
 def user_info(request):
-    if request.user.is_authenticated:
-        return Response({
-            "isAuthenticated": True,
-            "id": request.user.id,
-            "username": request.user.username,
-            "role": request.user.role, 
-        })
-    return Response({"isAuthenticated": False}, status=200)
+    return Response(user_info_data(request.user), status=200)
 
 # @login_required
 @api_view(["POST"])
@@ -113,7 +153,6 @@ def logout_user(request):
 @permission_classes([IsAuthenticated])
 def chef_profile_view(request):
     """Retrieve and update the chef's profile."""
-    print('request', request.data)
     try:
         profile = ChefProfile.objects.get(user=request.user)
     except ChefProfile.DoesNotExist:
@@ -125,6 +164,7 @@ def chef_profile_view(request):
         return Response(serializer.data)
 
     elif request.method == 'PUT':
+        logger.debug("Chef profile update for user %s: %s", request.user.id, sorted(request.data))
         serializer = ChefProfileSerializer(profile, data=request.data,  partial=True, context={'request': request})
         if serializer.is_valid():
             serializer.save()
@@ -138,9 +178,10 @@ def delete_profile_picture(request):
     try:
         profile = ChefProfile.objects.get(user=request.user)
         if profile.profile_picture and profile.profile_picture.name != 'defaults/default_profile.png':
-            profile.profile_picture.delete(save=False)
+            old_picture = profile.profile_picture.name
             profile.profile_picture = 'defaults/default_profile.png'
             profile.save()
+            queue_media_delete(old_picture)
             return Response({'detail': 'Profile picture removed successfully.'})
         return Response({'detail': 'No custom profile picture to delete.'}, status=400)
     except ChefProfile.DoesNotExist:
@@ -175,14 +216,20 @@ def chef_availability(request):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-@api_view(['GET'])
-def chefs_list(request):
+def chefs_queryset(user):
+    """Chefs by rating, as listed to ``user`` (chefs don't see themselves)."""
     chefs = User.objects.filter(role="chef").select_related('chefprofile')
 
-    if request.user.is_authenticated and request.user.role == "chef":
-        chefs = chefs.exclude(id=request.user.id)
+    if user.is_authenticated and user.role == "chef":
+        chefs = chefs.exclude(id=user.id)
+
+    return chefs.order_by('-chefprofile__average_rating')
 
-    chefs = chefs.order_by('-chefprofile__average_rating')
+
+@cache_public("chefs")
+@api_view(['GET'])
+def chefs_list(request):
+    chefs = chefs_queryset(request.user)
 
     paginator = StandardResultsSetPagination()
     paginated_chefs = paginator.paginate_queryset(chefs, request)
@@ -190,19 +237,64 @@ def chefs_list(request):
     return paginator.get_paginated_response(serializer.data)
 
 
+@cache_public("chefs")
 @api_view(['GET'])
 def featured_chefs(request):
-    chefs = User.objects.filter(role="chef").select_related('chefprofile')
-
-    if request.user.is_authenticated and request.user.role == "chef":
-        chefs = chefs.exclude(id=request.user.id)
-
-    chefs = chefs.order_by('-chefprofile__average_rating')[:4]  # Apply ordering and slicing after filtering
+    chefs = chefs_queryset(request.user)[:FEATURED_CHEFS]
 
     serializer = UserSerializer(chefs, many=True, context={'request': request})
     return Response(serializer.data)
 
 
+def user_info_data(user):
+    if user.is_authenticated:
+        return {
+            "isAuthenticated": True,
+            "id": user.id,
+            "username": user.username,
+            "role": user.role,
+        }
+    return {"isAuthenticated": False}
+
+
+@cache_public("chefs")
+@api_view(['GET'])
+def home(request):
+    """
+    Everything the landing page needs in one request: user-info,
+    featured-Chef and the first chefs-list page. The featured chefs are the
+    top of that page, so a single query (with a window count) loads all of
+    it. The anonymous variant is cached for HOME_CACHE_SECONDS, or until a
+    chef profile changes (api.caching.purge).
+    """
+    anonymous = not request.user.is_authenticated
+    if anonymous:
+        cache_key = home_cache_key(request)
+        data = cache.get(cache_key)
+        if data is not None:
+            return Response(data)
+
+    page_size = StandardResultsSetPagination.page_size
+    chefs = list(chefs_queryset(request.user).annotate(total=Window(Count('id')))[:page_size])
+    count = chefs[0].total if chefs else 0
+    results = UserSerializer(chefs, many=True, context={'request': request}).data
+
+    next_url = None
+    if count > page_size:
+        next_url = replace_query_param(
+            request.build_absolute_uri(reverse('chefs_list')), StandardResultsSetPagination.page_query_param, 2,
+        )
+    data = {
+        "user": user_info_data(request.user),
+        "featured_chefs": results[:FEATURED_CHEFS],
+        "chefs": {"count": count, "next": next_url, "previous": None, "results": results},
+    }
+    if anonymous:
+        cache.set(cache_key, data, settings.HOME_CACHE_SECONDS)
+    return Response(data)
+
+
+@cache_public("chef-{chef_id}")
 @api_view(['GET'])
 def chef_dishes(request, chef_id, meal_type=None):
     """Fetch all dishes of a specific chef filtered by meal type."""
@@ -210,10 +302,9 @@ def chef_dishes(request, chef_id, meal_type=None):
     chef_data = UserSerializer(chef, context={'request': request})  # Fetch chef & profile data
 
     # Check if a meal_type is provided, and filter dishes accordingly
+    dishes = Dish.objects.filter(chef=chef).select_related('chef__chefprofile').order_by('id')
     if meal_type:
-        dishes = Dish.objects.filter(chef=chef, available_time=meal_type)
-    else:
-        dishes = Dish.objects.filter(chef=chef)
+        dishes = dishes.filter(available_time=meal_type)
 
     # Paginate the dishes based on the meal type (breakfast, lunch, or dinner)
     paginator = StandardResultsSetPagination()
@@ -230,6 +321,55 @@ def chef_dishes(request, chef_id, meal_type=None):
 
 
 
+@api_view(['GET'])
+def dish_catalog(request):
+    """Browse dishes across all chefs with filters and facet counts."""
+    filters = DishCatalogFilterSerializer(data=request.query_params)
+    if not filters.is_valid():
+        return Response(filters.errors, status=status.HTTP_400_BAD_REQUEST)
+    params = filters.validated_data
+
+    dishes = Dish.objects.all()
+    if 'serving_number' in params:
+        dishes = dishes.filter(serving_number=params['serving_number'])
+    if params['available']:
+        # Chef must be available overall and for the dish's meal slot
+        available = Q()
+        for meal, flag in ChefProfile.MEAL_FLAGS.items():
+            values = ChefProfile.availability_values(ChefProfile.AVAILABLE | flag)
+            available |= Q(available_time=meal, chef__chefprofile__availability__in=values)
+        dishes = dishes.filter(available)
+
+    # Each facet ignores its own filter so clients can see what switching to another value would give
+    meal_q = Q(available_time=params['meal_type']) if 'meal_type' in params else Q()
+    price_q = Q()
+    if 'min_price' in params:
+        price_q &= Q(price__gte=params['min_price'])
+    if 'max_price' in params:
+        price_q &= Q(price__lte=params['max_price'])
+
+    facet_counts = {}
+    for meal, _ in Dish.AVAILABLE_TIMES:
+        facet_counts[f'meal_{meal}'] = Count('id', filter=Q(available_time=meal) & price_q)
+    for index, (label, low, high) in enumerate(Dish.PRICE_BUCKETS):
+        bucket_q = Q(price__gte=low) & (Q(price__lt=high) if high is not None else Q())
+        facet_counts[f'price_{index}'] = Count('id', filter=bucket_q & meal_q)
+    counts = dishes.aggregate(**facet_counts)  # single grouped query for every facet
+
+    dishes = dishes.filter(meal_q & price_q).select_related('chef__chefprofile').order_by('price', 'id')
+    paginator = StandardResultsSetPagination()
+    paginated_dishes = paginator.paginate_queryset(dishes, request)
+    serializer = DishSerializer(paginated_dishes, many=True, context={'request': request})
+
+    response = paginator.get_paginated_response(serializer.data)
+    response.data['facets'] = {
+        "meal_type": {meal: counts[f'meal_{meal}'] for meal, _ in Dish.AVAILABLE_TIMES},
+        "price": {label: counts[f'price_{index}'] for index, (label, _, _) in enumerate(Dish.PRICE_BUCKETS)},
+    }
+    return response
+
+
+@cache_public("dish-{dish_id}")
 @api_view(['GET'])
 def get_dish(request, dish_id):
     """Retrieve details of a single dish."""
@@ -267,14 +407,74 @@ def manage_dish(request, dish_id=None, chef_id=None):
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@parser_classes([MultiPartParser, FormParser])
+def import_dishes(request):
+    """Create a whole menu at once from a CSV/JSON `manifest` and an optional zip of `images`."""
+    if request.user.role != 'chef':
+        return Response({"error": "Only chefs can import dishes"}, status=status.HTTP_403_FORBIDDEN)
+
+    manifest = request.FILES.get('manifest')
+    if not manifest:
+        return Response({"manifest": "A CSV or JSON manifest file is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        rows = parse_manifest(manifest)
+        images = ImageArchive(request.FILES['images']) if 'images' in request.FILES else None
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    if not rows:
+        return Response({"manifest": "The manifest does not contain any dishes."}, status=status.HTTP_400_BAD_REQUEST)
+    if len(rows) > settings.DISH_IMPORT_MAX_ROWS:
+        return Response({"manifest": f"A manifest can contain at most {settings.DISH_IMPORT_MAX_ROWS} dishes."}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Validate every row in one pass so the chef gets all errors back at once
+    serializer = DishImportSerializer(data=rows, many=True, context={'request': request, 'images': images})
+    if not serializer.is_valid():
+        errors = [{"row": index, "errors": row_errors} for index, row_errors in enumerate(serializer.errors, start=1) if row_errors]
+        return Response({"created": 0, "errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    saved_pictures = []
+    dishes = []
+    try:
+        for row in serializer.validated_data:
+            picture = row.pop('picture', None)
+            dish = Dish(chef=request.user, **row)
+            if picture:
+                name = Dish._meta.get_field('picture').generate_filename(dish, picture)
+                dish.picture = default_storage.save(name, ContentFile(images.read(picture)))
+                saved_pictures.append(dish.picture.name)
+            dish.set_time_range()  # bulk_create skips Dish.save()
+            dishes.append(dish)
+
+        with transaction.atomic():
+            dishes = Dish.objects.bulk_create(dishes)
+            purge([f"chef-{request.user.pk}"])  # bulk_create sends no post_save (api/signals.py)
+    except Exception:
+        for name in saved_pictures:
+            default_storage.delete(name)
+        raise
+
+    return Response({
+        "created": len(dishes),
+        "dishes": DishSimpleSerializer(dishes, many=True).data,
+        "errors": [],
+    }, status=status.HTTP_201_CREATED)
+
 # Booking
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([BookingThrottle])
 def create_booking(request):
     serializer = BookingSerializer(data=request.data, context={'request': request})
 
     if serializer.is_valid():
-        saved_booking = serializer.save()
+        saved_booking = run_write(serializer.save)
+        # dishes and dishes_details both read them
+        prefetch_related_objects(saved_booking if isinstance(saved_booking, list) else [saved_booking], 'dishes')
         # If multiple bookings were created
         if isinstance(saved_booking, list):
             serialized_data = BookingSerializer(saved_booking, many=True).data
@@ -283,13 +483,14 @@ def create_booking(request):
 
         return Response(serialized_data, status=status.HTTP_201_CREATED)
     else:
-        print("Serializer Errors:", serializer.errors)  # Add this line to print errors
+        logger.info("Booking rejected for user %s: %s", request.user.id, serializer.errors)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def customer_bookings(request):
+    expire_and_complete_bookings(Booking.objects.filter(customer=request.user))
     bookings = Booking.objects.filter(customer=request.user).annotate(
         custom_priority=Case(
             When(status='pending', booking_type='urgent', then=Value(1)),
@@ -307,17 +508,12 @@ def customer_bookings(request):
             default=Value(13),
             output_field=IntegerField()
         ),
-    ).order_by('custom_priority')
+    ).select_related('chef', 'customer').prefetch_related('dishes').order_by('custom_priority')
 
     # Apply pagination
     paginator = StandardResultsSetPagination()
     paginated_bookings = paginator.paginate_queryset(bookings, request)
 
-    # Run status checks only on paginated items
-    for booking in paginated_bookings:
-        check_and_expire_booking(booking)
-        check_and_complete_booking(booking)
-
     serializer = BookingSerializer(paginated_bookings, many=True, context={"request": request})
     return paginator.get_paginated_response(serializer.data)
 
@@ -326,6 +522,7 @@ def customer_bookings(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def chef_upcoming_bookings(request):
+    expire_and_complete_bookings(Booking.objects.filter(chef=request.user))
     bookings = Booking.objects.filter(chef=request.user).annotate(
         custom_priority=Case(
             When(status='pending', booking_type='urgent', then=Value(1)),
@@ -343,10 +540,7 @@ def chef_upcoming_bookings(request):
             default=Value(13),
             output_field=IntegerField()
         )
-    ).order_by('custom_priority')
-    for booking in bookings:
-        check_and_expire_booking(booking)
-        check_and_complete_booking(booking)
+    ).select_related('chef', 'customer').prefetch_related('dishes').order_by('custom_priority')
 
     paginator = StandardResultsSetPagination()
     paginated_bookings = paginator.paginate_queryset(bookings, request)
@@ -365,69 +559,68 @@ def update_booking_status(request, booking_id):
         if new_status not in ['pending', 'confirmed', 'rejected', 'cancelled', 'completed']:
             return Response({'error': 'Invalid status'}, status=status.HTTP_400_BAD_REQUEST)
         
-        if new_status == 'confirmed':
-            # Prevent confirming if another booking is already confirmed
-            exists = Booking.objects.filter(
-                chef=booking.chef,
-                date=booking.date,
-                slot=booking.slot,
-                booking_type=booking.booking_type,
-                status='confirmed'
-            ).exclude(id=booking.id).exists()
-
-            if exists:
-                return Response(
-                    {'error': f"You have already confirmed a booking for {booking.slot} ({booking.booking_type}) on {booking.date}."},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-        booking.status = new_status
-        booking.status_updated_at = timezone.now()
-        booking.save()
+        def apply_status():
+            # Check and save in the same write so two confirmations cannot race
+            if new_status == 'confirmed':
+                # Prevent confirming if another booking is already confirmed
+                exists = Booking.objects.filter(
+                    chef=booking.chef,
+                    date=booking.date,
+                    slot=booking.slot,
+                    booking_type=booking.booking_type,
+                    status='confirmed'
+                ).exclude(id=booking.id).exists()
+                if exists:
+                    return False
+            booking.status = new_status
+            booking.status_updated_at = timezone.now()
+            booking.save()
+            return True
+
+        if not run_write(apply_status):
+            return Response(
+                {'error': f"You have already confirmed a booking for {booking.slot} ({booking.booking_type}) on {booking.date}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         return Response({'message': 'Booking status updated successfully'})
 
     except Booking.DoesNotExist:
         return Response({'error': 'Booking not found'}, status=status.HTTP_404_NOT_FOUND)
 
 
-def check_and_expire_booking(booking):
-    now = timezone.now()
-
-    if booking.status != 'pending':
-        return  # No need to check if already confirmed/rejected
-
-    if booking.booking_type == 'urgent':
-        expiry_time = booking.created_at + timedelta(minutes=15)
-    elif booking.booking_type == 'prebooking':
-        expiry_time = booking.created_at + timedelta(hours=1)
+def expire_and_complete_bookings(bookings):
+    """
+    Marks the overdue pending bookings in ``bookings`` as expired and the confirmed
+    ones whose slot has ended as completed, in one UPDATE, so the list views can
+    order and paginate in the database. Nothing is written when no booking is stale.
+    """
+    now = timezone.localtime()
+
+    # Pending bookings expire 15 minutes (urgent) or an hour (pre-booking) after they were made
+    expired = Q(status='pending') & (
+        Q(booking_type='urgent', created_at__lt=now - timedelta(minutes=15))
+        | Q(booking_type='prebooking', created_at__lt=now - timedelta(hours=1))
+    )
+
+    # Confirmed bookings are completed once the end of their slot has passed
+    ended_slots = [
+        slot for slot, (_, end) in Dish.AVAILABLE_TIME_RANGES.items()
+        if now.time() > datetime.strptime(end, "%H:%M").time()
+    ]
+    completed = Q(status='confirmed') & (
+        Q(date__lt=now.date(), slot__in=list(Dish.AVAILABLE_TIME_RANGES))
+        | Q(date=now.date(), slot__in=ended_slots)
+    )
+
+    stale = bookings.filter(expired | completed)
+    # Most list reads find nothing to change, and shouldn't take the write lock for it
+    if not stale.exists():
+        return
+    new_status = Case(When(expired, then=Value('expired')), default=Value('completed'))
+    if use_write_queue():
+        run_write(stale.update, status=new_status)
     else:
-        return 
-
-    if now > expiry_time:
-        booking.status = 'expired'
-        booking.save()
-
-
-def check_and_complete_booking(booking):
-    if booking.status != 'confirmed':
-        return  # Only confirmed bookings are eligible
-
-    now = timezone.now()
-
-    # Get the time range for the booking slot
-    time_range = Dish.AVAILABLE_TIME_RANGES.get(booking.slot)
-    if not time_range:
-        return  
-
-    slot_end_str = time_range[1] 
-    
-    # Combine the booking date and slot end time
-    slot_end_time = datetime.combine(booking.date, datetime.strptime(slot_end_str, "%H:%M").time())
-    slot_end_time = timezone.make_aware(slot_end_time, timezone.get_current_timezone())
-
-    # If current time is past slot end, mark as completed
-    if now > slot_end_time:
-        booking.status = 'completed'
-        booking.save()
+        stale.update(status=new_status)  # a single statement, atomic without a transaction
 
 @api_view(['PATCH'])
 @permission_classes([IsAuthenticated])
@@ -455,17 +648,20 @@ def rate_chef(request, chef_id):
     if not rating_value or int(rating_value) not in range(1, 6):
         return Response({"error": "Invalid rating"}, status=400)
 
-    # Check if the user has already rated this chef
-    existing_rating = ChefRating.objects.filter(user=request.user, chef=chef.user).first()
+    def save_rating():
+        # Check if the user has already rated this chef
+        existing_rating = ChefRating.objects.filter(user=request.user, chef=chef.user).first()
 
-    if existing_rating:
-        existing_rating.rating = rating_value
-        existing_rating.save()
-    else:
-        ChefRating.objects.create(user=request.user, chef=chef.user, rating=rating_value)
-    
-    # After rating, update the chef's average rating and total ratings
-    chef.update_rating()
+        if existing_rating:
+            existing_rating.rating = rating_value
+            existing_rating.save()
+        else:
+            ChefRating.objects.create(user=request.user, chef=chef.user, rating=rating_value)
+
+        # After rating, update the chef's average rating and total ratings
+        chef.update_rating()
+
+    run_write(save_rating)
     
     return Response({"success": "Rating submitted successfully"}, status=200)
 
@@ -480,4 +676,18 @@ def get_chef_rating(request, chef_id):
         return Response({'rating': rating_value})
 
     except Exception as e:
-        return Response({'error': 'An internal error occurred.'}, status=500)
\ No newline at end of file
+        return Response({'error': 'An internal error occurred.'}, status=500)
+
+@api_view(['POST'])
+def batch(request):
+    """
+    Runs several API requests in one round trip, as the same user:
+    {"requests": [{"method": "GET", "path": "/api/get-dish/1/"}, ...]}.
+    Answers {"responses": [{"status": 200, "body": {...}}, ...]} in the same
+    order. See api/batch.py for how they are run.
+    """
+    serializer = BatchSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    content = run_batch(request._request, serializer.validated_data['requests'])
+    return HttpResponse(content, content_type="application/json")
@@ -0,0 +1,92 @@
+"""
+Worker warm-up, run by the gunicorn hooks in gunicorn.conf.py.
+
+warm_app() runs once in the master after the app is preloaded. It imports
+every view (and with them DRF, Pillow and the serializers), populates the
+URL resolver, resolves DRF's lazy settings and builds each serializer's
+fields, so forked workers start with all of that done. warm_worker() runs
+in each worker before it accepts requests: it opens the database
+connections, reads the hot chef list into SQLite's page cache and connects
+the caches. Both return {step: seconds}.
+"""
+import logging
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.urls import get_resolver
+from rest_framework.serializers import BaseSerializer
+from rest_framework.settings import api_settings
+
+from . import serializers
+from .models import User
+from .pagination import StandardResultsSetPagination
+
+logger = logging.getLogger(__name__)
+
+
+def timed(timings, step, func):
+    started = time.perf_counter()
+    func()
+    timings[step] = time.perf_counter() - started
+
+
+def describe(timings):
+    return ", ".join(f"{step} {seconds * 1000:.1f} ms" for step, seconds in timings.items())
+
+
+def populate_urls():
+    # Loads every urlconf, importing all views, and builds the reverse lookup tables
+    get_resolver().reverse_dict
+
+
+def resolve_drf_settings():
+    # DRF imports renderer, parser, authentication etc. classes on first access
+    for name in api_settings.defaults:
+        getattr(api_settings, name)
+
+
+def build_serializers():
+    for model in apps.get_models():
+        model._meta.get_fields()
+    for cls in vars(serializers).values():
+        if isinstance(cls, type) and issubclass(cls, BaseSerializer) and cls.__module__ == serializers.__name__:
+            try:
+                cls().fields
+            except Exception:
+                logger.debug("Couldn't build %s fields during warm-up", cls.__name__, exc_info=True)
+
+
+def warm_app():
+    timings = {}
+    timed(timings, "urls", populate_urls)
+    timed(timings, "drf settings", resolve_drf_settings)
+    timed(timings, "serializers", build_serializers)
+    # Nothing above should connect, but a connection must never be shared with forked workers
+    connections.close_all()
+    return timings
+
+
+def open_connections():
+    for connection in connections.all():
+        connection.ensure_connection()
+
+
+def prime_page_cache():
+    chefs = User.objects.filter(role="chef").select_related('chefprofile').order_by('-chefprofile__average_rating')
+    list(chefs[:StandardResultsSetPagination.page_size])
+
+
+def connect_caches():
+    for alias in settings.CACHES:
+        caches[alias].get("warmup")
+
+
+def warm_worker():
+    timings = {}
+    timed(timings, "database", open_connections)
+    timed(timings, "page cache", prime_page_cache)
+    timed(timings, "caches", connect_caches)
+    return timings
@@ -0,0 +1,114 @@
+"""
+Optional single-writer queue for SQLite.
+
+SQLite allows one writer at a time, so request threads that write at the
+same moment end up queueing on the database lock (and on busy_timeout).
+With WRITE_QUEUE["ENABLED"] every write submitted through run_write() is
+handed to one writer thread per process instead. The writer drains up to
+BATCH_SIZE jobs at a time and runs them in one transaction, each job in
+its own savepoint so a failing job does not roll back the others.
+run_write() waits for its job and returns the job's result.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class WriteQueueFull(Exception):
+    pass
+
+
+class WriteQueue:
+
+    def __init__(self, max_size=1000, batch_size=50, max_wait=0.002):
+        self.jobs = queue.Queue(maxsize=max_size)
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            self.jobs.put((future, fn, args, kwargs), timeout=settings.WRITE_QUEUE["TIMEOUT"])
+        except queue.Full:
+            raise WriteQueueFull("Write queue is full")
+        return future
+
+    def _next_batch(self):
+        batch = [self.jobs.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self.jobs.get(timeout=remaining) if remaining > 0 else self.jobs.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            close_old_connections()
+            results = []
+            try:
+                with transaction.atomic():
+                    for future, fn, args, kwargs in batch:
+                        if not future.set_running_or_notify_cancel():
+                            continue
+                        try:
+                            with transaction.atomic():
+                                results.append((future, fn(*args, **kwargs), None))
+                        except Exception as e:
+                            results.append((future, None, e))
+            except Exception as e:
+                # The shared commit failed, nothing in the batch was written
+                logger.exception("Write batch of %d jobs failed", len(batch))
+                for future, _, _, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                connection.close()
+                continue
+
+            # Only report success once the batch is committed
+            for future, result, error in results:
+                if error is None:
+                    future.set_result(result)
+                else:
+                    future.set_exception(error)
+
+
+_write_queue = None
+_write_queue_lock = threading.Lock()
+
+
+def get_write_queue():
+    global _write_queue
+    if _write_queue is None:
+        with _write_queue_lock:
+            if _write_queue is None:
+                config = settings.WRITE_QUEUE
+                _write_queue = WriteQueue(config["MAX_SIZE"], config["BATCH_SIZE"], config["MAX_WAIT"])
+    return _write_queue
+
+
+def use_write_queue():
+    # A caller already inside a transaction may hold the write lock, and the writer
+    # thread would wait for it. Those writes stay inline.
+    return settings.WRITE_QUEUE["ENABLED"] and not connection.in_atomic_block
+
+
+def run_write(fn, *args, **kwargs):
+    """Run a write through the writer thread when enabled, inline otherwise, and return its result."""
+    if not use_write_queue():
+        with transaction.atomic():
+            return fn(*args, **kwargs)
+    return get_write_queue().submit(fn, *args, **kwargs).result(timeout=settings.WRITE_QUEUE["TIMEOUT"])
+
@@ -5,6 +5,19 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
+
+Worker setup: the async read endpoints under /api/async/ (api/async_views.py)
+only pay off on an ASGI server, where one worker process serves many
+connections from a single event loop:
+
+    DB_CONN_MAX_AGE=0 uvicorn backend.asgi:application \
+        --workers $(nproc) --host 0.0.0.0 --port 8000 --no-access-log
+
+Use about one worker per CPU core instead of the sync setup's extra workers
+per core. Sync DRF views keep working and run in a thread per request.
+Persistent database connections are not reused between ASGI requests, so
+keep DB_CONN_MAX_AGE=0. `manage.py bench_asgi` compares this setup against
+the sync gunicorn workers.
 """
 
 import os
@@ -391,6 +391,8 @@ import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
+# Files the app writes at runtime (session cache, profiles, slow-query log)
+VAR_DIR = Path(os.environ.get("VAR_DIR", BASE_DIR / "var"))
 
 SECRET_KEY = os.environ.get("DJANGO_SECRET_KEY", "your-secret-key")
 DEBUG = True
@@ -423,10 +425,18 @@ MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",  # must be at the top
     'backend.middleware.CustomCORSHeadersMiddleware',
     "django.middleware.security.SecurityMiddleware",
+    "api.middleware.RequestContextMiddleware",
+    "api.middleware.MetricsMiddleware",
+    "api.middleware.CompressionMiddleware",
+    "api.middleware.CachePolicyMiddleware",
+    "api.middleware.SessionIOMiddleware",
+    "api.middleware.QueryBudgetMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "api.middleware.ProfilingMiddleware",
+    "api.middleware.ReadReplicaMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -458,7 +468,222 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # Keep connections open between requests instead of reopening the file each time
+        "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", 600)),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            "timeout": 20,
+            # Take the write lock at BEGIN so busy_timeout applies instead of failing on lock upgrade
+            "transaction_mode": "IMMEDIATE",
+        },
+    }
+}
+
+# Optional read replica for READ_REPLICA_VIEWS. Locally any copy of the primary
+# works, e.g. `sqlite3 db.sqlite3 ".backup replica.sqlite3"` and
+# DATABASE_REPLICA_PATH=replica.sqlite3.
+if os.environ.get("DATABASE_REPLICA_PATH"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "NAME": os.environ["DATABASE_REPLICA_PATH"],
+        "TEST": {"MIRROR": "default"},
     }
+
+DATABASE_ROUTERS = ["api.routers.ReadReplicaRouter"]
+READ_REPLICA_ALIAS = "replica"
+READ_REPLICA_VIEWS = [
+    "home", "chefs_list", "featured-Chef", "chef_dishes", "get_dish", "dish-catalog",
+    "async-chefs-list", "async-featured-chef", "async-chef-dishes", "async-get-dish",
+]
+# After a write the client reads from the primary for this long
+READ_REPLICA_PIN_COOKIE = "pin_primary"
+READ_REPLICA_PIN_SECONDS = 5
+
+# Per-request query limits checked by QueryBudgetMiddleware. VIEWS maps url_name
+# to a maximum query count (DEFAULT for unlisted views, None for no limit);
+# the same SQL shape run more than DUPLICATE_THRESHOLD times is reported as N+1.
+QUERY_BUDGET = {
+    "ACTION": os.environ.get("QUERY_BUDGET_ACTION", "log"),  # "log" or "raise"
+    "DEFAULT": 10,
+    "DUPLICATE_THRESHOLD": 3,
+    "HEADERS": DEBUG,
+    "VIEWS": {
+        "home": 2,
+        "chefs_list": 3,
+        "featured-Chef": 2,
+        "chef_dishes": 4,
+        "dish-catalog": 3,
+        "get_dish": 2,
+        "customer-bookings": 7,
+        "chef-upcoming-bookings": 7,
+        "async-chefs-list": 3,
+        "async-featured-chef": 2,
+        "async-chef-dishes": 4,
+        "async-get-dish": 2,
+    },
+}
+
+# With SLOW_QUERY_ENABLED=1, queries slower than THRESHOLD_MS are appended to
+# LOG_FILE with their query plan (api/slowlog.py); `manage.py slow_queries`
+# summarizes the file.
+SLOW_QUERY = {
+    "ENABLED": os.environ.get("SLOW_QUERY_ENABLED", "0") == "1",
+    "THRESHOLD_MS": float(os.environ.get("SLOW_QUERY_MS", 100)),
+    "LOG_FILE": os.environ.get("SLOW_QUERY_LOG", str(VAR_DIR / "slow_queries.jsonl")),
+}
+
+# Applied to every new SQLite connection via the connection_created signal (api/signals.py)
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",  # readers no longer block the writer
+    "busy_timeout": 20000,  # ms to wait for the write lock before "database is locked"
+    "synchronous": "NORMAL",  # safe with WAL, fsync only at checkpoints
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64000,  # negative = KiB, i.e. 64 MB page cache per connection
+    "temp_store": "MEMORY",
+}
+
+# Funnel request-path writes through one writer thread per process (api/writer.py)
+WRITE_QUEUE = {
+    "ENABLED": os.environ.get("WRITE_QUEUE_ENABLED", "0") == "1",
+    "MAX_SIZE": 1000,  # pending writes before submitters block
+    "BATCH_SIZE": 50,  # writes committed in one transaction
+    "MAX_WAIT": 0.002,  # seconds to wait for more writes before committing a batch
+    "TIMEOUT": 10,
+}
+
+# -------------------------
+# Cache & Sessions
+# -------------------------
+# Sessions are read from the "sessions" cache and only fall back to the
+# django_session table on a miss. The cache must be shared by every worker
+# process (a per-process LocMemCache would keep serving logged-out sessions),
+# so it is Redis when REDIS_URL is set and a file cache otherwise.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "sessions": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ["REDIS_URL"],
+    } if os.environ.get("REDIS_URL") else {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ.get("SESSION_CACHE_DIR", str(VAR_DIR / "sessions")),
+    },
+}
+
+# Lifetime of the cached anonymous /api/home/ response, per worker (api.views.home).
+# Its key carries a version kept in HOME_VERSION_CACHE, which must be shared by
+# every worker: a change to any chef profile bumps it and so reaches them all.
+HOME_CACHE_SECONDS = 60
+HOME_VERSION_CACHE = "sessions"
+
+# Shared caches in front of the API (api/caching.py). Anonymous responses of
+# the public read endpoints are cacheable for S_MAXAGE seconds and served
+# stale for up to STALE_WHILE_REVALIDATE more while the cache refetches.
+# Dish/ChefProfile changes send PURGE_METHOD to PURGE_URL with the affected
+# surrogate keys, e.g. CDN_PURGE_URL=http://127.0.0.1:8080/ for `manage.py cache_proxy`.
+CDN = {
+    "ENABLED": True,
+    "MAX_AGE": 0,  # browsers revalidate, shared caches use s-maxage
+    "S_MAXAGE": 60,
+    "STALE_WHILE_REVALIDATE": 300,
+    "SURROGATE_KEY_HEADER": "Surrogate-Key",
+    "PURGE_URL": os.environ.get("CDN_PURGE_URL", ""),
+    "PURGE_METHOD": "PURGE",
+    "PURGE_TIMEOUT": 5,
+}
+
+# "django.contrib.sessions.backends.signed_cookies" removes session storage
+# entirely, at the cost of server-side logout.
+SESSION_ENGINE = os.environ.get("SESSION_ENGINE", "api.sessions")
+SESSION_CACHE_ALIAS = "sessions"
+SESSION_SAVE_EVERY_REQUEST = False  # read-only requests never write the session
+
+# -------------------------
+# Metrics & Profiling
+# -------------------------
+# Per-route request metrics served in Prometheus format at /metrics (api/metrics.py)
+METRICS = {
+    "ENABLED": True,
+    # Directory shared by gunicorn workers; each writes its totals there and /metrics sums them
+    "MULTIPROC_DIR": os.environ.get("METRICS_MULTIPROC_DIR", ""),
+    "DUMP_INTERVAL": 5,
+    "ALLOWED_IPS": os.environ.get("METRICS_ALLOWED_IPS", "127.0.0.1,::1").split(","),
+    # Behind the nginx front proxy every request comes from 127.0.0.1, so ALLOWED_IPS alone
+    # lets anyone in: set a token for the scraper ("Authorization: Bearer <token>"), or deny
+    # the path in the proxy (location = /metrics { deny all; }) and scrape gunicorn directly.
+    "TOKEN": os.environ.get("METRICS_TOKEN", ""),
+}
+
+# On-demand cProfile captures (api/profiling.py): X-Profile header with a
+# `manage.py profiling_token` token, ?_profile=1 for staff, or SAMPLE_RATE.
+PROFILING = {
+    "ENABLED": True,
+    "SAMPLE_RATE": float(os.environ.get("PROFILING_SAMPLE_RATE", 0)),
+    "DIR": os.environ.get("PROFILING_DIR", str(VAR_DIR / "profiles")),
+    "MAX_FILES": 200,
+    "TOKEN_MAX_AGE": 60 * 60,
+}
+
+# -------------------------
+# Logging
+# -------------------------
+# JSON lines on stdout, written by a background thread (api/logs.py)
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+
+# Fraction of records below WARNING kept per logger (and its children)
+LOG_SAMPLING = {
+    "api.middleware": 0.1,  # per-request session I/O lines at DEBUG
+}
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "filters": {
+        "sampling": {"()": "api.logs.SamplingFilter", "rates": LOG_SAMPLING},
+        "request_id": {"()": "api.logs.RequestIdFilter"},
+    },
+    "handlers": {
+        "queue": {
+            "class": "api.logs.QueueingHandler",
+            "stream": "ext://sys.stdout",
+            "filters": ["sampling", "request_id"],
+        },
+    },
+    "root": {"handlers": ["queue"], "level": LOG_LEVEL},
+    "loggers": {
+        # Instead of Django's default console and admin mail handlers
+        "django": {"handlers": ["queue"], "level": LOG_LEVEL, "propagate": False},
+    },
+}
+
+# -------------------------
+# Response Compression
+# -------------------------
+# brotli (if installed) or gzip, negotiated per request (api/compression.py)
+COMPRESSION = {
+    "ENABLED": os.environ.get("COMPRESSION_ENABLED", "1") != "0",
+    "MIN_SIZE": 1024,  # bytes; smaller bodies gain little and cost a flush
+    "CONTENT_TYPES": ["application/json", "text/html", "text/plain", "text/csv"],
+    # Responses carrying secrets are left alone (BREACH)
+    "EXCLUDE_VIEWS": ["token", "token-refresh"],
+    "BROTLI_QUALITY": 4,
+    "GZIP_LEVEL": 6,
+}
+
+# -------------------------
+# Batch Requests
+# -------------------------
+# /api/batch/ runs up to MAX_REQUESTS sub-requests; consecutive GETs share a
+# pool of MAX_WORKERS threads per process (api/batch.py)
+BATCH = {
+    "MAX_REQUESTS": 20,
+    "MAX_WORKERS": 4,
+    "PATH_PREFIX": "/api/",
+    # Views that log in/out or hand out tokens need their own response (cookies, session key)
+    "EXCLUDE_VIEWS": [
+        "batch", "register", "login", "logout", "change-password", "token", "token-refresh", "token-revoke",
+    ],
 }
 
 # -------------------------
@@ -477,6 +702,22 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Hand media transfers to the front proxy: "nginx" (X-Accel-Redirect) or
+# "apache" (X-Sendfile). Unset means Django streams the file itself.
+MEDIA_SENDFILE_BACKEND = os.environ.get("MEDIA_SENDFILE_BACKEND")
+MEDIA_ACCEL_REDIRECT_PREFIX = os.environ.get("MEDIA_ACCEL_REDIRECT_PREFIX", "/protected-media/")
+# Served to anyone; admin-interface holds the logo shown on the admin login page
+MEDIA_PUBLIC_DIRS = ["dish_pictures", "chef_profiles", "defaults", "admin-interface"]
+MEDIA_CACHE_MAX_AGE = 60 * 60
+
+# Upload directories scanned by the gc_media command
+MEDIA_GC_DIRS = ["dish_pictures", "chef_profiles"]
+MEDIA_GC_BATCH_SIZE = 500
+
+# Bulk dish import limits
+DISH_IMPORT_MAX_ROWS = 200
+DISH_IMPORT_MAX_IMAGE_SIZE = 5 * 1024 * 1024
+
 # -------------------------
 # CORS & CSRF
 # -------------------------
@@ -508,9 +749,38 @@ AUTH_USER_MODEL = "api.User"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
+        "api.authentication.SignedTokenAuthentication",  # no DB query for bearer tokens
         "rest_framework.authentication.SessionAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",
     ],
+    # orjson-backed JSON (api/renderers.py), the same JSON as DRF's stdlib renderer
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "api.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+    # Proxies in front of Django that append to X-Forwarded-For (1 behind the nginx front proxy).
+    # Throttles only trust that many entries; 0 uses REMOTE_ADDR and ignores the header.
+    "NUM_PROXIES": int(os.environ.get("NUM_PROXIES", "0")),
+    # Token-bucket rates for api.throttling, "<burst>/<period>"
+    "DEFAULT_THROTTLE_RATES": {
+        "login": os.environ.get("THROTTLE_LOGIN_RATE", "10/m"),
+        "login_username": os.environ.get("THROTTLE_LOGIN_USERNAME_RATE", "20/h"),  # per account, from any IP
+        "register": os.environ.get("THROTTLE_REGISTER_RATE", "5/m"),
+        "booking": os.environ.get("THROTTLE_BOOKING_RATE", "20/m"),
+    },
 }
+
+# "api.throttling.CacheBucketStore" shares buckets between workers via THROTTLE_CACHE_ALIAS
+THROTTLE_BUCKET_STORE = os.environ.get("THROTTLE_BUCKET_STORE", "api.throttling.LocalMemoryBucketStore")
+THROTTLE_CACHE_ALIAS = "sessions"
+
+# Signed API tokens (seconds)
+ACCESS_TOKEN_LIFETIME = 15 * 60
+REFRESH_TOKEN_LIFETIME = 14 * 24 * 60 * 60